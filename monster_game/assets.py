@@ -0,0 +1,291 @@
+import argparse
+import io
+import os
+import queue
+import struct
+import threading
+import pygame
+
+# Atlas file layout: HEADER, one SPRITE_ENTRY per sprite, then the atlas image as PNG
+#   flags   ALPHA if any sprite has transparent pixels (the surface gets convert_alpha, else convert)
+# All numbers are little-endian.
+MAGIC = b"MATL"
+VERSION = 1
+HEADER = "<4sHBI"  # Magic, version, flags, sprite count
+SPRITE_ENTRY = "<48s4H"  # Name, x, y, width, height
+ALPHA = 1
+
+_DIRECTORY = os.path.dirname(__file__)
+# One subdirectory of PNGs per atlas; a sprite is named after its path. The game draws
+#   tiles/<tile type>      40x40 map tiles
+#   player/<direction>     the player (up, down, left, right)
+#   monsters/<species ID>  100x100 battle sprites
+#   icons/<species ID>     60x60 menu icons (scaled from monsters/ unless given)
+SOURCE_DIR = os.path.join(_DIRECTORY, "assets", "src")
+ATLAS_DIR = os.path.join(_DIRECTORY, "assets")
+ATLAS_EXTENSION = ".atlas"
+
+MAX_ATLAS_WIDTH = 2048
+PADDING = 1  # Pixels between packed sprites
+# Atlases built from another one's sources at a fixed size: name -> (source atlas, size)
+DERIVED_ATLASES = {"icons": ("monsters", (60, 60))}
+
+# Atlases the game waits for before its first screen (the rest load while it runs)
+REQUIRED_ATLASES = ("tiles", "player")
+
+
+def pack_rects(sizes, max_width=MAX_ATLAS_WIDTH):
+    """Shelf-pack (width, height) sizes; returns ([(x, y), ...] in input order, atlas size)
+
+    Sprites go tallest first into rows left to right, a new row starting
+    whenever the next one doesn't fit in max_width.
+    """
+    order = sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0]))
+    positions = [None] * len(sizes)
+    x = y = row_height = width = 0
+    for i in order:
+        w, h = sizes[i]
+        if w > max_width:
+            raise ValueError(f"Sprite {w}px wide doesn't fit in a {max_width}px atlas")
+        if x and x + w > max_width:
+            y += row_height + PADDING
+            x = row_height = 0
+        positions[i] = (x, y)
+        x += w + PADDING
+        row_height = max(row_height, h)
+        width = max(width, x - PADDING)
+    return positions, (max(width, 1), max(y + row_height, 1))
+
+
+def _source_images(directory):
+    """{sprite name: surface} for the PNGs under directory (names relative, without extension)"""
+    images = {}
+    for root, _, files in os.walk(directory):
+        for file_name in sorted(files):
+            if not file_name.lower().endswith(".png"):
+                continue
+            path = os.path.join(root, file_name)
+            name = os.path.splitext(os.path.relpath(path, directory))[0].replace(os.sep, "/")
+            images[name] = pygame.image.load(path)
+    return images
+
+
+def _has_alpha(surface):
+    """True if any pixel of surface is (partly) transparent"""
+    if not surface.get_flags() & pygame.SRCALPHA:
+        return False
+    return bool((pygame.surfarray.array_alpha(surface) < 255).any())
+
+
+def build_atlas(name, images, output_path, max_width=MAX_ATLAS_WIDTH):
+    """Pack {sprite name: surface} into one atlas file; returns the sprite count"""
+    names = sorted(images)
+    positions, size = pack_rects([images[sprite].get_size() for sprite in names], max_width)
+    atlas = pygame.Surface(size, pygame.SRCALPHA)
+    atlas.fill((0, 0, 0, 0))
+    entries = []
+    flags = 0
+    for sprite, (x, y) in zip(names, positions):
+        image = images[sprite]
+        atlas.blit(image, (x, y))
+        if _has_alpha(image):
+            flags |= ALPHA
+        key = f"{name}/{sprite}".encode("utf-8")
+        if len(key) > 48:
+            raise ValueError(f"Sprite name too long for an atlas: {name}/{sprite}")
+        entries.append(struct.pack(SPRITE_ENTRY, key, x, y, *image.get_size()))
+
+    image_data = io.BytesIO()
+    pygame.image.save(atlas, image_data, "png")
+
+    temp_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(struct.pack(HEADER, MAGIC, VERSION, flags, len(entries)))
+        f.write(b"".join(entries))
+        f.write(image_data.getvalue())
+    os.replace(temp_path, output_path)
+    return len(entries)
+
+
+def build_all(source_dir=SOURCE_DIR, output_dir=ATLAS_DIR, max_width=MAX_ATLAS_WIDTH):
+    """Build an atlas for every subdirectory of source_dir (plus DERIVED_ATLASES); returns {name: sprites}"""
+    built = {}
+    sources = {}
+    for name in sorted(os.listdir(source_dir)) if os.path.isdir(source_dir) else []:
+        directory = os.path.join(source_dir, name)
+        if os.path.isdir(directory):
+            sources[name] = _source_images(directory)
+    for name, (source, size) in DERIVED_ATLASES.items():
+        if source in sources and name not in sources:
+            sources[name] = {sprite: pygame.transform.smoothscale(image, size)
+                             for sprite, image in sources[source].items()}
+
+    os.makedirs(output_dir, exist_ok=True)
+    for name, images in sources.items():
+        if images:
+            built[name] = build_atlas(name, images, os.path.join(output_dir, name + ATLAS_EXTENSION),
+                                      max_width)
+    return built
+
+
+def read_atlas(path):
+    """(sprites {name: Rect}, image surface, flags) of an atlas file; the surface isn't converted yet"""
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, flags, count = struct.unpack_from(HEADER, data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a sprite atlas")
+    offset = struct.calcsize(HEADER)
+    sprites = {}
+    for _ in range(count):
+        name, x, y, width, height = struct.unpack_from(SPRITE_ENTRY, data, offset)
+        sprites[name.rstrip(b"\0").decode("utf-8")] = pygame.Rect(x, y, width, height)
+        offset += struct.calcsize(SPRITE_ENTRY)
+    image = pygame.image.load(io.BytesIO(data[offset:]), "atlas.png")
+    return sprites, image, flags
+
+
+class AssetLoader:
+    """Loads the sprite atlases on a background thread
+
+    The thread reads and decodes the atlas files (required ones first) and
+    hands them over through a queue. poll(), called once a frame on the main
+    thread, converts each new atlas to the display format (once) and makes
+    its sprites available. Until every required atlas is in, ready is False
+    and the game shows a loading screen. Atlases that are missing or fail to
+    load are left out, and the game draws its plain shapes instead.
+    """
+
+    def __init__(self, directory=ATLAS_DIR, required=REQUIRED_ATLASES):
+        self.directory = directory
+        try:
+            names = sorted(os.path.splitext(file_name)[0] for file_name in os.listdir(directory)
+                           if file_name.endswith(ATLAS_EXTENSION))
+        except OSError:
+            names = []
+        self.pending = [name for name in required if name in names]
+        self.pending += [name for name in names if name not in self.pending]
+        self.required = {name for name in required if name in names}
+        self.total = len(self.pending)
+        self.atlases = {}  # name -> converted surface
+        self.sprites = {}  # sprite name -> (atlas surface, area Rect)
+        self.errors = {}  # atlas name -> message
+        self._loaded = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None and self.pending:
+            self._thread = threading.Thread(target=self._run, name="asset-loader", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        for name in self.pending:
+            if self._stop.is_set():
+                return
+            try:
+                self._loaded.put((name, read_atlas(os.path.join(self.directory, name + ATLAS_EXTENSION))))
+            except (OSError, ValueError, struct.error, pygame.error) as e:
+                self._loaded.put((name, e))
+
+    def poll(self):
+        """Take in atlases the thread has finished (main thread only)"""
+        while True:
+            try:
+                name, result = self._loaded.get_nowait()
+            except queue.Empty:
+                return
+            if isinstance(result, Exception):
+                self.errors[name] = str(result)
+                self.required.discard(name)
+                continue
+            sprites, image, flags = result
+            surface = image.convert_alpha() if flags & ALPHA else image.convert()
+            self.atlases[name] = surface
+            for sprite, area in sprites.items():
+                self.sprites[sprite] = (surface, area)
+            self.required.discard(name)
+
+    @property
+    def ready(self):
+        return not self.required
+
+    def progress(self):
+        """(atlases done, atlases to load)"""
+        return len(self.atlases) + len(self.errors), self.total
+
+    def sprite(self, name):
+        """(atlas surface, area) of a sprite, or None if it isn't loaded"""
+        return self.sprites.get(name)
+
+    def blit(self, target, name, dest):
+        """Draw one sprite right away; returns False if it isn't loaded"""
+        sprite = self.sprites.get(name)
+        if sprite is None:
+            return False
+        target.blit(sprite[0], dest, sprite[1])
+        return True
+
+
+class SpriteBatch:
+    """Collects sprite draws and does them in one Surface.blits call
+
+    add() returns False for sprites that aren't loaded, so callers can draw
+    their fallback shape. Sprites are drawn in the order they were added,
+    on flush().
+    """
+
+    def __init__(self, assets):
+        self.assets = assets
+        self.items = []
+
+    def add(self, name, dest):
+        sprite = self.assets.sprites.get(name)
+        if sprite is None:
+            return False
+        self.items.append((sprite[0], dest, sprite[1]))
+        return True
+
+    def flush(self, target):
+        if self.items:
+            target.blits(self.items, doreturn=False)
+            self.items.clear()
+
+
+def draw_loading(screen, font, progress):
+    """Loading screen with a progress bar; progress is (done, total)"""
+    width, height = screen.get_size()
+    screen.fill((0, 0, 0))
+    text = font.render("Loading...", True, (255, 255, 255))
+    screen.blit(text, (width // 2 - text.get_width() // 2, height // 2 - 40))
+    done, total = progress
+    bar = pygame.Rect(width // 4, height // 2, width // 2, 16)
+    pygame.draw.rect(screen, (255, 255, 255), bar, 2)
+    if total:
+        fill = bar.inflate(-6, -6)
+        fill.width = fill.width * done // total
+        pygame.draw.rect(screen, (255, 255, 255), fill)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pack the sprite and tile PNGs into texture atlases")
+    parser.add_argument("--source", default=SOURCE_DIR, help="one subdirectory of PNGs per atlas")
+    parser.add_argument("--output", default=ATLAS_DIR)
+    parser.add_argument("--max-width", type=int, default=MAX_ATLAS_WIDTH)
+    args = parser.parse_args(argv)
+
+    built = build_all(args.source, args.output, args.max_width)
+    if not built:
+        print(f"No PNGs found under {args.source}")
+    for name, count in built.items():
+        print(f"{name}{ATLAS_EXTENSION}: {count} sprites")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+import argparse
+import difflib
+import json
+import os
+import random
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from simulation import run_matchup
+from tournament import shard_seed
+import monster_data
+from monster import shared_tables_in_use
+import shared_tables
+import result_cache
+
+# Positions of the tunable base stats in a MONSTER_SPECIES entry
+STAT_FIELDS = {"hp": 2, "attack": 3, "defense": 4, "speed": 5}
+
+# Default search range when no bounds are given (speed doesn't affect battles yet)
+DEFAULT_BOUNDS_RATIO = 0.25
+DEFAULT_STATS = ("hp", "attack", "defense")
+
+
+def default_bounds(species_ids, stats=DEFAULT_STATS, ratio=DEFAULT_BOUNDS_RATIO):
+    """Bounds of +-ratio around the current values"""
+    bounds = {}
+    for species_id in species_ids:
+        bounds[species_id] = {}
+        for stat in stats:
+            value = monster_data.MONSTER_SPECIES[species_id][STAT_FIELDS[stat]]
+            bounds[species_id][stat] = (max(1, int(value * (1 - ratio))), int(value * (1 + ratio)) + 1)
+    return bounds
+
+
+def current_stats(species_ids):
+    """Base stats as a candidate: ((species, (hp, attack, defense, speed)), ...)"""
+    return tuple((species_id, tuple(monster_data.MONSTER_SPECIES[species_id][2:6])) for species_id in species_ids)
+
+
+def _with_stats(species_id, values, data=None):
+    """Species entry (data, or the one in monster_data) with candidate base stats"""
+    data = monster_data.MONSTER_SPECIES[species_id] if data is None else data
+    return data[:2] + list(values) + data[6:]
+
+
+def _evaluate_pairs(stats, pairs, level, battles, seed):
+    """Worker entry point: fight pairings with candidate base stats applied"""
+    def fight():
+        return [(a, b) + run_matchup(a, b, level, battles, shard_seed(seed, a, b, 0)) for a, b in pairs]
+
+    # Workers reading the shared tables get the candidate as per-process overrides
+    # (and never build the monster_data tables)
+    tables = shared_tables_in_use()
+    if tables:
+        for species_id, values in stats:
+            tables.species_overrides[species_id] = _with_stats(species_id, values, tables.species(species_id))
+        try:
+            return fight()
+        finally:
+            tables.species_overrides.clear()
+
+    species = monster_data.MONSTER_SPECIES
+    originals = {}
+    for species_id, values in stats:
+        originals[species_id] = species[species_id]
+        species[species_id] = _with_stats(species_id, values)
+    try:
+        return fight()
+    finally:
+        species.update(originals)
+
+
+def win_rates(results, species_ids):
+    """Overall win rate of each species from pairing results"""
+    wins = {species_id: 0 for species_id in species_ids}
+    battles = {species_id: 0 for species_id in species_ids}
+    for a, b, wins_a, wins_b, draws in results:
+        total = wins_a + wins_b + draws
+        wins[a] += wins_a
+        wins[b] += wins_b
+        battles[a] += total
+        battles[b] += total
+    return {species_id: wins[species_id] / battles[species_id] if battles[species_id] else 0.0
+            for species_id in species_ids}
+
+
+def target_win_rate_loss(target=0.5):
+    """Objective: mean squared distance of every species' win rate from target"""
+    def loss(rates):
+        return sum((rate - target) ** 2 for rate in rates.values()) / len(rates)
+    return loss
+
+
+def type_diversity_loss():
+    """Objective: spread of the average win rate between types"""
+    def loss(rates):
+        by_type = {}
+        for species_id, rate in rates.items():
+            for type_name in monster_data.MONSTER_SPECIES[species_id][1].split('/'):
+                by_type.setdefault(type_name, []).append(rate)
+        means = [sum(values) / len(values) for values in by_type.values()]
+        average = sum(means) / len(means)
+        return sum((mean - average) ** 2 for mean in means) / len(means)
+    return loss
+
+
+class BalanceOptimizer:
+    """Local search over species base stats driven by headless battles
+
+    Every iteration proposes several mutated candidates and evaluates them in
+    a process pool. Candidates are first screened with a small number of
+    battles and only evaluated fully if they look competitive. All candidates
+    use the same seeds (common random numbers) so differences come from the
+    stats, and results are cached per candidate. With a ResultCache, pairing
+    results are also cached on disk per pair of species stats, so a
+    candidate only fights the pairings of the species it changed, and
+    running again after an unrelated edit reuses almost everything.
+    """
+
+    def __init__(self, species_ids=None, bounds=None, objective=None, level=20,
+                 battles=200, screen_battles=30, screen_margin=0.01, seed=0, workers=None,
+                 result_cache=None):
+        self.species_ids = sorted(species_ids or monster_data.MONSTER_SPECIES)
+        self.bounds = bounds or default_bounds(self.species_ids)
+        self.objective = objective or target_win_rate_loss()
+        self.level = level
+        self.battles = battles
+        self.screen_battles = screen_battles
+        self.screen_margin = screen_margin
+        self.seed = seed
+        self.workers = workers or os.cpu_count()
+        self.rng = random.Random(seed)
+        self.cache = {}  # (candidate, battles) -> loss
+        self.result_cache = result_cache
+
+        self.pairs = [(a, b) for i, a in enumerate(self.species_ids) for b in self.species_ids[i + 1:]]
+        self.evaluations = 0
+
+    def evaluate(self, pool, candidates, battles):
+        """Losses for several candidates (uses and fills the cache)"""
+        missing = [c for c in dict.fromkeys(candidates) if (c, battles) not in self.cache]
+        futures = {}
+        for candidate in missing:
+            cached, keys = self._cached_pairs(candidate, battles)
+            pairs = [pair for pair in self.pairs if pair not in cached]
+            chunk = max(1, len(pairs) // self.workers)
+            futures[candidate] = (cached, keys, [
+                pool.submit(_evaluate_pairs, candidate, pairs[i:i + chunk], self.level, battles, self.seed)
+                for i in range(0, len(pairs), chunk)])
+
+        for candidate, (cached, keys, parts) in futures.items():
+            results = [row for future in parts for row in future.result()]
+            if self.result_cache is not None:
+                for row in results:
+                    self.result_cache.put(keys[row[:2]], row[2:])
+            results.extend(cached.values())
+            self.cache[(candidate, battles)] = self.objective(win_rates(results, self.species_ids))
+            self.evaluations += 1
+        return [self.cache[(c, battles)] for c in candidates]
+
+    def _cached_pairs(self, candidate, battles):
+        """Pairing results of a candidate found in the result cache, and the keys of the others"""
+        if self.result_cache is None:
+            return {}, {}
+        digests = {species_id: result_cache.species_digest(species_id, _with_stats(species_id, values))
+                   for species_id, values in candidate}
+        cached = {}
+        keys = {}
+        for a, b in self.pairs:
+            key = result_cache.matchup_key(digests[a], digests[b], self.level, battles,
+                                           shard_seed(self.seed, a, b, 0))
+            values = self.result_cache.get(key)
+            if values is None:
+                keys[(a, b)] = key
+            else:
+                cached[(a, b)] = (a, b) + tuple(values)
+        return cached, keys
+
+    def mutate(self, candidate):
+        """Change one bounded stat of one species"""
+        stats = dict(candidate)
+        species_id = self.rng.choice([s for s in self.species_ids if self.bounds.get(s)])
+        stat = self.rng.choice(sorted(self.bounds[species_id]))
+        low, high = self.bounds[species_id][stat]
+
+        values = list(stats[species_id])
+        field = STAT_FIELDS[stat] - 2
+        step = max(1, (high - low) // 8)
+        values[field] = min(high, max(low, values[field] + self.rng.choice((-step, step))))
+        stats[species_id] = tuple(values)
+        return tuple(sorted(stats.items()))
+
+    def optimize(self, iterations=50, proposals=8, time_budget=None, progress=None):
+        """Search for better stats; returns (best candidate, best loss)"""
+        deadline = time.time() + time_budget if time_budget else None
+
+        # Workers read the game tables from one shared memory block instead of building
+        # their own copies
+        tables = shared_tables.SharedTables.create()
+        try:
+            return self._optimize(tables.name, iterations, proposals, deadline, progress)
+        finally:
+            tables.close()
+            if self.result_cache is not None:
+                self.result_cache.flush()
+
+    def _optimize(self, tables_name, iterations, proposals, deadline, progress):
+        best = current_stats(self.species_ids)
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=shared_tables.attach_worker,
+                                 initargs=(tables_name,)) as pool:
+            best_loss = self.evaluate(pool, [best], self.battles)[0]
+            for iteration in range(iterations):
+                if deadline and time.time() > deadline:
+                    break
+
+                candidates = [self.mutate(best) for _ in range(proposals)]
+
+                # Early stopping: drop candidates that look clearly worse on a small sample
+                screened = self.evaluate(pool, candidates, self.screen_battles)
+                baseline = self.evaluate(pool, [best], self.screen_battles)[0]
+                promising = [c for c, loss in zip(candidates, screened)
+                             if loss <= baseline + self.screen_margin]
+
+                if promising:
+                    losses = self.evaluate(pool, promising, self.battles)
+                    loss, candidate = min(zip(losses, promising))
+                    if loss < best_loss:
+                        best, best_loss = candidate, loss
+
+                if progress:
+                    progress(iteration + 1, best_loss)
+        return best, best_loss
+
+
+def species_table_diff(candidate, path=None):
+    """Unified diff of monster_data.py with the candidate base stats applied"""
+    path = path or os.path.join(os.path.dirname(__file__), "monster_data.py")
+    with open(path, 'r') as f:
+        lines = f.readlines()
+
+    stats = dict(candidate)
+    new_lines = []
+    for line in lines:
+        match = re.match(r'(\s*)(\d+): \[(".*?"), (".*?"), (\d+), (\d+), (\d+), (\d+), (.*)\],(.*)$', line)
+        if match and int(match.group(2)) in stats:
+            species_id = int(match.group(2))
+            hp, attack, defense, speed = stats[species_id]
+            line = (f'{match.group(1)}{species_id}: [{match.group(3)}, {match.group(4)}, '
+                    f'{hp}, {attack}, {defense}, {speed}, {match.group(9)}],{match.group(10)}\n')
+        new_lines.append(line)
+
+    return "".join(difflib.unified_diff(lines, new_lines, "a/monster_data.py", "b/monster_data.py"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tune species base stats with simulated battles")
+    parser.add_argument("--bounds", help="JSON file: {species_id: {stat: [low, high]}}")
+    parser.add_argument("--objective", choices=("win-rate", "type-diversity"), default="win-rate")
+    parser.add_argument("--target", type=float, default=0.5, help="target win rate")
+    parser.add_argument("--level", type=int, default=20)
+    parser.add_argument("--battles", type=int, default=200, help="battles per pairing")
+    parser.add_argument("--screen-battles", type=int, default=30)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--proposals", type=int, default=8)
+    parser.add_argument("--time-budget", type=float, default=None, help="seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--cache", default=result_cache.CACHE_PATH, help="result cache file")
+    parser.add_argument("--no-cache", action="store_true", help="fight every pairing again")
+    args = parser.parse_args(argv)
+
+    bounds = None
+    if args.bounds:
+        with open(args.bounds, 'r') as f:
+            bounds = {int(species_id): {stat: tuple(limits) for stat, limits in stats.items()}
+                      for species_id, stats in json.load(f).items()}
+
+    objective = target_win_rate_loss(args.target) if args.objective == "win-rate" else type_diversity_loss()
+    optimizer = BalanceOptimizer(bounds=bounds, objective=objective, level=args.level,
+                                 battles=args.battles, screen_battles=args.screen_battles,
+                                 seed=args.seed, workers=args.workers,
+                                 result_cache=None if args.no_cache else result_cache.ResultCache(args.cache))
+
+    def progress(iteration, loss):
+        print(f"iteration {iteration}: loss {loss:.5f} ({optimizer.evaluations} evaluations)")
+
+    best, loss = optimizer.optimize(args.iterations, args.proposals, args.time_budget, progress)
+    print(species_table_diff(best) or "No improvement found")
+
+
+if __name__ == "__main__":
+    main()
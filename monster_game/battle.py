@@ -1,35 +1,127 @@
 import random
+from functools import lru_cache
 import pygame
 from monster import Monster
+from enemy_ai import RandomAI
+from trainer import Party
+from virtual_list import VirtualList
+from battle_events import (BattleEvent, prompt, format_events, APPEARED, ESCAPED, ESCAPE_FAILED,
+                           LEVEL_UP, CHOOSE_NEXT, ALL_FAINTED, CANNOT_CATCH, CAUGHT, BROKE_FREE,
+                           TRAINER_CHALLENGE, SENT_OUT, TRAINER_DEFEATED, PRIZE_MONEY, NO_RUNNING,
+                           WITHDREW, GO, CANNOT_BATTLE, ALREADY_OUT)
+
+# Battle states and results (the order is used as a numeric code in snapshots and logs)
+BATTLE_STATES = ("start", "player_turn", "move_select", "monster_select", "item_select",
+                 "enemy_turn", "catch", "evolution", "end")
+BATTLE_RESULTS = (None, "win", "lose", "catch", "run")
+
+# EXP multiplier for beating a trainer's monster
+TRAINER_EXP_BONUS = 1.5
+
+# Rendered battle texts kept between frames
+TEXT_CACHE_SIZE = 256
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def text_surface(font, text, color):
+    """Rendered text; battle labels are drawn every frame but rarely change"""
+    return font.render(text, True, color)
+
+
+def prerender(monster, font, small_font):
+    """Render the texts a wild battle against monster opens with (see encounter_prefetch.py)"""
+    text_surface(font, monster.name, (0, 0, 0))
+    text_surface(small_font, f"HP: {monster.current_hp}/{monster.max_hp}", (0, 0, 0))
+    text_surface(font, format_events([BattleEvent(APPEARED, None, monster, None)]), (0, 0, 0))
 
 class Battle:
-    def __init__(self, player, wild_monster=None, trainer=None):
+    def __init__(self, player, wild_monster=None, trainer=None, seed=None, recorder=None, enemy_ai=None):
         self.player = player
         self.wild_monster = wild_monster
-        self.trainer = trainer  # For trainer battles (not implemented yet)
+        self.trainer = trainer  # For trainer battles
+        
+        # Both sides as indexed parties (a wild battle is a party of one)
+        self.player_party = Party(player.monsters, player.active_monster)
+        if not self.player_party.is_healthy(self.player_party.active) and self.player_party.has_healthy():
+            # A fainted lead is skipped
+            self.player_party.switch(self.player_party.next_healthy())
+        if wild_monster:
+            self.enemy_party = Party([wild_monster])
+        else:
+            self.enemy_party = Party(trainer.monsters, trainer.active_monster)
+        
+        self.player_monster = self.player_party.active_monster
+        self.enemy_monster = self.enemy_party.active_monster
         
-        self.player_monster = player.get_active_monster()
-        self.enemy_monster = wild_monster if wild_monster else trainer.get_active_monster()
+        # Stat stages only last for one battle
+        for monster in self.player_party.monsters + self.enemy_party.monsters:
+            monster.clear_stat_stages()
         
         self.state = "start"  # start, player_turn, enemy_turn, catch, run, end
-        self.message = f"A wild {self.enemy_monster.name} appeared!"
+        
+        # Events of the current step; text is only formatted when read
+        self.locale = None  # None uses the battle_events default
+        self.events = []
+        self._message = None
+        if trainer:
+            self.set_events(BattleEvent(TRAINER_CHALLENGE, None, None, trainer.name),
+                            BattleEvent(SENT_OUT, None, self.enemy_monster, trainer.name))
+        else:
+            self.set_events(BattleEvent(APPEARED, None, self.enemy_monster, None))
         self.animation_frame = 0
         
         # Move selection index
         self.move_selection = 0
         self.menu_selection = 0  # 0: Fight, 1: Monster, 2: Item, 3: Run
+        self.monster_selection = 0  # Party index in monster_select
+        self.forced_switch = False  # monster_select after a faint (can't cancel)
+        self.switch_list = None  # VirtualList for monster_select, made on first draw
         
         # Battle result
         self.result = None  # win, lose, catch, run
         
         # Experience gain
         self.exp_gain = 0
+        self.evolving = None  # Player monster that can evolve after a win
+        
+        # Each battle draws from its own random stream so it can be replayed
+        self.seed = seed if seed is not None else random.getrandbits(63)
+        self.rng = random.Random(self.seed)
+        
+        # Enemy move selection (see enemy_ai.py); AIs draw from their own stream
+        self.enemy_ai = enemy_ai or RandomAI()
+        self.ai_rng = random.Random(self.seed + 1)
+        
+        # Battle log recording (see battle_log.py)
+        self.recorder = recorder
+        if recorder:
+            recorder.begin(self)
+    
+    def set_events(self, *events):
+        """Replace the current events"""
+        self.events = list(events)
+        self._message = None
+    
+    def add_events(self, *events):
+        """Append to the current events"""
+        self.events.extend(events)
+        self._message = None
+    
+    @property
+    def message(self):
+        """Text for the current events, formatted on first access"""
+        if self._message is None:
+            self._message = format_events(self.events, self.locale)
+        return self._message
     
     def update(self, action=None, selection=None):
         """Update battle state"""
+        if self.recorder:
+            self.recorder.record(action, selection)
+        
         if self.state == "start":
             self.state = "player_turn"
-            self.message = "What will you do?"
+            self.set_events(prompt("what_will_you_do"))
             return
         
         elif self.state == "player_turn":
@@ -40,65 +132,76 @@ class Battle:
             elif action == "menu_confirm":
                 if self.menu_selection == 0:  # Fight
                     self.state = "move_select"
-                    self.message = "Choose a move"
+                    self.set_events(prompt("choose_move"))
                     return
                 
                 elif self.menu_selection == 1:  # Monster
                     self.state = "monster_select"
-                    self.message = "Choose a monster"
+                    self.monster_selection = self.player_party.active
+                    self.set_events(prompt("choose_monster"))
                     return
                 
                 elif self.menu_selection == 2:  # Item
                     self.state = "item_select"
-                    self.message = "Choose an item"
+                    self.set_events(prompt("choose_item"))
                     return
                 
                 elif self.menu_selection == 3:  # Run
+                    if self.trainer:
+                        self.set_events(BattleEvent(NO_RUNNING, None, None, None))
+                        return
+                    
                     # Run processing
                     escape_chance = 0.7  # 70% chance to escape
-                    if random.random() < escape_chance:
+                    if self.rng.random() < escape_chance:
                         self.state = "end"
                         self.result = "run"
-                        self.message = "Got away safely!"
+                        self.set_events(BattleEvent(ESCAPED, self.player_monster, None, None))
                     else:
                         self.state = "enemy_turn"
-                        self.message = "Can't escape!"
+                        self.set_events(BattleEvent(ESCAPE_FAILED, self.player_monster, None, None))
                     return
         
         elif self.state == "move_select":
             if action == "menu_select":
-                self.move_selection = selection % len(self.player_monster.moves)
+                if self.player_monster.moves:
+                    self.move_selection = selection % len(self.player_monster.moves)
                 return
             
             elif action == "menu_confirm":
-                # Use move
-                if self.move_selection < len(self.player_monster.moves):
-                    result = self.player_monster.use_move(self.move_selection, self.enemy_monster)
-                    self.message = result
+                # Use move (a monster without moves still loses its turn)
+                if self.move_selection < len(self.player_monster.moves) or not self.player_monster.moves:
+                    self.set_events(*self.player_monster.execute_move(self.move_selection, self.enemy_monster, self.rng))
+                    self.enemy_party.refresh(self.enemy_party.active)
+                    self.player_party.refresh(self.player_party.active)
                     self.state = "enemy_turn"
                     
                     # Check if enemy HP is 0
                     if self.enemy_monster.current_hp <= 0:
                         self.handle_enemy_faint()
+                    
+                    # The player's monster can faint from its own move (recoil, poison, burn)
+                    if self.player_monster.current_hp <= 0 and self.state == "enemy_turn":
+                        self.handle_player_faint()
                     return
                 
             elif action == "menu_cancel":
                 self.state = "player_turn"
-                self.message = "What will you do?"
+                self.set_events(prompt("what_will_you_do"))
                 return
         
         elif self.state == "monster_select":
             if action == "menu_select":
-                # Monster selection processing
-                pass
+                self.monster_selection = selection % len(self.player_party.monsters)
+                return
             
             elif action == "menu_confirm":
-                # Monster switch processing
-                pass
+                self.switch_player_monster(self.monster_selection)
+                return
             
-            elif action == "menu_cancel":
+            elif action == "menu_cancel" and not self.forced_switch:
                 self.state = "player_turn"
-                self.message = "What will you do?"
+                self.set_events(prompt("what_will_you_do"))
                 return
         
         elif self.state == "item_select":
@@ -115,26 +218,38 @@ class Battle:
             
             elif action == "menu_cancel":
                 self.state = "player_turn"
-                self.message = "What will you do?"
+                self.set_events(prompt("what_will_you_do"))
                 return
         
         elif self.state == "enemy_turn":
             # Enemy action
             if self.enemy_monster.current_hp > 0:
-                # Select random move
-                enemy_move = random.randint(0, len(self.enemy_monster.moves) - 1)
-                result = self.enemy_monster.use_move(enemy_move, self.player_monster)
-                self.message = result
+                # Select move
+                enemy_move = self.enemy_ai.choose_move(self)
+                if self.recorder:
+                    self.recorder.record_enemy_move(enemy_move)
+                self.set_events(*self.enemy_monster.execute_move(enemy_move, self.player_monster, self.rng))
+                self.player_party.refresh(self.player_party.active)
+                self.enemy_party.refresh(self.enemy_party.active)
+                
+                # The enemy can faint from its own move (recoil, poison, burn)
+                if self.enemy_monster.current_hp <= 0:
+                    self.handle_enemy_faint()
                 
-                # Check if player HP is 0
-                if self.player_monster.current_hp <= 0:
-                    self.handle_player_faint()
-                else:
-                    self.state = "player_turn"
-                    self.message = "What will you do?"
+                # Check if player HP is 0 (unless the enemy's faint ended the battle)
+                if self.state == "enemy_turn":
+                    if self.player_monster.current_hp <= 0:
+                        self.handle_player_faint()
+                    elif self.enemy_monster.current_hp > 0:
+                        self.state = "player_turn"
+                        self.set_events(prompt("what_will_you_do"))
             else:
+                # The trainer sends out its next monster instead of attacking
+                self.enemy_party.switch(self.enemy_party.next_healthy())
+                self.enemy_monster = self.enemy_party.active_monster
                 self.state = "player_turn"
-                self.message = "What will you do?"
+                self.set_events(BattleEvent(SENT_OUT, None, self.enemy_monster, self.trainer.name),
+                                prompt("what_will_you_do"))
             return
         
         elif self.state == "catch":
@@ -147,8 +262,6 @@ class Battle:
     
     def handle_enemy_faint(self):
         """Handle enemy monster fainting"""
-        self.message = f"{self.enemy_monster.name} fainted!"
-        
         # Calculate experience
         self.exp_gain = self.calculate_exp_gain()
         
@@ -156,37 +269,73 @@ class Battle:
         level_up, levels = self.player_monster.gain_exp(self.exp_gain)
         
         if level_up:
-            self.message += f" {self.player_monster.name} gained {levels} level(s)!"
-            
-            # Check evolution
-            can_evolve, _ = self.player_monster.can_evolve()
-            if can_evolve:
-                self.state = "evolution"
-                return
+            self.add_events(BattleEvent(LEVEL_UP, self.player_monster, None, levels))
+        
+        # A trainer with monsters left keeps fighting (the next one comes out on the enemy turn)
+        if self.enemy_party.has_healthy():
+            self.state = "enemy_turn"
+            return
+        
+        if self.trainer:
+            self.player.money += self.trainer.prize_money
+            self.add_events(BattleEvent(TRAINER_DEFEATED, None, None, self.trainer.name),
+                            BattleEvent(PRIZE_MONEY, None, None, self.trainer.prize_money))
+        
+        # Evolution happens after the battle (the game shows it once the battle has ended)
+        if level_up and self.player_monster.can_evolve():
+            self.evolving = self.player_monster
         
         self.state = "end"
         self.result = "win"
     
     def handle_player_faint(self):
         """Handle player monster fainting"""
-        self.message = f"{self.player_monster.name} fainted!"
-        
         # Check if other monsters are available
-        healthy_monsters = [m for m in self.player.monsters if m.current_hp > 0]
-        
-        if healthy_monsters:
+        if self.player_party.has_healthy():
             self.state = "monster_select"
-            self.message += " Choose your next monster."
+            self.forced_switch = True
+            self.monster_selection = self.player_party.next_healthy()
+            self.add_events(BattleEvent(CHOOSE_NEXT, None, None, None))
         else:
             self.state = "end"
             self.result = "lose"
-            self.message += " All your monsters have fainted!"
+            self.add_events(BattleEvent(ALL_FAINTED, None, None, None))
+    
+    def switch_player_monster(self, index):
+        """Send out another party monster (a voluntary switch uses the turn)"""
+        party = self.player_party
+        if not party.is_healthy(index):
+            self.set_events(BattleEvent(CANNOT_BATTLE, None, party.monsters[index], None))
+            return False
+        if index == party.active:
+            self.set_events(BattleEvent(ALREADY_OUT, None, party.monsters[index], None))
+            return False
+        
+        previous = self.player_monster
+        previous.clear_stat_stages()
+        party.switch(index)
+        self.player_monster = party.active_monster
+        
+        if self.forced_switch:
+            self.forced_switch = False
+            if self.enemy_monster.current_hp <= 0:
+                # Both fainted: the trainer sends out its next monster first
+                self.state = "enemy_turn"
+                self.set_events(BattleEvent(GO, None, self.player_monster, None))
+            else:
+                self.state = "player_turn"
+                self.set_events(BattleEvent(GO, None, self.player_monster, None), prompt("what_will_you_do"))
+        else:
+            self.state = "enemy_turn"
+            self.set_events(BattleEvent(WITHDREW, previous, None, None),
+                            BattleEvent(GO, None, self.player_monster, None))
+        return True
     
     def try_catch_monster(self):
         """Try to catch monster"""
         # Only wild monsters can be caught
         if not self.wild_monster:
-            self.message = "Can't catch this monster!"
+            self.set_events(BattleEvent(CANNOT_CATCH, None, self.enemy_monster, None))
             self.state = "player_turn"
             return
         
@@ -195,13 +344,13 @@ class Battle:
         catch_rate = self.enemy_monster.get_catch_rate(ball_bonus)
         
         # Catch determination
-        if random.random() < catch_rate:
-            self.message = f"Caught {self.enemy_monster.name}!"
+        if self.rng.random() < catch_rate:
+            self.set_events(BattleEvent(CAUGHT, None, self.enemy_monster, None))
             self.player.add_monster(self.enemy_monster)
             self.state = "end"
             self.result = "catch"
         else:
-            self.message = f"{self.enemy_monster.name} broke free!"
+            self.set_events(BattleEvent(BROKE_FREE, None, self.enemy_monster, None))
             self.state = "enemy_turn"
     
     def calculate_exp_gain(self):
@@ -209,40 +358,72 @@ class Battle:
         # Base experience (proportional to enemy level)
         base_exp = self.enemy_monster.level * 3
         
-        # Bonus (e.g., 1.5x for trainer battles)
-        bonus = 1.0
+        # Bonus (1.5x for trainer battles)
+        bonus = TRAINER_EXP_BONUS if self.trainer else 1.0
         
         return int(base_exp * bonus)
     
-    def draw(self, screen, font, small_font):
-        """Draw battle screen"""
+    def _switch_row_key(self, i):
+        monster = self.player_party.monsters[i]
+        return (i, monster.name, monster.current_hp, monster.max_hp, self.player_party.is_healthy(i))
+    
+    def _render_switch_row(self, i, selected, width, height, small_font):
+        monster = self.player_party.monsters[i]
+        row = pygame.Surface((width, height))
+        row.fill((255, 255, 255))
+        
+        # Highlight selected monster, grey out fainted ones
+        if selected:
+            color = (255, 0, 0)
+        elif not self.player_party.is_healthy(i):
+            color = (150, 150, 150)
+        else:
+            color = (0, 0, 0)
+        monster_text = small_font.render(f"{monster.name} HP:{monster.current_hp}/{monster.max_hp}", True, color)
+        row.blit(monster_text, (0, 0))
+        return row
+    
+    def draw(self, screen, font, small_font, batch=None):
+        """Draw battle screen (monster sprites go through batch when given)"""
         # Battle screen background
         pygame.draw.rect(screen, (200, 230, 255), (0, 0, 800, 600))
         
+        # Monster sprites, or plain squares until they are loaded
+        if not (batch and batch.add(f"monsters/{self.enemy_monster.species_id}", (600, 100))):
+            pygame.draw.rect(screen, (255, 0, 0), (600, 100, 100, 100))
+        if not (batch and batch.add(f"monsters/{self.player_monster.species_id}", (100, 300))):
+            pygame.draw.rect(screen, (0, 0, 255), (100, 300, 100, 100))
+        if batch:
+            batch.flush(screen)
+        
         # Enemy monster
-        pygame.draw.rect(screen, (255, 0, 0), (600, 100, 100, 100))
-        monster_name = font.render(self.enemy_monster.name, True, (0, 0, 0))
+        monster_name = text_surface(font, self.enemy_monster.name, (0, 0, 0))
         screen.blit(monster_name, (600, 70))
         
+        # Trainer's party: one marker per monster, grey once it has fainted
+        if self.trainer:
+            for i in range(len(self.enemy_party.monsters)):
+                color = (255, 0, 0) if self.enemy_party.is_healthy(i) else (150, 150, 150)
+                pygame.draw.circle(screen, color, (606 + i * 16, 55), 6)
+        
         # HP display
-        hp_text = small_font.render(f"HP: {self.enemy_monster.current_hp}/{self.enemy_monster.max_hp}", True, (0, 0, 0))
+        hp_text = text_surface(small_font, f"HP: {self.enemy_monster.current_hp}/{self.enemy_monster.max_hp}", (0, 0, 0))
         screen.blit(hp_text, (600, 210))
         
         # Player monster
-        pygame.draw.rect(screen, (0, 0, 255), (100, 300, 100, 100))
-        player_monster_name = font.render(self.player_monster.name, True, (0, 0, 0))
+        player_monster_name = text_surface(font, self.player_monster.name, (0, 0, 0))
         screen.blit(player_monster_name, (100, 270))
         
         # HP display
-        player_hp_text = small_font.render(f"HP: {self.player_monster.current_hp}/{self.player_monster.max_hp}", True, (0, 0, 0))
+        player_hp_text = text_surface(small_font, f"HP: {self.player_monster.current_hp}/{self.player_monster.max_hp}", (0, 0, 0))
         screen.blit(player_hp_text, (100, 410))
         
         # Battle text
-        text_box = pygame.Rect(50, 450, 700, 100)
+        text_box = pygame.Rect(50, 450, 700, 145 if self.state == "monster_select" else 100)
         pygame.draw.rect(screen, (255, 255, 255), text_box)
         pygame.draw.rect(screen, (0, 0, 0), text_box, 2)
         
-        battle_text = font.render(self.message, True, (0, 0, 0))
+        battle_text = text_surface(font, self.message, (0, 0, 0))
         screen.blit(battle_text, (60, 460))
         
         # Commands
@@ -254,7 +435,7 @@ class Battle:
                 
                 # Highlight selected command
                 color = (255, 0, 0) if i == self.menu_selection else (0, 0, 0)
-                cmd_text = font.render(cmd, True, color)
+                cmd_text = text_surface(font, cmd, color)
                 screen.blit(cmd_text, (cmd_x, cmd_y))
         
         # Move selection
@@ -265,11 +446,11 @@ class Battle:
                 
                 # Highlight selected move
                 color = (255, 0, 0) if i == self.move_selection else (0, 0, 0)
-                move_text = font.render(move['name'], True, color)
+                move_text = text_surface(font, move['name'], color)
                 screen.blit(move_text, (move_x, move_y))
                 
                 # PP display
-                pp_text = small_font.render(f"PP: {move['current_pp']}/{move['pp']}", True, (0, 0, 0))
+                pp_text = text_surface(small_font, f"PP: {move['current_pp']}/{move['pp']}", (0, 0, 0))
                 screen.blit(pp_text, (move_x + 150, move_y + 5))
         
         # Item selection
@@ -281,17 +462,15 @@ class Battle:
                 
                 # Highlight selected item
                 color = (255, 0, 0) if i == self.menu_selection else (0, 0, 0)
-                item_text = font.render(item, True, color)
+                item_text = text_surface(font, item, color)
                 screen.blit(item_text, (item_x, item_y))
         
         # Monster selection
         elif self.state == "monster_select":
-            for i, monster in enumerate(self.player.monsters):
-                if i < 4:  # Maximum 4 displayed
-                    monster_x = 60 + (i % 2) * 350
-                    monster_y = 500 + (i // 2) * 40
-                    
-                    # Highlight selected monster
-                    color = (255, 0, 0) if i == self.menu_selection else (0, 0, 0)
-                    monster_text = font.render(f"{monster.name} (HP: {monster.current_hp}/{monster.max_hp})", True, color)
-                    screen.blit(monster_text, (monster_x, monster_y))
+            if self.switch_list is None:
+                self.switch_list = VirtualList((60, 490, 680, 100), 25,
+                                               lambda i, selected, width, height: self._render_switch_row(
+                                                   i, selected, width, height, small_font),
+                                               self._switch_row_key)
+            self.switch_list.set_items(range(len(self.player_party.monsters)), self.monster_selection)
+            self.switch_list.draw(screen)
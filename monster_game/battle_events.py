@@ -0,0 +1,207 @@
+from collections import namedtuple
+
+# A single thing that happened in battle.
+#   kind:   one of the event kinds below
+#   actor:  Monster that caused the event (or None)
+#   target: Monster affected by the event (or None)
+#   value:  kind-specific payload (move name, damage, multiplier, prompt key...)
+BattleEvent = namedtuple("BattleEvent", "kind actor target value")
+
+# Event kinds
+APPEARED = "appeared"
+PROMPT = "prompt"
+MOVE_USED = "move_used"
+MISS = "miss"
+DAMAGE = "damage"
+EFFECTIVENESS = "effectiveness"
+STATUS_APPLIED = "status_applied"
+FAINTED = "fainted"
+LEVEL_UP = "level_up"
+NO_PP = "no_pp"
+CONFUSED = "confused"
+WOKE_UP = "woke_up"
+ASLEEP = "asleep"
+FULLY_PARALYZED = "fully_paralyzed"
+ESCAPED = "escaped"
+ESCAPE_FAILED = "escape_failed"
+CAUGHT = "caught"
+BROKE_FREE = "broke_free"
+CANNOT_CATCH = "cannot_catch"
+CHOOSE_NEXT = "choose_next"
+ALL_FAINTED = "all_fainted"
+TRAINER_CHALLENGE = "trainer_challenge"
+SENT_OUT = "sent_out"
+TRAINER_DEFEATED = "trainer_defeated"
+PRIZE_MONEY = "prize_money"
+NO_RUNNING = "no_running"
+WITHDREW = "withdrew"
+GO = "go"
+CANNOT_BATTLE = "cannot_battle"
+ALREADY_OUT = "already_out"
+STAT_CHANGED = "stat_changed"
+RECOIL_DAMAGE = "recoil_damage"
+STATUS_DAMAGE = "status_damage"
+
+# Message templates per locale. Placeholders: {actor}, {target}, {value}.
+# PROMPT events use their value as the template key, EFFECTIVENESS events
+# pick a key from the multiplier (see effectiveness_key). STAT_CHANGED
+# events (value: (stat, change)) use "<stat>_rose"/"<stat>_fell", and
+# STATUS_DAMAGE events (value: status condition) "<status>_damage".
+MESSAGE_TEMPLATES = {
+    "en": {
+        APPEARED: "A wild {target} appeared!",
+        MOVE_USED: "{actor} used {value}!",
+        MISS: "{actor}'s {value} missed!",
+        DAMAGE: "{target} took {value} damage!",
+        "super_effective": "It's super effective!",
+        "not_very_effective": "It's not very effective...",
+        "no_effect": "It has no effect...",
+        STATUS_APPLIED: "{target} is {value}!",
+        FAINTED: "{target} fainted!",
+        LEVEL_UP: "{actor} gained {value} level(s)!",
+        NO_PP: "No PP left for {value}!",
+        CONFUSED: "{actor} is confused!",
+        WOKE_UP: "{actor} woke up!",
+        ASLEEP: "{actor} is sleeping!",
+        FULLY_PARALYZED: "{actor} is paralyzed and can't move!",
+        ESCAPED: "Got away safely!",
+        ESCAPE_FAILED: "Can't escape!",
+        CAUGHT: "Caught {target}!",
+        BROKE_FREE: "{target} broke free!",
+        CANNOT_CATCH: "Can't catch this monster!",
+        CHOOSE_NEXT: "Choose your next monster.",
+        ALL_FAINTED: "All your monsters have fainted!",
+        TRAINER_CHALLENGE: "{value} wants to battle!",
+        SENT_OUT: "{value} sent out {target}!",
+        TRAINER_DEFEATED: "{value} was defeated!",
+        PRIZE_MONEY: "You got ${value} for winning!",
+        NO_RUNNING: "There's no running from a trainer battle!",
+        WITHDREW: "{actor}, come back!",
+        GO: "Go! {target}!",
+        CANNOT_BATTLE: "{target} has no energy left to battle!",
+        ALREADY_OUT: "{target} is already in battle!",
+        "what_will_you_do": "What will you do?",
+        "choose_move": "Choose a move",
+        "choose_monster": "Choose a monster",
+        "choose_item": "Choose an item",
+        # Status condition names used by STATUS_APPLIED
+        "paralysis": "paralyzed",
+        "sleep": "asleep",
+        "poison": "poisoned",
+        "burn": "burned",
+        RECOIL_DAMAGE: "{actor} is hit with recoil!",
+        "poison_damage": "{actor} is hurt by poison!",
+        "burn_damage": "{actor} is hurt by its burn!",
+        "attack_rose": "{target}'s Attack rose!",
+        "attack_fell": "{target}'s Attack fell!",
+        "defense_rose": "{target}'s Defense rose!",
+        "defense_fell": "{target}'s Defense fell!",
+    },
+    "ja": {
+        APPEARED: "野生の{target}が現れた！",
+        MOVE_USED: "{actor}の{value}！",
+        MISS: "{actor}の{value}は外れた！",
+        DAMAGE: "{target}に{value}のダメージ！",
+        "super_effective": "効果は抜群だ！",
+        "not_very_effective": "効果はいまひとつのようだ…",
+        "no_effect": "効果がないようだ…",
+        STATUS_APPLIED: "{target}は{value}！",
+        FAINTED: "{target}は倒れた！",
+        LEVEL_UP: "{actor}のレベルが{value}上がった！",
+        NO_PP: "{value}のPPが残っていない！",
+        CONFUSED: "{actor}は混乱している！",
+        WOKE_UP: "{actor}は目を覚ました！",
+        ASLEEP: "{actor}は眠っている！",
+        FULLY_PARALYZED: "{actor}は体がしびれて動けない！",
+        ESCAPED: "うまく逃げ切れた！",
+        ESCAPE_FAILED: "逃げられない！",
+        CAUGHT: "{target}を捕まえた！",
+        BROKE_FREE: "{target}はボールから出てしまった！",
+        CANNOT_CATCH: "このモンスターは捕まえられない！",
+        CHOOSE_NEXT: "次のモンスターを選んでください。",
+        ALL_FAINTED: "手持ちのモンスターは全滅した！",
+        TRAINER_CHALLENGE: "{value}が勝負をしかけてきた！",
+        SENT_OUT: "{value}は{target}を繰り出した！",
+        TRAINER_DEFEATED: "{value}との勝負に勝った！",
+        PRIZE_MONEY: "賞金として{value}円を手に入れた！",
+        NO_RUNNING: "トレーナーとの勝負から逃げることはできない！",
+        WITHDREW: "戻れ、{actor}！",
+        GO: "行け！{target}！",
+        CANNOT_BATTLE: "{target}は戦える状態ではない！",
+        ALREADY_OUT: "{target}はすでに戦っている！",
+        "what_will_you_do": "どうする？",
+        "choose_move": "技を選んでください",
+        "choose_monster": "モンスターを選んでください",
+        "choose_item": "道具を選んでください",
+        "paralysis": "まひした",
+        "sleep": "眠ってしまった",
+        "poison": "毒を受けた",
+        "burn": "やけどを負った",
+        RECOIL_DAMAGE: "{actor}は反動でダメージを受けた！",
+        "poison_damage": "{actor}は毒のダメージを受けている！",
+        "burn_damage": "{actor}はやけどのダメージを受けている！",
+        "attack_rose": "{target}の攻撃が上がった！",
+        "attack_fell": "{target}の攻撃が下がった！",
+        "defense_rose": "{target}の防御が上がった！",
+        "defense_fell": "{target}の防御が下がった！",
+    },
+}
+
+DEFAULT_LOCALE = "en"
+_current_locale = DEFAULT_LOCALE
+
+
+def set_locale(locale):
+    """Set the locale used when no locale is given explicitly"""
+    global _current_locale
+    if locale not in MESSAGE_TEMPLATES:
+        raise ValueError(f"Unknown locale: {locale}")
+    _current_locale = locale
+
+
+def effectiveness_key(multiplier):
+    """Template key for a type effectiveness multiplier (None if no text)"""
+    if multiplier > 1.5:
+        return "super_effective"
+    elif multiplier < 0.5 and multiplier > 0:
+        return "not_very_effective"
+    elif multiplier == 0:
+        return "no_effect"
+    return None
+
+
+def format_event(event, locale=None):
+    """Format one event as text"""
+    templates = MESSAGE_TEMPLATES[locale or _current_locale]
+
+    if event.kind == PROMPT:
+        return templates[event.value]
+    elif event.kind == EFFECTIVENESS:
+        key = effectiveness_key(event.value)
+        return templates[key] if key else ""
+
+    key = event.kind
+    value = event.value
+    if event.kind == STATUS_APPLIED:
+        value = templates[value]
+    elif event.kind == STATUS_DAMAGE:
+        key = f"{value}_damage"
+    elif event.kind == STAT_CHANGED:
+        stat, change = value
+        key = f"{stat}_rose" if change > 0 else f"{stat}_fell"
+
+    return templates[key].format(
+        actor=event.actor.name if event.actor else "",
+        target=event.target.name if event.target else "",
+        value=value)
+
+
+def format_events(events, locale=None):
+    """Format a sequence of events as one message"""
+    texts = [format_event(event, locale) for event in events]
+    return " ".join(text for text in texts if text)
+
+
+def prompt(key):
+    """Event for a menu prompt such as "what_will_you_do" """
+    return BattleEvent(PROMPT, None, None, key)
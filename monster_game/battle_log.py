@@ -0,0 +1,235 @@
+import struct
+import sys
+from monster import Monster, STATUS_CONDITIONS, create_move
+from player import Player
+from battle import Battle, BATTLE_RESULTS
+from enemy_ai import ScriptedAI
+from trainer import Trainer
+from monster_data import TRAINERS
+
+# Battle log binary format (little endian)
+#   header:  magic "MBLG", version (B), seed (Q)
+#   parties: count (B) + monster records for the player, then for the enemy,
+#            followed by the player's active monster index (B)
+#   trainer: trainer battle flag (B), trainer ID (H), enemy active index (B)
+#   monster: species (H), level (H), exp (I), exp_to_next_level (I),
+#            current_hp (H), status (B), move count (B), (move id (H), pp (H)) * count
+#   actions: action code (B) + selection (h) per Battle.update call, and an
+#            "enemy_move" record with the move index for each enemy AI choice
+#   footer:  END_ACTION (B), result code (B), player HP (H), enemy HP (H)
+LOG_MAGIC = b"MBLG"
+LOG_VERSION = 3
+
+HEADER = struct.Struct("<4sBQ")
+MONSTER_RECORD = struct.Struct("<HHIIHBB")
+MOVE_RECORD = struct.Struct("<HH")
+ACTION_RECORD = struct.Struct("<Bh")
+TRAINER_RECORD = struct.Struct("<BHB")
+OUTCOME_RECORD = struct.Struct("<BHH")
+
+ACTIONS = (None, "menu_select", "menu_confirm", "menu_cancel", "enemy_move")
+ACTION_CODES = {action: code for code, action in enumerate(ACTIONS)}
+END_ACTION = 0xFF
+NO_SELECTION = -32768
+
+RESULTS = BATTLE_RESULTS
+RESULT_CODES = {result: code for code, result in enumerate(RESULTS)}
+
+
+def _pack_monster(monster):
+    data = [MONSTER_RECORD.pack(
+        monster.species_id, monster.level, monster.exp, monster.exp_to_next_level,
+        monster.current_hp, STATUS_CONDITIONS.index(monster.status_condition),
+        len(monster.moves))]
+    for move in monster.moves:
+        data.append(MOVE_RECORD.pack(move['id'], move['current_pp']))
+    return b"".join(data)
+
+
+def _unpack_monster(data, offset, is_wild):
+    species_id, level, exp, exp_to_next_level, current_hp, status, move_count = \
+        MONSTER_RECORD.unpack_from(data, offset)
+    offset += MONSTER_RECORD.size
+
+    moves = []
+    for _ in range(move_count):
+        move_id, current_pp = MOVE_RECORD.unpack_from(data, offset)
+        offset += MOVE_RECORD.size
+        moves.append((move_id, current_pp))
+
+    monster_data = {
+        'species_id': species_id,
+        'level': level,
+        'exp': exp,
+        'exp_to_next_level': exp_to_next_level,
+        'current_hp': current_hp,
+        'moves': moves,
+        'status_condition': STATUS_CONDITIONS[status],
+        'is_wild': is_wild
+    }
+    return monster_data, offset
+
+
+class BattleRecorder:
+    """Records a battle as seed + initial parties + player inputs"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.finished = False
+
+    def begin(self, battle):
+        """Write the header and the starting state of both sides"""
+        self.buffer += HEADER.pack(LOG_MAGIC, LOG_VERSION, battle.seed)
+
+        for party in (battle.player_party, battle.enemy_party):
+            self.buffer.append(len(party.monsters))
+            for monster in party.monsters:
+                self.buffer += _pack_monster(monster)
+
+        self.buffer.append(battle.player_party.active)
+
+        trainer = battle.trainer
+        self.buffer += TRAINER_RECORD.pack(
+            1 if trainer else 0, trainer.trainer_id if trainer else 0, battle.enemy_party.active)
+
+    def record(self, action, selection):
+        """Record one Battle.update call"""
+        if selection is None:
+            selection = NO_SELECTION
+        self.buffer += ACTION_RECORD.pack(ACTION_CODES[action], selection)
+
+    def record_enemy_move(self, move_index):
+        """Record the enemy AI's choice so replays don't depend on the AI"""
+        self.buffer += ACTION_RECORD.pack(ACTION_CODES["enemy_move"], move_index)
+
+    def finish(self, battle):
+        """Write the outcome used to verify replays"""
+        if self.finished:
+            return
+        self.buffer.append(END_ACTION)
+        self.buffer += OUTCOME_RECORD.pack(
+            RESULT_CODES[battle.result],
+            battle.player_monster.current_hp,
+            battle.enemy_monster.current_hp)
+        self.finished = True
+
+    def to_bytes(self):
+        return bytes(self.buffer)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.buffer)
+
+
+class BattleLog:
+    """Parsed battle log"""
+
+    def __init__(self, seed, player_monsters, enemy_monsters, active_index, actions, outcome,
+                 trainer_id=None, enemy_active_index=0):
+        self.seed = seed
+        self.player_monsters = player_monsters
+        self.enemy_monsters = enemy_monsters
+        self.active_index = active_index
+        self.trainer_id = trainer_id  # None for wild battles
+        self.enemy_active_index = enemy_active_index
+        self.actions = actions
+        self.outcome = outcome  # (result, player HP, enemy HP) or None
+
+    @classmethod
+    def parse(cls, data):
+        magic, version, seed = HEADER.unpack_from(data, 0)
+        if magic != LOG_MAGIC or version != LOG_VERSION:
+            raise ValueError("Not a battle log")
+        offset = HEADER.size
+
+        sides = []
+        for is_wild in (False, True):
+            count = data[offset]
+            offset += 1
+            side = []
+            for _ in range(count):
+                monster_data, offset = _unpack_monster(data, offset, is_wild)
+                side.append(monster_data)
+            sides.append(side)
+
+        active_index = data[offset]
+        offset += 1
+
+        is_trainer, trainer_id, enemy_active_index = TRAINER_RECORD.unpack_from(data, offset)
+        offset += TRAINER_RECORD.size
+
+        actions = []
+        outcome = None
+        while offset < len(data):
+            if data[offset] == END_ACTION:
+                result, player_hp, enemy_hp = OUTCOME_RECORD.unpack_from(data, offset + 1)
+                outcome = (RESULTS[result], player_hp, enemy_hp)
+                break
+            code, selection = ACTION_RECORD.unpack_from(data, offset)
+            offset += ACTION_RECORD.size
+            actions.append((ACTIONS[code], None if selection == NO_SELECTION else selection))
+
+        return cls(seed, sides[0], sides[1], active_index, actions, outcome,
+                   trainer_id if is_trainer else None, enemy_active_index)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.parse(f.read())
+
+
+def _restore_monster(monster_data):
+    moves = monster_data['moves']
+    monster_data = dict(monster_data, moves=[])
+    monster = Monster.from_dict(monster_data)
+    for move_id, current_pp in moves:
+        move = create_move(move_id)
+        move['current_pp'] = current_pp
+        monster.moves.append(move)
+    return monster
+
+
+def replay(log):
+    """Re-run a battle log headlessly
+
+    Returns (matches, expected, actual) where expected/actual are
+    (result, player HP, enemy HP) tuples.
+    """
+    if isinstance(log, (bytes, bytearray)):
+        log = BattleLog.parse(log)
+
+    player = Player("Replay")
+    player.monsters = [_restore_monster(data) for data in log.player_monsters]
+    player.active_monster = log.active_index
+    enemies = [_restore_monster(data) for data in log.enemy_monsters]
+
+    enemy_moves = [selection for action, selection in log.actions if action == "enemy_move"]
+    if log.trainer_id is None:
+        battle = Battle(player, enemies[0], seed=log.seed, enemy_ai=ScriptedAI(enemy_moves))
+    else:
+        name, prize_money = TRAINERS.get(log.trainer_id, ("Trainer", 0))[:2]
+        trainer = Trainer(name, enemies, prize_money, log.trainer_id)
+        trainer.active_monster = log.enemy_active_index
+        battle = Battle(player, trainer=trainer, seed=log.seed, enemy_ai=ScriptedAI(enemy_moves))
+    for action, selection in log.actions:
+        if action != "enemy_move":
+            battle.update(action, selection)
+
+    actual = (battle.result, battle.player_monster.current_hp, battle.enemy_monster.current_hp)
+    return actual == log.outcome, log.outcome, actual
+
+
+def main(paths):
+    """Replay log files and report mismatches"""
+    failures = 0
+    for path in paths:
+        matches, expected, actual = replay(BattleLog.load(path))
+        if not matches:
+            failures += 1
+            print(f"MISMATCH {path}: expected {expected}, got {actual}")
+    print(f"{len(paths) - failures}/{len(paths)} battle logs replayed identically")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,546 @@
+import argparse
+import asyncio
+import os
+import random
+import struct
+import time
+from collections import OrderedDict, namedtuple
+
+# Headless server; keep pygame quiet
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+from monster import Monster
+from player import Player
+from battle import Battle, BATTLE_STATES, BATTLE_RESULTS
+from battle_log import ACTIONS, ACTION_CODES, ACTION_RECORD, NO_SELECTION
+from enemy_ai import QueuedAI, DIFFICULTY_LEVELS, create_enemy_ai
+from trainer import Trainer, create_trainer
+from simulation import MAX_TURNS
+from monster_data import MONSTER_SPECIES, TRAINERS
+
+# Battle server protocol (little endian)
+#
+# Every message is a frame: payload length (H) + payload. Every payload
+# starts with the message type (B).
+#
+# Client -> server
+#   START_PVE: difficulty (B, index into DIFFICULTY_LEVELS),
+#              enemy kind (B: 0 wild, 1 trainer), enemy ID (H: species or trainer),
+#              wild level (H), seed (Q, 0 = random), party
+#   JOIN_PVP:  room ID (I), party. The first player waits, the second starts the battle
+#   ACTION:    action code (B) + selection (h), codes as in battle_log.ACTIONS.
+#              In PvP the second player sends "enemy_move" with a move index
+#   LEAVE:     no body
+#   party:     count (B) + (species ID (H), level (H)) per monster
+#
+# Server -> client
+#   STATE:     battle ID (I), side (B), state code (B), result code (B),
+#              own active index (B), own HP (H), own max HP (H),
+#              opponent species (H), opponent level (H), opponent HP (H),
+#              opponent max HP (H), message length (H) + UTF-8 message
+#   WAITING:   room ID (I)
+#   ERROR:     error code (B)
+FRAME = struct.Struct("<H")
+MESSAGE_TYPE = struct.Struct("<B")
+START_PVE = struct.Struct("<BBBHHQ")
+JOIN_PVP = struct.Struct("<BI")
+PARTY_MEMBER = struct.Struct("<HH")
+STATE = struct.Struct("<BIBBBBHHHHHHH")
+WAITING = struct.Struct("<BI")
+ERROR = struct.Struct("<BB")
+
+MSG_START_PVE = 1
+MSG_JOIN_PVP = 2
+MSG_ACTION = 3
+MSG_LEAVE = 4
+MSG_STATE = 10
+MSG_WAITING = 11
+MSG_ERROR = 12
+
+# Error codes
+ERROR_BAD_MESSAGE = 1
+ERROR_NO_BATTLE = 2
+ERROR_NOT_YOUR_TURN = 3
+ERROR_SERVER_FULL = 4
+ERROR_EVICTED = 5
+ERROR_OPPONENT_LEFT = 6
+
+ServerState = namedtuple("ServerState", "battle_id side state result active hp max_hp "
+                                        "opponent_species opponent_level opponent_hp "
+                                        "opponent_max_hp message")
+
+MAX_PARTY_SIZE = 6
+MAX_LEVEL = 100
+
+# Battles without any action for this long are dropped
+IDLE_TIMEOUT = 300.0
+MAX_BATTLES = 20000
+
+# Pending connections; kiosks tend to reconnect all at once after a restart
+BACKLOG = 4096
+
+# Backpressure: replies wait (and the connection stops being read) above
+# WRITE_HIGH_WATER bytes of unsent output. A connection whose unsent output
+# reaches MAX_PENDING_BYTES through pushes from its opponent is closed.
+WRITE_HIGH_WATER = 16 * 1024
+MAX_PENDING_BYTES = 256 * 1024
+
+
+def _error(code):
+    return ERROR.pack(MSG_ERROR, code)
+
+
+def _pack_party(party):
+    data = [bytes([len(party)])]
+    for species_id, level in party:
+        data.append(PARTY_MEMBER.pack(species_id, level))
+    return b"".join(data)
+
+
+def _unpack_party(payload, offset):
+    """Party monsters from a message (None if the party is invalid)"""
+    if offset >= len(payload):
+        return None
+    count = payload[offset]
+    offset += 1
+    if not 1 <= count <= MAX_PARTY_SIZE or len(payload) != offset + count * PARTY_MEMBER.size:
+        return None
+
+    monsters = []
+    for species_id, level in PARTY_MEMBER.iter_unpack(payload[offset:]):
+        if species_id not in MONSTER_SPECIES or not 1 <= level <= MAX_LEVEL:
+            return None
+        monsters.append(Monster(species_id, level))
+    return monsters
+
+
+class _Connection:
+    """One client connection (plays at most one battle at a time)"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.session = None
+        self.side = 0  # 0: player side, 1: enemy side (second PvP player)
+        self.room_id = None  # PvP room this connection is waiting in
+        self.closed = False
+        writer.transport.set_write_buffer_limits(high=WRITE_HIGH_WATER)
+
+    def push(self, payload):
+        """Queue a message without waiting (used for notifications)"""
+        if self.closed:
+            return
+        if self.writer.transport.get_write_buffer_size() > MAX_PENDING_BYTES:
+            # The client stopped reading; drop it instead of buffering without limit
+            self.close()
+            return
+        self.writer.write(FRAME.pack(len(payload)) + payload)
+
+    async def send(self, payload):
+        """Send a reply and wait while the client is slow to read it"""
+        self.push(payload)
+        if not self.closed:
+            await self.writer.drain()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.writer.close()
+
+
+class _Session:
+    """One hosted battle"""
+
+    def __init__(self, battle_id, battle, connections, queued_ai=None):
+        self.battle_id = battle_id
+        self.battle = battle
+        self.connections = connections  # Indexed by side
+        self.queued_ai = queued_ai  # Moves of the second player in PvP
+        self.last_active = time.monotonic()
+
+    def state_message(self, side):
+        battle = self.battle
+        if side == 0:
+            own_party, opponent = battle.player_party, battle.enemy_monster
+        else:
+            own_party, opponent = battle.enemy_party, battle.player_monster
+        own = own_party.active_monster
+        message = battle.message.encode("utf-8")[:0xFFFF]
+        return STATE.pack(
+            MSG_STATE, self.battle_id, side,
+            BATTLE_STATES.index(battle.state), BATTLE_RESULTS.index(battle.result),
+            own_party.active, own.current_hp, own.max_hp,
+            opponent.species_id, opponent.level, opponent.current_hp, opponent.max_hp,
+            len(message)) + message
+
+
+class BattleServer:
+    """Hosts many concurrent headless battles on one event loop
+
+    Battles use the normal Battle rules and are advanced only when a client
+    sends an action, so an idle battle costs nothing but memory. Battles are
+    kept in order of last activity, which makes idle eviction a walk over
+    the oldest entries only.
+    """
+
+    def __init__(self, idle_timeout=IDLE_TIMEOUT, max_battles=MAX_BATTLES):
+        self.idle_timeout = idle_timeout
+        self.max_battles = max_battles
+        self.sessions = OrderedDict()  # battle ID -> session, least recently active first
+        self.rooms = {}  # room ID -> (waiting connection, party)
+        self.next_battle_id = 1
+        self.server = None
+        self._evictor = None
+
+        # Counters
+        self.battles_started = 0
+        self.battles_finished = 0
+        self.evictions = 0
+        self.peak_battles = 0
+
+    async def start(self, host="127.0.0.1", port=0, path=None):
+        """Listen on TCP (port 0 picks a free port) or on a Unix socket path"""
+        if path:
+            self.server = await asyncio.start_unix_server(self.handle_connection, path, backlog=BACKLOG)
+        else:
+            self.server = await asyncio.start_server(self.handle_connection, host, port, backlog=BACKLOG)
+        self._evictor = asyncio.create_task(self._evict_loop())
+        return self.server
+
+    @property
+    def address(self):
+        return self.server.sockets[0].getsockname()
+
+    async def close(self):
+        if self._evictor:
+            self._evictor.cancel()
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def handle_connection(self, reader, writer):
+        connection = _Connection(reader, writer)
+        try:
+            while not connection.closed:
+                header = await reader.readexactly(FRAME.size)
+                payload = await reader.readexactly(FRAME.unpack(header)[0])
+                reply = self.handle_message(connection, payload)
+                if reply:
+                    await connection.send(reply)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._leave(connection)
+            connection.close()
+
+    def handle_message(self, connection, payload):
+        """Process one message; returns the reply payload"""
+        if not payload:
+            return _error(ERROR_BAD_MESSAGE)
+        message_type = payload[0]
+
+        if message_type == MSG_START_PVE:
+            return self._start_pve(connection, payload)
+        elif message_type == MSG_JOIN_PVP:
+            return self._join_pvp(connection, payload)
+        elif message_type == MSG_ACTION:
+            return self._action(connection, payload)
+        elif message_type == MSG_LEAVE:
+            self._leave(connection)
+            return None
+        return _error(ERROR_BAD_MESSAGE)
+
+    def _start_pve(self, connection, payload):
+        if len(payload) < START_PVE.size:
+            return _error(ERROR_BAD_MESSAGE)
+        _, difficulty, enemy_kind, enemy_id, level, seed = START_PVE.unpack_from(payload)
+        monsters = _unpack_party(payload, START_PVE.size)
+        if monsters is None or difficulty >= len(DIFFICULTY_LEVELS):
+            return _error(ERROR_BAD_MESSAGE)
+
+        if enemy_kind == 0 and enemy_id in MONSTER_SPECIES and 1 <= level <= MAX_LEVEL:
+            wild_monster, trainer = Monster(enemy_id, level, is_wild=True), None
+        elif enemy_kind == 1 and enemy_id in TRAINERS:
+            wild_monster, trainer = None, create_trainer(enemy_id)
+        else:
+            return _error(ERROR_BAD_MESSAGE)
+
+        self._leave(connection)
+        if len(self.sessions) >= self.max_battles:
+            return _error(ERROR_SERVER_FULL)
+
+        player = Player("Guest")
+        player.monsters = monsters
+        battle = Battle(player, wild_monster, trainer, seed=seed or None,
+                        enemy_ai=create_enemy_ai(DIFFICULTY_LEVELS[difficulty]))
+        session = self._add_session(battle, [connection])
+        connection.side = 0
+        return session.state_message(0)
+
+    def _join_pvp(self, connection, payload):
+        if len(payload) < JOIN_PVP.size:
+            return _error(ERROR_BAD_MESSAGE)
+        _, room_id = JOIN_PVP.unpack_from(payload)
+        monsters = _unpack_party(payload, JOIN_PVP.size)
+        if monsters is None:
+            return _error(ERROR_BAD_MESSAGE)
+
+        self._leave(connection)
+        waiting = self.rooms.pop(room_id, None)
+        if waiting is None:
+            self.rooms[room_id] = (connection, monsters)
+            connection.room_id = room_id
+            return WAITING.pack(MSG_WAITING, room_id)
+        if len(self.sessions) >= self.max_battles:
+            self.rooms[room_id] = waiting
+            return _error(ERROR_SERVER_FULL)
+
+        # The player who waited is the player side; the newcomer plays the "trainer"
+        first, first_monsters = waiting
+        first.room_id = None
+        player = Player("Player 1")
+        player.monsters = first_monsters
+        queued_ai = QueuedAI()
+        battle = Battle(player, trainer=Trainer("Player 2", monsters), enemy_ai=queued_ai)
+        session = self._add_session(battle, [first, connection], queued_ai)
+        first.side, connection.side = 0, 1
+        first.push(session.state_message(0))
+        return session.state_message(1)
+
+    def _action(self, connection, payload):
+        if len(payload) != 1 + ACTION_RECORD.size:
+            return _error(ERROR_BAD_MESSAGE)
+        code, selection = ACTION_RECORD.unpack_from(payload, 1)
+        if code >= len(ACTIONS):
+            return _error(ERROR_BAD_MESSAGE)
+        action = ACTIONS[code]
+        selection = None if selection == NO_SELECTION else selection
+
+        session = connection.session
+        if session is None:
+            return _error(ERROR_NO_BATTLE)
+        battle = session.battle
+
+        # In PvP the enemy turn waits for the second player's move
+        enemy_to_move = (session.queued_ai is not None and battle.state == "enemy_turn"
+                         and battle.enemy_monster.current_hp > 0)
+        if connection.side == 1:
+            if not enemy_to_move or action != "enemy_move" or selection is None:
+                return _error(ERROR_NOT_YOUR_TURN)
+            session.queued_ai.push(selection)
+            battle.update()
+        else:
+            if enemy_to_move or action == "enemy_move":
+                return _error(ERROR_NOT_YOUR_TURN)
+            if selection is not None or action in ("menu_confirm", "menu_cancel", None):
+                battle.update(action, selection)
+            else:
+                return _error(ERROR_BAD_MESSAGE)
+
+        self._touch(session)
+        reply = session.state_message(connection.side)
+        for side, other in enumerate(session.connections):
+            if other is not connection:
+                other.push(session.state_message(side))
+        if battle.result is not None:
+            self._end(session)
+        return reply
+
+    def _add_session(self, battle, connections, queued_ai=None):
+        session = _Session(self.next_battle_id, battle, connections, queued_ai)
+        self.next_battle_id = self.next_battle_id % 0xFFFFFFFF + 1
+        self.sessions[session.battle_id] = session
+        for connection in connections:
+            connection.session = session
+        self.battles_started += 1
+        self.peak_battles = max(self.peak_battles, len(self.sessions))
+        return session
+
+    def _touch(self, session):
+        session.last_active = time.monotonic()
+        self.sessions.move_to_end(session.battle_id)
+
+    def _end(self, session, notify=None):
+        """Remove a battle; notify gets an error code sent to its players"""
+        if self.sessions.pop(session.battle_id, None) is None:
+            return
+        for connection in session.connections:
+            if connection.session is session:
+                connection.session = None
+                if notify:
+                    connection.push(_error(notify))
+        if session.battle.result is not None:
+            self.battles_finished += 1
+
+    def _leave(self, connection):
+        """Drop the connection's battle or PvP room"""
+        if connection.room_id is not None:
+            if self.rooms.get(connection.room_id, (None,))[0] is connection:
+                del self.rooms[connection.room_id]
+            connection.room_id = None
+        session = connection.session
+        if session:
+            connection.session = None
+            self._end(session, ERROR_OPPONENT_LEFT)
+
+    def evict_idle(self, now=None):
+        """Drop battles idle for longer than idle_timeout; returns how many"""
+        deadline = (now or time.monotonic()) - self.idle_timeout
+        evicted = 0
+        while self.sessions:
+            session = next(iter(self.sessions.values()))
+            if session.last_active > deadline:
+                break
+            self._end(session, ERROR_EVICTED)
+            evicted += 1
+        self.evictions += evicted
+        return evicted
+
+    async def _evict_loop(self):
+        while True:
+            await asyncio.sleep(min(self.idle_timeout / 4, 30.0))
+            self.evict_idle()
+
+
+class BattleClient:
+    """Minimal client for the battle server (used for tests and load runs)"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, host="127.0.0.1", port=None, path=None):
+        if path:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def request(self, payload):
+        self.writer.write(FRAME.pack(len(payload)) + payload)
+        await self.writer.drain()
+        return await self.receive()
+
+    async def receive(self):
+        """Next message as (type, data): a ServerState, a room ID or an error code"""
+        header = await self.reader.readexactly(FRAME.size)
+        payload = await self.reader.readexactly(FRAME.unpack(header)[0])
+        message_type = payload[0]
+        if message_type == MSG_STATE:
+            fields = STATE.unpack_from(payload)
+            message = payload[STATE.size:].decode("utf-8")
+            return MSG_STATE, ServerState(*fields[1:-1], message)
+        elif message_type == MSG_WAITING:
+            return MSG_WAITING, WAITING.unpack(payload)[1]
+        return MSG_ERROR, ERROR.unpack(payload)[1]
+
+    async def start_pve(self, party, enemy_id, level=5, trainer=False, difficulty=0, seed=0):
+        """party: [(species ID, level), ...]"""
+        return await self.request(START_PVE.pack(MSG_START_PVE, difficulty, int(trainer),
+                                                 enemy_id, level, seed) + _pack_party(party))
+
+    async def join_pvp(self, room_id, party):
+        return await self.request(JOIN_PVP.pack(MSG_JOIN_PVP, room_id) + _pack_party(party))
+
+    async def action(self, action=None, selection=None):
+        if selection is None:
+            selection = NO_SELECTION
+        return await self.request(MESSAGE_TYPE.pack(MSG_ACTION) +
+                                  ACTION_RECORD.pack(ACTION_CODES[action], selection))
+
+    async def leave(self):
+        payload = MESSAGE_TYPE.pack(MSG_LEAVE)
+        self.writer.write(FRAME.pack(len(payload)) + payload)
+        await self.writer.drain()
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def play_random_battle(client, rng, party_size=3, max_turns=MAX_TURNS):
+    """Play a PvE battle with random choices; returns the result
+
+    Battles that go on for more than max_turns (e.g. both sides out of PP)
+    are left and count as draws (None).
+    """
+    species = [s for s in MONSTER_SPECIES if s in (1, 4, 7, 10, 13, 15)]
+    party = [(rng.choice(species), rng.randint(5, 20)) for _ in range(party_size)]
+    if rng.random() < 0.5:
+        kind, state = await client.start_pve(party, rng.choice(species), rng.randint(3, 15))
+    else:
+        kind, state = await client.start_pve(party, rng.choice(list(TRAINERS)), trainer=True)
+    if kind != MSG_STATE:
+        return None
+
+    kind, state = await client.action()  # start -> player_turn
+    turns = 0
+    while kind == MSG_STATE and BATTLE_RESULTS[state.result] is None:
+        phase = BATTLE_STATES[state.state]
+        if phase == "player_turn":
+            turns += 1
+            if turns > max_turns:
+                await client.leave()
+                return None
+            await client.action("menu_select", 0)
+            await client.action("menu_confirm")
+            await client.action("menu_select", rng.randint(0, 3))
+            kind, state = await client.action("menu_confirm")
+        elif phase == "monster_select":
+            await client.action("menu_select", rng.randint(0, party_size - 1))
+            kind, state = await client.action("menu_confirm")
+        else:
+            kind, state = await client.action()
+    return BATTLE_RESULTS[state.result] if kind == MSG_STATE else None
+
+
+async def run_load(clients=1000, battles_per_client=1, path=None, seed=0):
+    """Start a server on loopback and play many battles against it at once"""
+    server = BattleServer()
+    await server.start(path=path)
+    address = {"path": path} if path else {"port": server.address[1]}
+
+    async def run_client(index):
+        rng = random.Random(seed * 1000003 + index)
+        client = await BattleClient.connect(**address)
+        try:
+            return [await play_random_battle(client, rng) for _ in range(battles_per_client)]
+        finally:
+            await client.close()
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(run_client(i) for i in range(clients)))
+    elapsed = time.perf_counter() - start
+    await server.close()
+    return server, [result for client_results in results for result in client_results], elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless battle server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", default=None, help="listen on a Unix socket instead of TCP")
+    parser.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT)
+    parser.add_argument("--load-test", type=int, default=0, metavar="CLIENTS",
+                        help="play CLIENTS concurrent battles against a loopback server and exit")
+    args = parser.parse_args(argv)
+
+    if args.load_test:
+        server, results, elapsed = asyncio.run(run_load(args.load_test, path=args.unix))
+        wins = results.count("win")
+        print(f"{len(results)} battles in {elapsed:.2f}s ({len(results) / elapsed:.0f}/s), "
+              f"peak {server.peak_battles} concurrent, {wins} wins")
+        return
+
+    async def serve():
+        server = BattleServer(idle_timeout=args.idle_timeout)
+        await server.start(args.host, args.port, args.unix)
+        print(f"Battle server listening on {args.unix or server.address}")
+        await server.server.serve_forever()
+
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import copy
+import hashlib
+import random
+import struct
+from monster import STATUS_CONDITIONS, create_move
+from battle import BATTLE_STATES, BATTLE_RESULTS
+from storage import MonsterStorage
+
+# Compact battle state
+#
+# A snapshot is a flat tuple of ints:
+#   (state, result, menu selection, move selection, exp gain,
+#    player active index, enemy active index, player count, enemy count,
+#    monster selection, forced switch flag,
+#    then MONSTER_FIELDS ints per monster: player party first, then enemy side)
+# followed by the two RNG states when include_rng is set.
+#
+# Monster fields: level, exp, exp_to_next_level, current HP, status,
+# status counter, attack stage, defense stage, 4 move IDs, 4 current PP
+# (0 for empty move slots).
+MAX_MOVES = 4
+MOVES_OFFSET = 8
+MONSTER_FIELDS = MOVES_OFFSET + 2 * MAX_MOVES
+HEADER_FIELDS = 11
+
+STATE_CODES = {state: code for code, state in enumerate(BATTLE_STATES)}
+RESULT_CODES = {result: code for code, result in enumerate(BATTLE_RESULTS)}
+STATUS_CODES = {status: code for code, status in enumerate(STATUS_CONDITIONS)}
+
+
+def enemy_side(battle):
+    """Monsters on the enemy side of a battle"""
+    return battle.enemy_party.monsters
+
+
+def _pack_monster(monster, out):
+    moves = monster.moves
+    out += (monster.level, monster.exp, monster.exp_to_next_level, monster.current_hp,
+            STATUS_CODES[monster.status_condition], monster.status_counter,
+            monster.attack_stage, monster.defense_stage)
+    ids = [move['id'] for move in moves]
+    pps = [move['current_pp'] for move in moves]
+    padding = [0] * (MAX_MOVES - len(moves))
+    out += ids + padding + pps + padding
+
+
+def _unpack_monster(monster, data, offset):
+    level = data[offset]
+    if level != monster.level:
+        monster.level = level
+        monster.calculate_stats()
+    monster.exp = data[offset + 1]
+    monster.exp_to_next_level = data[offset + 2]
+    monster.current_hp = data[offset + 3]
+    monster.status_condition = STATUS_CONDITIONS[data[offset + 4]]
+    monster.status_counter = data[offset + 5]
+    monster.attack_stage = data[offset + 6]
+    monster.defense_stage = data[offset + 7]
+
+    ids = data[offset + MOVES_OFFSET:offset + MOVES_OFFSET + MAX_MOVES]
+    pps = data[offset + MOVES_OFFSET + MAX_MOVES:offset + MONSTER_FIELDS]
+    moves = monster.moves
+    if len(moves) != MAX_MOVES - ids.count(0) or any(m['id'] != i for m, i in zip(moves, ids)):
+        # The move set changed (e.g. a move learned on level up)
+        moves = monster.moves = [create_move(move_id) for move_id in ids if move_id]
+    for move, pp in zip(moves, pps):
+        move['current_pp'] = pp
+
+
+def snapshot(battle, include_rng=False):
+    """Capture the battle state as a flat tuple"""
+    player_side = battle.player_party.monsters
+    enemies = battle.enemy_party.monsters
+
+    data = [STATE_CODES[battle.state], RESULT_CODES[battle.result],
+            battle.menu_selection, battle.move_selection, battle.exp_gain,
+            battle.player_party.active, battle.enemy_party.active,
+            len(player_side), len(enemies),
+            battle.monster_selection, int(battle.forced_switch)]
+    for monster in player_side:
+        _pack_monster(monster, data)
+    for monster in enemies:
+        _pack_monster(monster, data)
+
+    if include_rng:
+        data.append(battle.rng.getstate())
+        data.append(battle.ai_rng.getstate())
+    return tuple(data)
+
+
+def restore(battle, data):
+    """Write a snapshot back into a battle (the parties must be the same monsters)"""
+    player_side = battle.player_party.monsters
+    enemies = battle.enemy_party.monsters
+    if data[7] != len(player_side) or data[8] != len(enemies):
+        raise ValueError("Snapshot does not match the battle's parties")
+
+    battle.state = BATTLE_STATES[data[0]]
+    battle.result = BATTLE_RESULTS[data[1]]
+    battle.menu_selection = data[2]
+    battle.move_selection = data[3]
+    battle.exp_gain = data[4]
+    battle.player_party.active = data[5]
+    battle.enemy_party.active = data[6]
+    battle.player_monster = player_side[data[5]]
+    battle.enemy_monster = enemies[data[6]]
+    battle.monster_selection = data[9]
+    battle.forced_switch = bool(data[10])
+
+    offset = HEADER_FIELDS
+    for monster in player_side:
+        _unpack_monster(monster, data, offset)
+        offset += MONSTER_FIELDS
+    for monster in enemies:
+        _unpack_monster(monster, data, offset)
+        offset += MONSTER_FIELDS
+    battle.player_party.refresh_all()
+    battle.enemy_party.refresh_all()
+
+    if len(data) > offset:
+        battle.rng.setstate(data[offset])
+        battle.ai_rng.setstate(data[offset + 1])
+
+
+def state_hash(data):
+    """Hash of the game-relevant part of a snapshot
+
+    A 64-bit BLAKE2b digest of the packed ints, so the value is the same in
+    every process, run and Python build and can be used as a transposition
+    or desync key.
+    """
+    end = HEADER_FIELDS + (data[7] + data[8]) * MONSTER_FIELDS
+    packed = struct.pack(f"<{end}q", *data[:end])
+    return int.from_bytes(hashlib.blake2b(packed, digest_size=8).digest(), "little")
+
+
+def _clone_monster(monster):
+    clone = object.__new__(type(monster))
+    clone.__dict__.update(monster.__dict__)
+    clone.moves = [dict(move) for move in monster.moves]
+    return clone
+
+
+def _clone_rng(rng):
+    # Skip Random.__init__, which would seed from the OS before setstate
+    clone = random.Random.__new__(random.Random)
+    clone.setstate(rng.getstate())
+    return clone
+
+
+def fork(battle, seed=None):
+    """Independent copy of a battle for lookahead or what-if tools
+
+    Only the monsters, parties and RNGs are copied; data that doesn't change
+    during a battle (species tables, AI, fonts...) is shared. Forks don't
+    record battle logs. With a seed the fork gets fresh random streams
+    instead of copies, which is cheaper and suits Monte Carlo rollouts.
+    """
+    clones = {}
+
+    def clone(monster):
+        if id(monster) not in clones:
+            clones[id(monster)] = _clone_monster(monster)
+        return clones[id(monster)]
+
+    forked = copy.copy(battle)
+    forked.player = copy.copy(battle.player)
+    forked.player.monsters = [clone(m) for m in battle.player.monsters]
+    forked.player.items = dict(battle.player.items)
+    forked.player.discovered_monsters = set(battle.player.discovered_monsters)
+    forked.player.storage = MonsterStorage()  # Catches in a fork never reach the real boxes
+    if battle.trainer:
+        forked.trainer = copy.copy(battle.trainer)
+        forked.trainer.monsters = [clone(m) for m in battle.trainer.monsters]
+    if battle.wild_monster:
+        forked.wild_monster = clone(battle.wild_monster)
+    forked.player_monster = clone(battle.player_monster)
+    forked.enemy_monster = clone(battle.enemy_monster)
+    forked.player_party = copy.copy(battle.player_party)
+    forked.player_party.monsters = forked.player.monsters
+    forked.enemy_party = copy.copy(battle.enemy_party)
+    forked.enemy_party.monsters = forked.trainer.monsters if battle.trainer else [forked.wild_monster]
+
+    forked.events = list(battle.events)
+    if seed is None:
+        forked.rng = _clone_rng(battle.rng)
+        forked.ai_rng = _clone_rng(battle.ai_rng)
+    else:
+        forked.seed = seed
+        forked.rng = random.Random(seed)
+        forked.ai_rng = random.Random(seed + 1)
+    forked.recorder = None
+    return forked
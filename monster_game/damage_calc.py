@@ -0,0 +1,124 @@
+import math
+from functools import lru_cache
+from monster import Monster, create_move
+from move_effects import effects_of, fixed_damage
+
+# Range of the damage roll in Monster.calculate_damage
+ROLL_MIN = 0.85
+ROLL_MAX = 1.0
+
+
+@lru_cache(maxsize=1024)
+def _combatant(species_id, level):
+    """Monster with stats for a species and level (no moves are learned)"""
+    monster = Monster.__new__(Monster)
+    monster._apply_species(species_id)
+    monster.level = level
+    monster.calculate_stats()
+    return monster
+
+
+@lru_cache(maxsize=None)
+def _move(move_id):
+    move = create_move(move_id)
+    if move is None:
+        raise ValueError(f"Invalid move ID: {move_id}")
+    return move
+
+
+def _roll_distribution(damage):
+    """Exact distribution of int(damage * roll) for roll ~ U[ROLL_MIN, ROLL_MAX]"""
+    width = ROLL_MAX - ROLL_MIN
+    outcomes = {}
+    low = math.floor(damage * ROLL_MIN)
+    high = math.floor(damage * ROLL_MAX)
+    for k in range(low, high + 1):
+        # Part of the roll range where k <= damage * roll < k + 1
+        start = max(ROLL_MIN, k / damage)
+        end = min(ROLL_MAX, (k + 1) / damage)
+        if end > start:
+            outcomes[max(1, k)] = outcomes.get(max(1, k), 0.0) + (end - start) / width
+    return outcomes
+
+
+@lru_cache(maxsize=65536)
+def damage_distribution(attacker_species, attacker_level, move_id, defender_species, defender_level):
+    """Exact damage distribution of one use of a move
+
+    Returns a tuple of (damage, probability) pairs sorted by damage. A miss
+    (and any move that does no damage) counts as 0 damage.
+    """
+    attacker = _combatant(attacker_species, attacker_level)
+    defender = _combatant(defender_species, defender_level)
+    move = _move(move_id)
+
+    hit_chance = min(move['accuracy'], 100) / 100
+    outcomes = {}
+    effects = effects_of(move_id)
+    if effects.fixed_damage is not None:
+        outcomes[fixed_damage(effects, attacker, move, defender)] = hit_chance
+    elif move['power'] == 0:
+        outcomes[0] = hit_chance
+    else:
+        damage, effectiveness = attacker.calculate_base_damage(move, defender)
+        if effectiveness > 0:
+            for amount, prob in _roll_distribution(damage).items():
+                outcomes[amount] = prob * hit_chance
+        else:
+            outcomes[0] = hit_chance
+
+    if hit_chance < 1.0:
+        outcomes[0] = outcomes.get(0, 0.0) + (1.0 - hit_chance)
+    return tuple(sorted(outcomes.items()))
+
+
+@lru_cache(maxsize=65536)
+def ko_probability(attacker_species, attacker_level, move_id, defender_species, defender_level,
+                   defender_hp=None, turns=1):
+    """Probability that using a move every turn knocks out the defender within `turns`
+
+    defender_hp defaults to the defender's max HP. PP and status conditions
+    are not taken into account.
+    """
+    if defender_hp is None:
+        defender_hp = _combatant(defender_species, defender_level).max_hp
+    if defender_hp <= 0:
+        return 1.0
+
+    distribution = damage_distribution(attacker_species, attacker_level, move_id,
+                                       defender_species, defender_level)
+
+    # Distribution of total damage so far, with every KO merged into defender_hp
+    totals = {0: 1.0}
+    for _ in range(turns):
+        next_totals = {}
+        for total, prob in totals.items():
+            if total >= defender_hp:
+                next_totals[defender_hp] = next_totals.get(defender_hp, 0.0) + prob
+                continue
+            for amount, amount_prob in distribution:
+                new_total = min(defender_hp, total + amount)
+                next_totals[new_total] = next_totals.get(new_total, 0.0) + prob * amount_prob
+        totals = next_totals
+    return totals.get(defender_hp, 0.0)
+
+
+def expected_damage(attacker_species, attacker_level, move_id, defender_species, defender_level):
+    """Expected damage of one use of a move (including misses)"""
+    distribution = damage_distribution(attacker_species, attacker_level, move_id,
+                                       defender_species, defender_level)
+    return sum(amount * prob for amount, prob in distribution)
+
+
+def ko_chance(attacker, move_index, defender, turns=1):
+    """KO probability for Monster objects, using the defender's current HP"""
+    return ko_probability(attacker.species_id, attacker.level, attacker.moves[move_index]['id'],
+                          defender.species_id, defender.level, defender.current_hp, turns)
+
+
+def cache_info():
+    """LRU cache statistics for the distribution and KO caches"""
+    return {
+        "damage_distribution": damage_distribution.cache_info(),
+        "ko_probability": ko_probability.cache_info(),
+    }
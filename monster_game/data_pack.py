@@ -0,0 +1,378 @@
+import bisect
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+# File layout (all little-endian):
+#   header                   HEADER
+#   table directory          TABLE_ENTRY per table
+#   per table, an index      int keys: ids (uint32), then offsets, then lengths
+#                            str keys: (key offset, record offset, record length) per key
+#   records                  encoded values (see _encode)
+# Index entries are sorted by key, so a record is found by binary search.
+MAGIC = b"MPAK"
+VERSION = 1
+HEADER = "<4sHH"  # Magic, version, table count
+TABLE_ENTRY = "<16sBII"  # Name, key kind, record count, index offset
+INT_KEYS = 0
+STR_KEYS = 1
+
+# Decoded records kept per table
+CACHE_SIZE = 256
+
+# Tables a game data pack holds, with the monster_data name of each
+TABLES = {
+    "species": "MONSTER_SPECIES",
+    "moves": "MOVES",
+    "type_chart": "TYPE_CHART",
+    "learnsets": "LEARNABLE_MOVES",
+    "move_effects": "MOVE_EFFECTS",
+}
+
+# Value tags of the record encoding
+_NONE, _INT, _FLOAT, _STR, _LIST, _DICT = range(6)
+_TAG = struct.Struct("<B")
+_INT_VALUE = struct.Struct("<q")
+_FLOAT_VALUE = struct.Struct("<d")
+_LENGTH = struct.Struct("<H")
+
+
+class DataPackError(ValueError):
+    """Invalid data pack, or tables that failed validation"""
+
+    def __init__(self, message, problems=()):
+        super().__init__(message if not problems else message + ":\n  " + "\n  ".join(problems))
+        self.problems = list(problems)
+
+
+def _encode(value, out):
+    """Append value (None, int, float, str, list/tuple or dict of those) to the bytearray out"""
+    if value is None:
+        out += _TAG.pack(_NONE)
+    elif isinstance(value, int):
+        out += _TAG.pack(_INT) + _INT_VALUE.pack(value)
+    elif isinstance(value, float):
+        out += _TAG.pack(_FLOAT) + _FLOAT_VALUE.pack(value)
+    elif isinstance(value, str):
+        data = value.encode("utf-8")
+        out += _TAG.pack(_STR) + _LENGTH.pack(len(data)) + data
+    elif isinstance(value, (list, tuple)):
+        out += _TAG.pack(_LIST) + _LENGTH.pack(len(value))
+        for item in value:
+            _encode(item, out)
+    elif isinstance(value, dict):
+        out += _TAG.pack(_DICT) + _LENGTH.pack(len(value))
+        for key, item in value.items():
+            _encode(key, out)
+            _encode(item, out)
+    else:
+        raise DataPackError(f"Can't store {type(value).__name__} in a data pack")
+
+
+def _decode(buffer, offset):
+    """Value at offset and the offset after it"""
+    tag = buffer[offset]
+    offset += 1
+    if tag == _NONE:
+        return None, offset
+    if tag == _INT:
+        return _INT_VALUE.unpack_from(buffer, offset)[0], offset + _INT_VALUE.size
+    if tag == _FLOAT:
+        return _FLOAT_VALUE.unpack_from(buffer, offset)[0], offset + _FLOAT_VALUE.size
+    if tag in (_STR, _LIST, _DICT):
+        length = _LENGTH.unpack_from(buffer, offset)[0]
+        offset += _LENGTH.size
+        if tag == _STR:
+            return bytes(buffer[offset:offset + length]).decode("utf-8"), offset + length
+        if tag == _LIST:
+            items = []
+            for _ in range(length):
+                item, offset = _decode(buffer, offset)
+                items.append(item)
+            return items, offset
+        result = {}
+        for _ in range(length):
+            key, offset = _decode(buffer, offset)
+            result[key], offset = _decode(buffer, offset)
+        return result, offset
+    raise DataPackError(f"Unknown value tag {tag}")
+
+
+def validate(species, moves, type_chart, learnsets, move_effects=None):
+    """Check the game tables against each other; returns (errors, warnings)
+
+    Errors make a pack unusable: unknown types, evolutions into species
+    that don't exist, learnsets of unknown species or with unknown moves,
+    effects of unknown moves or of unknown kinds.
+    Species without a learnset are warnings, since the base game has some
+    (they only know the moves they had before evolving).
+    """
+    errors = []
+    warnings = []
+    known_types = set(type_chart)
+    for effects in type_chart.values():
+        known_types.update(effects)
+
+    for species_id, data in species.items():
+        if len(data) != 8:
+            errors.append(f"species {species_id}: expected 8 fields, got {len(data)}")
+            continue
+        for type_name in data[1].split('/'):
+            if type_name not in known_types:
+                errors.append(f"species {species_id} ({data[0]}): unknown type {type_name!r}")
+        evolution_level, evolution_to = data[6], data[7]
+        if (evolution_level is None) != (evolution_to is None):
+            errors.append(f"species {species_id} ({data[0]}): evolution level and target must both be set")
+        elif evolution_to is not None and evolution_to not in species:
+            errors.append(f"species {species_id} ({data[0]}): evolves into missing species {evolution_to}")
+        if species_id not in learnsets:
+            warnings.append(f"species {species_id} ({data[0]}): no learnset")
+
+    for move_id, data in moves.items():
+        if len(data) != 5:
+            errors.append(f"move {move_id}: expected 5 fields, got {len(data)}")
+        elif data[1] not in known_types:
+            errors.append(f"move {move_id} ({data[0]}): unknown type {data[1]!r}")
+
+    for species_id, levels in learnsets.items():
+        if species_id not in species:
+            errors.append(f"learnset for missing species {species_id}")
+        for level, move_ids in levels.items():
+            for move_id in move_ids:
+                if move_id not in moves:
+                    errors.append(f"learnset of species {species_id}, level {level}: unknown move {move_id}")
+
+    if move_effects:
+        from move_effects import compile_effects
+        for move_id, descriptors in move_effects.items():
+            if move_id not in moves:
+                errors.append(f"effects of unknown move {move_id}")
+            try:
+                compile_effects({move_id: descriptors})
+            except (ValueError, TypeError, IndexError) as e:
+                errors.append(str(e))
+
+    return errors, warnings
+
+
+def build_pack(path, tables, strict=False):
+    """Validate the game tables and write them to a pack; returns the warnings
+
+    tables maps pack table names (see TABLES) to dicts. With strict,
+    warnings fail the build too.
+    """
+    errors, warnings = validate(tables["species"], tables["moves"], tables["type_chart"],
+                                tables["learnsets"], tables.get("move_effects"))
+    if strict:
+        errors += warnings
+    if errors:
+        raise DataPackError(f"{len(errors)} problem(s) in the game data", errors)
+
+    # Every index entry is 12 bytes, so where the records start is known up front
+    index_start = struct.calcsize(HEADER) + struct.calcsize(TABLE_ENTRY) * len(tables)
+    records_start = index_start + 12 * sum(len(table) for table in tables.values())
+    directory = bytearray(struct.pack(HEADER, MAGIC, VERSION, len(tables)))
+    indexes = bytearray()
+    records = bytearray()
+    for name, table in tables.items():
+        str_keys = any(isinstance(key, str) for key in table)
+        directory += struct.pack(TABLE_ENTRY, name.encode("ascii"), STR_KEYS if str_keys else INT_KEYS,
+                                 len(table), index_start + len(indexes))
+        ids = array('I')
+        offsets = array('I')
+        lengths = array('I')
+        for key in sorted(table):
+            key_offset = records_start + len(records)
+            if str_keys:
+                _encode(key, records)
+            record_offset = records_start + len(records)
+            _encode(table[key], records)
+            length = records_start + len(records) - record_offset
+            if str_keys:
+                indexes += struct.pack("<III", key_offset, record_offset, length)
+            else:
+                ids.append(key)
+                offsets.append(record_offset)
+                lengths.append(length)
+        if not str_keys:
+            for column in (ids, offsets, lengths):
+                if sys.byteorder != "little":
+                    column.byteswap()
+                indexes += column.tobytes()
+    out = directory + indexes + records
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(out)
+    os.replace(tmp_path, path)
+    return warnings
+
+
+class PackTable(MutableMapping):
+    """One table of a data pack, read by key on demand
+
+    Records are decoded from the memory-mapped file when first asked for
+    and kept in a small LRU cache. Assigning a key stores an override in
+    memory (the file is never written), which is how tools such as
+    balance_optimizer patch stats for a run.
+    """
+
+    def __init__(self, pack, name, kind, count, index_offset, cache_size=CACHE_SIZE):
+        self.pack = pack
+        self.name = name
+        self.kind = kind
+        self.count = count
+        self.index_offset = index_offset
+        self.cache_size = cache_size
+        self._ids = None  # Sorted int keys (loaded on first lookup)
+        self._str_index = None  # str key -> (offset, length)
+        self._cache = OrderedDict()
+        self.overrides = {}
+
+    def _load_index(self):
+        buffer = self.pack.buffer
+        if self.kind == STR_KEYS:
+            index = {}
+            for i in range(self.count):
+                key_offset, record_offset, length = struct.unpack_from("<III", buffer,
+                                                                       self.index_offset + 12 * i)
+                key = _decode(buffer, key_offset)[0]
+                index[key] = (record_offset, length)
+            self._str_index = index
+        else:
+            ids = array('I')
+            ids.frombytes(buffer[self.index_offset:self.index_offset + 4 * self.count])
+            if sys.byteorder != "little":
+                ids.byteswap()
+            self._ids = ids
+
+    def _locate(self, key):
+        """(offset, length) of the record for key, or None"""
+        if self._ids is None and self._str_index is None:
+            self._load_index()
+        if self.kind == STR_KEYS:
+            return self._str_index.get(key)
+        if not isinstance(key, int):
+            return None
+        i = bisect.bisect_left(self._ids, key)
+        if i == self.count or self._ids[i] != key:
+            return None
+        base = self.index_offset + 4 * self.count
+        offset = struct.unpack_from("<I", self.pack.buffer, base + 4 * i)[0]
+        length = struct.unpack_from("<I", self.pack.buffer, base + 4 * (self.count + i))[0]
+        return offset, length
+
+    def __getitem__(self, key):
+        if key in self.overrides:
+            return self.overrides[key]
+        cache = self._cache
+        try:
+            value = cache[key]
+            cache.move_to_end(key)
+            return value
+        except (KeyError, TypeError):
+            pass
+        location = self._locate(key)
+        if location is None:
+            raise KeyError(key)
+        value = _decode(self.pack.buffer, location[0])[0]
+        cache[key] = value
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return value
+
+    def __contains__(self, key):
+        return key in self.overrides or self._locate(key) is not None
+
+    def __setitem__(self, key, value):
+        self.overrides[key] = value
+
+    def __delitem__(self, key):
+        if key not in self.overrides or self._locate(key) is not None:
+            raise TypeError(f"Records of pack table {self.name!r} can't be deleted")
+        del self.overrides[key]
+
+    def __iter__(self):
+        if self._ids is None and self._str_index is None:
+            self._load_index()
+        keys = self._str_index if self.kind == STR_KEYS else self._ids
+        yield from keys
+        for key in self.overrides:
+            if self._locate(key) is None:
+                yield key
+
+    def __len__(self):
+        return self.count + sum(1 for key in self.overrides if self._locate(key) is None)
+
+    def __repr__(self):
+        return f"<PackTable {self.name} ({len(self)} records)>"
+
+
+class DataPack:
+    """Memory-mapped data pack; tables are opened by name"""
+
+    def __init__(self, path, cache_size=CACHE_SIZE):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.buffer = memoryview(self._mmap)
+
+        header_size = struct.calcsize(HEADER)
+        if len(self.buffer) < header_size:
+            raise DataPackError(f"{path}: file is too short")
+        magic, version, table_count = struct.unpack_from(HEADER, self.buffer, 0)
+        if magic != MAGIC:
+            raise DataPackError(f"{path}: not a data pack")
+        if version != VERSION:
+            raise DataPackError(f"{path}: unsupported data pack version {version}")
+
+        self.tables = {}
+        entry_size = struct.calcsize(TABLE_ENTRY)
+        for i in range(table_count):
+            name, kind, count, index_offset = struct.unpack_from(TABLE_ENTRY, self.buffer,
+                                                                 header_size + entry_size * i)
+            name = name.rstrip(b"\0").decode("ascii")
+            self.tables[name] = PackTable(self, name, kind, count, index_offset, cache_size)
+
+    def table(self, name):
+        try:
+            return self.tables[name]
+        except KeyError:
+            raise DataPackError(f"{self.path}: no table {name!r}") from None
+
+    def close(self):
+        for table in self.tables.values():
+            table._ids = None
+        self.buffer.release()
+        self._mmap.close()
+
+
+def base_game_tables():
+    """The tables written in monster_data.py, by pack table name"""
+    import monster_data
+    return {name: dict(getattr(monster_data, attribute)) for name, attribute in TABLES.items()}
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Validate the game data and build a data pack")
+    parser.add_argument("output", help="pack file to write (use it with MONSTER_DATA_PACK=path)")
+    parser.add_argument("--strict", action="store_true", help="treat warnings as errors")
+    args = parser.parse_args()
+
+    try:
+        warnings = build_pack(args.output, base_game_tables(), strict=args.strict)
+    except DataPackError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    for warning in warnings:
+        print(f"warning: {warning}", file=sys.stderr)
+    print(f"Wrote {args.output} ({os.path.getsize(args.output)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
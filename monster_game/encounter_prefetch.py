@@ -0,0 +1,96 @@
+import time
+from overworld_entities import RoamingMonster
+
+# Roaming monsters further than this from the player (pixels) aren't prepared
+PREFETCH_RADIUS = 240
+# Idle time left in a frame (seconds) needed to prepare an encounter
+MIN_IDLE = 0.003
+# A prepared monster is only swapped for one nearer than this fraction of its distance
+SWITCH_RATIO = 0.7
+
+
+class EncounterPrefetcher:
+    """Prepares the next wild encounter in idle frame time
+
+    While the player walks around, step() takes the roaming monster nearest
+    to the player, builds its Monster (from the pool, which also reads the
+    species and move records) and hands it to warm() to render whatever
+    else the battle screen needs. When the player touches that monster,
+    take() returns the ready Monster and the battle starts without the
+    work. A prefetch is dropped (and its Monster given back to the pool)
+    when the player enters another area, the monster leaves the map or
+    another one comes closer.
+    """
+
+    def __init__(self, pool, warm=None, radius=PREFETCH_RADIUS):
+        self.pool = pool
+        self.warm = warm  # warm(monster), e.g. battle.prerender with the game's fonts
+        self.radius = radius
+        self.layer = None
+        self.roamer = None
+        self.area = None
+        self.monster = None
+        self.hits = 0
+        self.misses = 0
+        self.discarded = 0
+
+    def discard(self):
+        if self.monster is not None:
+            self.pool.release(self.monster)
+            self.discarded += 1
+        self.layer = self.roamer = self.area = self.monster = None
+
+    def _nearest_roamers(self, layer, player):
+        """Nearest roamer within the radius (or None), its squared distance and the
+        squared distance of the prepared roamer (None if it is out of range)"""
+        center_x = player.x + player.size / 2
+        center_y = player.y + player.size / 2
+        nearest = None
+        best = self.radius ** 2
+        prepared = None
+        for entity in layer.hash.query_radius(center_x, center_y, self.radius):
+            if not isinstance(entity, RoamingMonster):
+                continue
+            x, y = entity.center()
+            distance = (x - center_x) ** 2 + (y - center_y) ** 2
+            if entity is self.roamer:
+                prepared = distance
+            if distance <= best:
+                nearest, best = entity, distance
+        return nearest, best, prepared
+
+    def step(self, layer, player, area, deadline=None):
+        """Prepare the likeliest next encounter if there is idle time before deadline"""
+        # Stale: another area or map, or the monster was removed (it has no cell then)
+        if self.roamer is not None and (area != self.area or layer is not self.layer
+                                        or self.roamer.cell is None):
+            self.discard()
+        if deadline is not None and deadline - time.perf_counter() < MIN_IDLE:
+            return
+
+        roamer, distance, prepared = self._nearest_roamers(layer, player)
+        if roamer is None or roamer is self.roamer:
+            return
+        if prepared is not None and distance > prepared * SWITCH_RATIO ** 2:
+            return  # Not clearly nearer; keep the prepared one
+        self.discard()
+        self.monster = roamer.create_monster(self.pool)
+        self.layer = layer
+        self.roamer = roamer
+        self.area = area
+        if self.warm:
+            self.warm(self.monster)
+
+    def take(self, roamer):
+        """The prepared Monster for an encountered roamer, or None if it wasn't prepared"""
+        if roamer is not self.roamer:
+            self.discard()
+            self.misses += 1
+            return None
+        monster = self.monster
+        self.layer = self.roamer = self.area = self.monster = None
+        self.hits += 1
+        return monster
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "discarded": self.discarded}
@@ -0,0 +1,275 @@
+import time
+from collections import deque
+from monster import STATUS_CONDITIONS
+from move_effects import effects_of, END_OF_TURN_DAMAGE
+
+SLEEP = STATUS_CONDITIONS.index("sleep")
+PARALYSIS = STATUS_CONDITIONS.index("paralysis")
+
+# Search state layout: (enemy HP, enemy PP tuple, enemy status,
+#                       player HP, player PP tuple, player status)
+ENEMY = 0
+PLAYER = 3
+
+
+class RandomAI:
+    """Picks a random move (cheapest tier, same as wild monsters)"""
+
+    def __init__(self, rng=None):
+        self.rng = rng
+
+    def choose_move(self, battle):
+        rng = self.rng or battle.ai_rng
+        return rng.randint(0, max(0, len(battle.enemy_monster.moves) - 1))
+
+
+class ScriptedAI:
+    """Plays back a fixed sequence of moves (used by battle replays)"""
+
+    def __init__(self, moves):
+        self.moves = list(moves)
+        self.position = 0
+
+    def choose_move(self, battle):
+        move_index = self.moves[self.position]
+        self.position += 1
+        return move_index
+
+
+class QueuedAI:
+    """Uses moves supplied from outside, one per turn (e.g. a remote PvP player)"""
+
+    def __init__(self):
+        self.moves = deque()
+
+    def push(self, move_index):
+        self.moves.append(move_index)
+
+    def choose_move(self, battle):
+        return self.moves.popleft() if self.moves else 0
+
+
+class _MeanRoll:
+    """Stand-in rng that always returns the middle of the damage roll"""
+
+    @staticmethod
+    def uniform(a, b):
+        return (a + b) / 2
+
+
+def _expected_damage(attacker, move, defender):
+    return attacker.calculate_damage(move, defender, _MeanRoll)
+
+
+class GreedyAI:
+    """Picks the usable move with the highest expected damage"""
+
+    def choose_move(self, battle):
+        attacker = battle.enemy_monster
+        defender = battle.player_monster
+
+        best_index = 0
+        best_score = -1
+        for i, move in enumerate(attacker.moves):
+            if move['current_pp'] <= 0:
+                continue
+            score = _expected_damage(attacker, move, defender) * move['accuracy']
+            if score > best_score:
+                best_index, best_score = i, score
+        return best_index
+
+
+class _SearchTimeout(Exception):
+    pass
+
+
+class _SideModel:
+    """Static per-decision data for one side of the search
+
+    Move effects come from the compiled table in move_effects: added status
+    conditions, recoil and poison/burn damage are modelled; stat stages
+    aren't (they aren't part of the search state).
+    """
+    __slots__ = ("max_hp", "damage", "accuracy", "status_effect", "recoil", "end_of_turn")
+
+    def __init__(self, attacker, defender):
+        self.max_hp = attacker.max_hp
+        self.damage = tuple(_expected_damage(attacker, move, defender) for move in attacker.moves)
+        self.accuracy = tuple(move['accuracy'] / 100 for move in attacker.moves)
+
+        status_effect = []
+        recoil = []
+        for move, damage in zip(attacker.moves, self.damage):
+            effects = effects_of(move['id'])
+            if effects.status:
+                condition, probability = effects.status
+                status_effect.append((STATUS_CONDITIONS.index(condition), probability))
+            else:
+                status_effect.append(None)
+            recoil.append(max(1, int(damage) * effects.recoil // 100) if effects.recoil and damage > 0 else 0)
+        self.status_effect = tuple(status_effect)  # (status code, probability) or None per move
+        self.recoil = tuple(recoil)
+        # HP lost at the end of the turn, by status code
+        self.end_of_turn = tuple(max(1, attacker.max_hp // END_OF_TURN_DAMAGE[condition])
+                                 if condition in END_OF_TURN_DAMAGE else 0
+                                 for condition in STATUS_CONDITIONS)
+
+
+class ExpectimaxAI:
+    """Depth-limited expectiminimax over the battle rules
+
+    The enemy maximizes, the player is assumed to minimize, and accuracy,
+    status and paralysis rolls are chance nodes. Iterative deepening stops
+    when the time budget runs out and the last fully searched depth is used.
+    Values are cached in a transposition table keyed by the compact state.
+    """
+
+    def __init__(self, max_depth=6, time_budget=0.004, table_size=200000):
+        self.max_depth = max_depth
+        self.time_budget = time_budget  # Seconds per decision
+        self.table_size = table_size
+        self.table = {}
+        self.nodes = 0
+        self.completed_depth = 0
+
+    def choose_move(self, battle):
+        enemy = battle.enemy_monster
+        player = battle.player_monster
+        usable = [i for i, move in enumerate(enemy.moves) if move['current_pp'] > 0]
+        if len(usable) <= 1:
+            return usable[0] if usable else 0
+
+        # The transposition table is only valid for the same pair of monsters with the same
+        # stat stages (the stages change the damage figures the cached values were based on)
+        models = (_SideModel(enemy, player), _SideModel(player, enemy))
+        context = (id(enemy), id(player), enemy.level, player.level,
+                   enemy.attack_stage, enemy.defense_stage, player.attack_stage, player.defense_stage)
+        if getattr(self, "_context", None) != context or len(self.table) > self.table_size:
+            self.table = {}
+            self._context = context
+        self._models = models
+
+        state = (enemy.current_hp, tuple(m['current_pp'] for m in enemy.moves),
+                 STATUS_CONDITIONS.index(enemy.status_condition),
+                 player.current_hp, tuple(m['current_pp'] for m in player.moves),
+                 STATUS_CONDITIONS.index(player.status_condition))
+
+        self._deadline = time.perf_counter() + self.time_budget
+        self.nodes = 0
+        self.completed_depth = 0
+        best_move = max(usable, key=lambda i: models[0].damage[i] * models[0].accuracy[i])
+
+        for depth in range(1, self.max_depth + 1):
+            try:
+                scored = [(self._move_value(state, ENEMY, i, depth), i) for i in usable]
+            except _SearchTimeout:
+                break
+            best_move = max(scored)[1]
+            self.completed_depth = depth
+        return best_move
+
+    def _evaluate(self, state):
+        models = self._models
+        return state[0] / models[0].max_hp - state[3] / models[1].max_hp
+
+    def _value(self, state, side, depth):
+        """Value of a state where `side` is about to move"""
+        self.nodes += 1
+        if self.nodes & 63 == 0 and time.perf_counter() > self._deadline:
+            raise _SearchTimeout()
+
+        if state[PLAYER] <= 0:
+            return 1.0
+        if state[ENEMY] <= 0:
+            return -1.0
+        if depth == 0:
+            return self._evaluate(state)
+
+        key = (state, side, depth)
+        value = self.table.get(key)
+        if value is not None:
+            return value
+
+        pps = state[side + 1]
+        moves = [i for i, pp in enumerate(pps) if pp > 0] or [None]
+        values = [self._move_value(state, side, i, depth) for i in moves]
+        value = max(values) if side == ENEMY else min(values)
+
+        self.table[key] = value
+        return value
+
+    def _move_value(self, state, side, move_index, depth):
+        """Expected value of `side` using a move (None = no usable move)"""
+        other = PLAYER if side == ENEMY else ENEMY
+        next_depth = depth - 1 if side == PLAYER else depth
+        outcomes = self._outcomes(state, side, other, move_index)
+        return sum(prob * self._value(next_state, other, next_depth) for prob, next_state in outcomes)
+
+    def _outcomes(self, state, side, other, move_index):
+        """Possible (probability, next state) pairs for one action"""
+        outcomes = self._action_outcomes(state, side, other, move_index)
+
+        # Poison and burn damage at the end of the turn
+        hurt = self._models[0 if side == ENEMY else 1].end_of_turn[state[side + 2]]
+        if hurt:
+            outcomes = [(prob, _replace(next_state, side, max(0, next_state[side] - hurt)))
+                        for prob, next_state in outcomes]
+        return outcomes
+
+    def _action_outcomes(self, state, side, other, move_index):
+        if move_index is None:
+            return [(1.0, state)]
+
+        status = state[side + 2]
+        if status == SLEEP:
+            woke = _replace(state, side + 2, 0)
+            return [(0.3, woke), (0.7, state)]
+
+        act_prob = 0.75 if status == PARALYSIS else 1.0
+        model = self._models[0 if side == ENEMY else 1]
+        hit_prob = model.accuracy[move_index]
+
+        pps = list(state[side + 1])
+        pps[move_index] -= 1
+        after_pp = _replace(state, side + 1, tuple(pps))
+        hit = _replace(after_pp, other, max(0, state[other] - model.damage[move_index]))
+        recoil = model.recoil[move_index]
+        if recoil:
+            hit = _replace(hit, side, max(0, hit[side] - recoil))
+
+        outcomes = []
+        if act_prob < 1.0:
+            outcomes.append((1.0 - act_prob, state))
+        if hit_prob < 1.0:
+            outcomes.append((act_prob * (1.0 - hit_prob), state))
+
+        # Added status conditions only land on a target without one
+        effect = model.status_effect[move_index]
+        if effect and hit[other] > 0 and state[other + 2] == 0:
+            code, chance = effect
+            outcomes.append((act_prob * hit_prob * chance, _replace(hit, other + 2, code)))
+            outcomes.append((act_prob * hit_prob * (1.0 - chance), hit))
+        else:
+            outcomes.append((act_prob * hit_prob, hit))
+        return outcomes
+
+
+def _replace(state, index, value):
+    return state[:index] + (value,) + state[index + 1:]
+
+
+# Difficulty tiers, cheapest first
+DIFFICULTY_LEVELS = ("easy", "normal", "hard", "boss")
+
+
+def create_enemy_ai(difficulty="easy"):
+    """Create an enemy AI for a difficulty tier (trainers in the game use Trainer.difficulty)"""
+    if difficulty == "easy":
+        return RandomAI()
+    elif difficulty == "normal":
+        return GreedyAI()
+    elif difficulty == "hard":
+        return ExpectimaxAI(max_depth=4, time_budget=0.004)
+    elif difficulty == "boss":
+        return ExpectimaxAI(max_depth=10, time_budget=0.010)
+    raise ValueError(f"Unknown difficulty: {difficulty}")
@@ -0,0 +1,220 @@
+import multiprocessing
+import os
+import queue
+import random
+import time
+import numpy as np
+
+TICK_RATE = 60  # Simulation ticks per second, same as the render loop
+# The worker runs at a lower OS priority, so the render loop wins when they compete for a core
+WORKER_NICENESS = 10
+# Free slots kept beyond the starting population for respawns
+SPARE_SLOTS = 64
+
+# Rows of a position buffer
+IDS, XS, YS = range(3)
+
+
+def _context():
+    """fork where available, so the child starts without re-importing the game modules"""
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+def _run(raw_buffers, raw_control, commands, stop, paused, tiles, tile_size, capacity, tick_rate, seed):
+    """Worker process: advance the roamers and publish positions every tick
+
+    Each tick is written to the buffer the main process isn't reading, then
+    published by flipping control[0]. control[1 + b] holds the tick stored in
+    buffer b, or -1 while it is being written, so a reader can tell when a
+    buffer changed under it.
+    """
+    try:
+        os.nice(WORKER_NICENESS)
+    except (AttributeError, OSError):
+        pass
+
+    buffers = np.frombuffer(raw_buffers, dtype=np.int32).reshape(2, 3, capacity)
+    control = np.frombuffer(raw_control, dtype=np.int64)
+    rng = random.Random(seed)
+    roamers = {}  # slot -> RoamingMonster
+    interval = 1.0 / tick_rate
+    tick = 0
+    next_tick = time.perf_counter()
+
+    while not stop.is_set():
+        while True:
+            try:
+                command = commands.get_nowait()
+            except queue.Empty:
+                break
+            kind = command[0]
+            if kind == "add":
+                roamers[command[1]] = command[2]
+            elif kind == "remove":
+                roamers.pop(command[1], None)
+            elif kind == "tiles":
+                tiles = command[1]
+
+        if not paused.value:
+            for roamer in roamers.values():
+                roamer.advance(tiles, tile_size, rng)
+
+            back = 1 - int(control[0])
+            control[1 + back] = -1
+            buffer = buffers[back]
+            buffer[IDS] = 0
+            if roamers:
+                slots = list(roamers)
+                buffer[IDS, slots] = [roamer.entity_id for roamer in roamers.values()]
+                buffer[XS, slots] = [roamer.x for roamer in roamers.values()]
+                buffer[YS, slots] = [roamer.y for roamer in roamers.values()]
+            tick += 1
+            control[1 + back] = tick
+            control[0] = back
+
+        next_tick += interval
+        delay = next_tick - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            next_tick = time.perf_counter()  # Fell behind; don't try to catch up
+
+
+class EntityWorker:
+    """Advances roaming monster AI in a separate process
+
+    Positions are double-buffered in shared memory: the worker fills the back
+    buffer and publishes it by flipping an index, and the main loop copies
+    the front buffer once per frame in swap(), so neither side waits on a
+    lock. Every roamer owns a slot in the buffers; the main process only
+    takes a slot's position when the slot holds the roamer's entity_id, so
+    roamers added or removed since the last tick are never mixed up.
+    Adds, removals and map changes are sent to the worker through a queue.
+    """
+
+    def __init__(self, layer, capacity=None, tick_rate=TICK_RATE, seed=None):
+        self.layer = layer
+        self.capacity = capacity or len(layer.roamers) + max(SPARE_SLOTS, layer.target_roamers)
+        self.tick_rate = tick_rate
+        self.seed = seed
+
+        context = _context()
+        self._raw_buffers = context.RawArray('i', 2 * 3 * self.capacity)
+        self._raw_control = context.RawArray('q', 3)  # Published buffer, tick in each buffer
+        self.buffers = np.frombuffer(self._raw_buffers, dtype=np.int32).reshape(2, 3, self.capacity)
+        self.control = np.frombuffer(self._raw_control, dtype=np.int64)
+        self.commands = context.Queue()
+        self._stop = context.Event()
+        self._paused = context.RawValue('b', 0)
+        self._context = context
+        self._process = None
+
+        # Main-process view of the slots (the front buffer)
+        self.slot_ids = np.zeros(self.capacity, dtype=np.int32)
+        self.xs = np.zeros(self.capacity, dtype=np.int32)
+        self.ys = np.zeros(self.capacity, dtype=np.int32)
+        self.slot_roamers = [None] * self.capacity
+        self.slots = {}  # entity_id -> slot
+        self.free_slots = list(range(self.capacity - 1, -1, -1))
+        self.applied_tick = 0
+
+        for roamer in layer.roamers:
+            self.add(roamer)
+
+    @property
+    def paused(self):
+        return bool(self._paused.value)
+
+    @paused.setter
+    def paused(self, value):
+        self._paused.value = bool(value)
+
+    def add(self, roamer):
+        """Start moving a roamer; returns False (it stays put) if all slots are taken"""
+        if not self.free_slots:
+            return False
+        slot = self.free_slots.pop()
+        self.slots[roamer.entity_id] = slot
+        self.slot_ids[slot] = roamer.entity_id
+        self.xs[slot] = roamer.x
+        self.ys[slot] = roamer.y
+        self.slot_roamers[slot] = roamer
+        self.commands.put(("add", slot, roamer))
+        return True
+
+    def remove(self, entity_id):
+        slot = self.slots.pop(entity_id, None)
+        if slot is None:
+            return
+        self.slot_ids[slot] = 0
+        self.slot_roamers[slot] = None
+        self.free_slots.append(slot)
+        self.commands.put(("remove", slot))
+
+    def set_tiles(self, tiles):
+        """Map tiles changed (e.g. a new map was loaded)"""
+        self.commands.put(("tiles", tuple(tuple(row) for row in tiles)))
+
+    def start(self):
+        game_map = self.layer.game_map
+        tiles = tuple(tuple(row) for row in game_map.tiles)
+        self._stop.clear()
+        self._process = self._context.Process(
+            target=_run, name="entity-worker", daemon=True,
+            args=(self._raw_buffers, self._raw_control, self.commands, self._stop, self._paused,
+                  tiles, game_map.tile_size, self.capacity, self.tick_rate, self.seed))
+        self._process.start()
+        self.layer.worker = self
+
+    def stop(self):
+        if self.layer.worker is self:
+            self.layer.worker = None
+        if self._process:
+            self._stop.set()
+            self._process.join(1.0)
+            if self._process.is_alive():
+                self._process.terminate()
+            self._process = None
+        self.commands.cancel_join_thread()
+
+    def swap(self, spatial_hash):
+        """Take the latest published positions into the roamers; returns how many moved
+
+        Called by the main loop at the start of a frame. A buffer that the
+        worker starts rewriting while it is being copied is dropped, and the
+        previous positions are kept for one more frame.
+        """
+        control = self.control
+        front = int(control[0])
+        tick = int(control[1 + front])
+        if tick <= self.applied_tick:
+            return 0  # Nothing new (or being written)
+        ids, xs, ys = self.buffers[front].copy()
+        if control[1 + front] != tick:
+            return 0
+        self.applied_tick = tick
+
+        slot_ids = self.slot_ids
+        moved = np.flatnonzero((ids == slot_ids) & (slot_ids != 0)
+                               & ((xs != self.xs) | (ys != self.ys)))
+        if not moved.size:
+            return 0
+
+        new_xs = xs[moved]
+        new_ys = ys[moved]
+        cell_size = spatial_hash.cell_size
+        crossed = moved[(new_xs // cell_size != self.xs[moved] // cell_size)
+                        | (new_ys // cell_size != self.ys[moved] // cell_size)]
+        self.xs[moved] = new_xs
+        self.ys[moved] = new_ys
+
+        roamers = self.slot_roamers
+        for slot, x, y in zip(moved.tolist(), new_xs.tolist(), new_ys.tolist()):
+            roamer = roamers[slot]
+            roamer.x = x
+            roamer.y = y
+        for slot in crossed.tolist():
+            spatial_hash.update(roamers[slot])
+        return moved.size
@@ -1,20 +1,27 @@
 import pygame
+import os
 import sys
-import random
-from monster import Monster, generate_wild_monster
+import time
+from monster import Monster, wild_monster_pool
 from player import Player
-from battle import Battle
+from battle import Battle, prerender
+from battle_log import BattleRecorder
+from trainer import create_trainer
+from enemy_ai import create_enemy_ai
 from map import GameMap
-
-# Initialize the game
-pygame.init()
-pygame.font.init()
+from save_slots import SaveSlotManager, format_play_time
+from overworld_sync import OverworldClient
+from entity_worker import EntityWorker
+from gc_policy import GCPolicy
+from virtual_list import VirtualList
+from encounter_prefetch import EncounterPrefetcher
+from assets import AssetLoader, SpriteBatch, draw_loading
+from monster_data import MONSTER_SPECIES
+from storage import BOX_SIZE
 
 # Screen settings
 WIDTH = 800
 HEIGHT = 600
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Monster Collection Game")
 
 # Color definitions
 WHITE = (255, 255, 255)
@@ -24,9 +31,24 @@ GREEN = (0, 255, 0)
 BLUE = (0, 0, 255)
 YELLOW = (255, 255, 0)
 
-# Fonts
-font = pygame.font.SysFont(None, 36)
-small_font = pygame.font.SysFont(None, 24)
+# Seconds per frame at the target frame rate
+FRAME_TIME = 1 / 60
+
+# The most recent battle is kept as a replayable log (see battle_log.py)
+BATTLE_LOG_PATH = os.path.join(os.path.dirname(__file__), "battle_logs", "last_battle.mblg")
+
+# Window and fonts, set up by init_display() (importing this module opens no window,
+# e.g. when a spawned worker process re-imports it)
+screen = None
+font = None
+small_font = None
+
+# Item names for the item menu
+ITEM_NAMES = {
+    "monster_ball": "Monster Ball",
+    "potion": "Potion",
+    "full_restore": "Full Restore"
+}
 
 # Game states
 TITLE = "title"
@@ -36,40 +58,121 @@ MONSTER_MENU = "monster_menu"
 POKEDEX = "pokedex"
 ITEM_MENU = "item_menu"
 EVOLUTION = "evolution"
+LOAD_MENU = "load_menu"
+SAVE_MENU = "save_menu"
 
 # Game class
 class Game:
-    def __init__(self):
+    def __init__(self, overworld=None):
         self.state = TITLE
         self.player = Player("Trainer")
         self.map = GameMap(WIDTH, HEIGHT)
         self.battle = None
+        self.battle_npc = None  # Overworld trainer of the current battle
+        self.evolving = None  # Party monster shown on the evolution screen
         self.menu_selection = 0
         
+        # Save slots
+        self.save_slots = SaveSlotManager()
+        self.save_slot = None  # Slot loaded or last saved to
+        self.slot_headers = []
+        self.new_slot = 1  # Slot the save menu's new slot row writes to
+        
+        # Multiplayer overworld connection (None when playing alone)
+        self.overworld = overworld
+        
+        # Roaming monster AI runs in a separate process (entity_worker.py) and publishes
+        # positions through a shared-memory double buffer; update() swaps them in
+        self.entity_worker = EntityWorker(self.map.entities)
+        self.entity_worker.start()
+        
         # Add initial monster
         starter = Monster(1, 5)  # Embery Lv.5
         self.player.add_monster(starter)
+        
+        # Garbage collection only runs at safe points (battle transitions, loading)
+        self.gc_policy = GCPolicy()
+        self.gc_policy.enable()
+        self.gc_policy.freeze()
+        self.show_gc_stats = False
+        
+        # The next wild encounter is prepared in idle frame time (see encounter_prefetch.py)
+        self.encounter_prefetcher = EncounterPrefetcher(
+            wild_monster_pool, lambda monster: prerender(monster, font, small_font))
+        
+        # Sprite atlases load on a background thread; a loading screen shows until the required ones are in
+        self.assets = AssetLoader()
+        self.assets.start()
+        self.sprite_batch = SpriteBatch(self.assets)
+        
+        # Menu lists only render the rows on screen (see virtual_list.py)
+        self.monster_list = VirtualList((50, 70, WIDTH - 100, HEIGHT - 150), 100,
+                                        self.render_monster_row, self.monster_row_key,
+                                        self.monster_search_text, small_font, (230, 230, 255))
+        self.pokedex_list = VirtualList((100, 70, WIDTH - 200, HEIGHT - 150), 40,
+                                        self.render_pokedex_row,
+                                        search_text=lambda species_id: MONSTER_SPECIES[species_id][0],
+                                        font=small_font, background=(255, 230, 230))
+        self.item_list = VirtualList((100, 70, WIDTH - 200, HEIGHT - 150), 40,
+                                     self.render_item_row,
+                                     search_text=lambda item: ITEM_NAMES.get(item[0], item[0]),
+                                     font=small_font, background=(230, 255, 230))
     
     def update(self):
         keys = pygame.key.get_pressed()
         
+        # Take in atlases the loader thread has finished
+        self.assets.poll()
+        if not self.assets.ready:
+            return
+        
+        # Keep the overworld connection alive in every state (position is frozen during battles)
+        if self.overworld:
+            self.overworld.update(self.player)
+        
+        # Roamers only move while the map is on screen
+        self.entity_worker.paused = self.state != WORLD_MAP
+        self.gc_policy.frame()
+        
         if self.state == TITLE:
             # Title screen update
             pass
         
         elif self.state == WORLD_MAP:
-            # Update player
+            # Update player (trainers standing on the map block the way)
+            entities = self.map.entities
+            old_x, old_y = self.player.x, self.player.y
             self.player.update(keys, WIDTH, HEIGHT)
+            if entities.blocks(self.player.x, self.player.y, self.player.size):
+                self.player.x, self.player.y = old_x, old_y
+            
+            # Roaming monsters
+            entities.update(self.player)
             
-            # Random encounter
-            if self.player.can_encounter() and random.random() < 0.3:  # 30% chance for encounter
-                area = self.map.get_area_at_position(self.player.x, self.player.y)
-                wild_monster = generate_wild_monster(area)
-                self.start_battle(wild_monster)
+            # Trainer line of sight, then touching a roaming monster (wild battles only start
+            # from roamers; there are no random encounters in tall grass)
+            npc = entities.find_spotting_trainer(self.player, self.player.defeated_trainers)
+            if npc:
+                self.battle_npc = npc
+                self.start_trainer_battle(create_trainer(npc.trainer_id))
+            else:
+                roamer = entities.find_encounter(self.player)
+                if roamer:
+                    entities.remove(roamer)
+                    wild_monster = self.encounter_prefetcher.take(roamer)
+                    self.start_battle(wild_monster or roamer.create_monster(wild_monster_pool))
         
         elif self.state == BATTLE:
             # Battle update
             if self.battle.state == "end":
+                self.save_battle_log()
+                
+                if self.battle.trainer and self.battle_npc:
+                    if self.battle.result == "win":
+                        self.player.defeated_trainers.add(self.battle.trainer.trainer_id)
+                    self.map.entities.start_cooldown(self.battle_npc)
+                    self.battle_npc = None
+                
                 if self.battle.result == "win":
                     # Victory processing
                     self.state = WORLD_MAP
@@ -82,6 +185,16 @@ class Game:
                 elif self.battle.result == "run" or self.battle.result == "catch":
                     # Run or catch
                     self.state = WORLD_MAP
+                
+                # Wild monsters the player didn't keep go back to the pool
+                if not self.battle.trainer and self.battle.result != "catch":
+                    wild_monster_pool.release(self.battle.enemy_monster)
+                self.gc_policy.safe_point()
+                
+                # A monster that reached its evolution level evolves before returning to the map
+                if self.battle.result == "win" and self.battle.evolving in self.player.monsters:
+                    self.evolving = self.battle.evolving
+                    self.state = EVOLUTION
         
         elif self.state == MONSTER_MENU:
             # Monster menu update
@@ -99,26 +212,37 @@ class Game:
             # Evolution update
             pass
     
+    def idle(self, deadline):
+        """Background work for the time left before deadline (perf_counter) in this frame"""
+        if self.state == WORLD_MAP:
+            area = self.map.get_area_at_position(self.player.x, self.player.y)
+            self.encounter_prefetcher.step(self.map.entities, self.player, area, deadline)
+    
     def handle_event(self, event):
         """Event handling"""
+        if not self.assets.ready:
+            return
+        
         if event.type == pygame.KEYDOWN:
+            # Garbage collection pause metrics overlay
+            if event.key == pygame.K_F3:
+                self.show_gc_stats = not self.show_gc_stats
+            
             if self.state == TITLE:
                 if event.key == pygame.K_RETURN:
                     self.state = WORLD_MAP
             
             elif self.state == WORLD_MAP:
                 if event.key == pygame.K_m:
-                    self.state = MONSTER_MENU
+                    self.open_monster_menu()
                 elif event.key == pygame.K_p:
-                    self.state = POKEDEX
+                    self.open_pokedex()
                 elif event.key == pygame.K_i:
-                    self.state = ITEM_MENU
+                    self.open_item_menu()
                 elif event.key == pygame.K_s:
-                    self.player.save_game()
+                    self.open_slot_menu(SAVE_MENU)
                 elif event.key == pygame.K_l:
-                    loaded_player = Player.load_game()
-                    if loaded_player:
-                        self.player = loaded_player
+                    self.open_slot_menu(LOAD_MENU)
             
             elif self.state == BATTLE:
                 if self.battle.state == "player_turn":
@@ -135,13 +259,24 @@ class Game:
                 
                 elif self.battle.state == "move_select":
                     if event.key == pygame.K_UP:
-                        self.battle.update("menu_select", (self.battle.move_selection - 2) % len(self.player.get_active_monster().moves))
+                        self.battle.update("menu_select", (self.battle.move_selection - 2) % len(self.battle.player_monster.moves))
                     elif event.key == pygame.K_DOWN:
-                        self.battle.update("menu_select", (self.battle.move_selection + 2) % len(self.player.get_active_monster().moves))
+                        self.battle.update("menu_select", (self.battle.move_selection + 2) % len(self.battle.player_monster.moves))
                     elif event.key == pygame.K_LEFT:
-                        self.battle.update("menu_select", (self.battle.move_selection - 1) % len(self.player.get_active_monster().moves))
+                        self.battle.update("menu_select", (self.battle.move_selection - 1) % len(self.battle.player_monster.moves))
                     elif event.key == pygame.K_RIGHT:
-                        self.battle.update("menu_select", (self.battle.move_selection + 1) % len(self.player.get_active_monster().moves))
+                        self.battle.update("menu_select", (self.battle.move_selection + 1) % len(self.battle.player_monster.moves))
+                    elif event.key == pygame.K_RETURN:
+                        self.battle.update("menu_confirm")
+                    elif event.key == pygame.K_ESCAPE:
+                        self.battle.update("menu_cancel")
+                
+                elif self.battle.state == "monster_select":
+                    party_size = len(self.battle.player_party.monsters)
+                    if event.key == pygame.K_UP:
+                        self.battle.update("menu_select", (self.battle.monster_selection - 1) % party_size)
+                    elif event.key == pygame.K_DOWN:
+                        self.battle.update("menu_select", (self.battle.monster_selection + 1) % party_size)
                     elif event.key == pygame.K_RETURN:
                         self.battle.update("menu_confirm")
                     elif event.key == pygame.K_ESCAPE:
@@ -155,25 +290,138 @@ class Game:
                     if event.key == pygame.K_RETURN:
                         self.battle.update()
             
-            elif self.state == MONSTER_MENU:
-                if event.key == pygame.K_b or event.key == pygame.K_ESCAPE:
-                    self.state = WORLD_MAP
+            elif self.state in (MONSTER_MENU, POKEDEX, ITEM_MENU):
+                # Letters search the list, so only Esc goes back (after clearing a search)
+                menu_list = self.menu_list()
+                if event.key == pygame.K_ESCAPE:
+                    if menu_list.search:
+                        menu_list.clear_search()
+                    else:
+                        self.state = WORLD_MAP
+                else:
+                    menu_list.handle_key(event)
+            
+            elif self.state == EVOLUTION:
+                if event.key == pygame.K_RETURN:
+                    self.finish_evolution()
             
-            elif self.state == POKEDEX:
+            elif self.state == LOAD_MENU:
                 if event.key == pygame.K_b or event.key == pygame.K_ESCAPE:
                     self.state = WORLD_MAP
+                elif event.key == pygame.K_UP and self.slot_headers:
+                    self.menu_selection = (self.menu_selection - 1) % len(self.slot_headers)
+                elif event.key == pygame.K_DOWN and self.slot_headers:
+                    self.menu_selection = (self.menu_selection + 1) % len(self.slot_headers)
+                elif event.key == pygame.K_RETURN and self.slot_headers:
+                    # Only the chosen slot is fully loaded
+                    slot = self.slot_headers[self.menu_selection]["slot"]
+                    loaded_player = self.save_slots.load(slot)
+                    if loaded_player:
+                        self.player = loaded_player
+                        self.save_slot = slot
+                        # The loaded save lives for the rest of the session
+                        self.gc_policy.freeze()
+                    self.state = WORLD_MAP
             
-            elif self.state == ITEM_MENU:
+            elif self.state == SAVE_MENU:
+                # The last row saves to a new slot
+                rows = len(self.slot_headers) + 1
                 if event.key == pygame.K_b or event.key == pygame.K_ESCAPE:
                     self.state = WORLD_MAP
+                elif event.key == pygame.K_UP:
+                    self.menu_selection = (self.menu_selection - 1) % rows
+                elif event.key == pygame.K_DOWN:
+                    self.menu_selection = (self.menu_selection + 1) % rows
+                elif event.key == pygame.K_RETURN:
+                    if self.menu_selection < len(self.slot_headers):
+                        slot = self.slot_headers[self.menu_selection]["slot"]
+                    else:
+                        slot = self.new_slot
+                    if self.save_slots.save(self.player, slot):
+                        self.save_slot = slot
+                    self.state = WORLD_MAP
+    
+    def open_slot_menu(self, state):
+        """Open the save or load slot list (only the slot headers are read)"""
+        # Saves from before save slots show up as a slot of their own
+        self.save_slots.import_legacy_save()
+        self.slot_headers = self.save_slots.list_slots()
+        self.new_slot = self.save_slots.next_free_slot()
+        # Saving starts on the slot in use, or on the new slot row for a new game
+        slots = [header["slot"] for header in self.slot_headers]
+        if state == LOAD_MENU:
+            self.menu_selection = 0
+        elif self.save_slot in slots:
+            self.menu_selection = slots.index(self.save_slot)
+        else:
+            self.menu_selection = len(slots)
+        self.state = state
+    
+    def finish_evolution(self):
+        """Replace the evolving monster in the party with its evolved form"""
+        monster = self.evolving
+        evolved_ok, evolved = monster.evolve()
+        if evolved_ok:
+            self.player.monsters[self.player.monsters.index(monster)] = evolved
+            self.player.discovered_monsters.add(evolved.species_id)
+        self.evolving = None
+        self.state = WORLD_MAP
+    
+    def open_monster_menu(self):
+        """Party first, then every monster in storage"""
+        entries = [("party", monster) for monster in self.player.monsters]
+        entries.extend(("storage", slot) for slot in self.player.storage.slots())
+        self.monster_list.set_items(entries)
+        self.state = MONSTER_MENU
+    
+    def open_pokedex(self):
+        self.pokedex_list.set_items(sorted(species_id for species_id in self.player.discovered_monsters
+                                           if species_id in MONSTER_SPECIES))
+        self.state = POKEDEX
+    
+    def open_item_menu(self):
+        self.item_list.set_items([(item_id, count) for item_id, count in self.player.items.items() if count > 0])
+        self.state = ITEM_MENU
+    
+    def menu_list(self):
+        """VirtualList of the current menu"""
+        if self.state == MONSTER_MENU:
+            return self.monster_list
+        elif self.state == POKEDEX:
+            return self.pokedex_list
+        return self.item_list
     
     def start_battle(self, wild_monster):
         """Start battle"""
         self.state = BATTLE
-        self.battle = Battle(self.player, wild_monster)
+        self.battle = Battle(self.player, wild_monster, recorder=BattleRecorder())
+        self.gc_policy.safe_point()
+    
+    def start_trainer_battle(self, trainer):
+        """Start trainer battle"""
+        self.state = BATTLE
+        self.battle = Battle(self.player, trainer=trainer, recorder=BattleRecorder(),
+                             enemy_ai=create_enemy_ai(trainer.difficulty))
+        self.gc_policy.safe_point()
+    
+    def save_battle_log(self):
+        """Save the finished battle so it can be replayed for bug reports"""
+        recorder = self.battle.recorder
+        if recorder.finished:
+            return
+        recorder.finish(self.battle)
+        try:
+            os.makedirs(os.path.dirname(BATTLE_LOG_PATH), exist_ok=True)
+            recorder.save(BATTLE_LOG_PATH)
+        except OSError as e:
+            print(f"Battle log error: {e}")
     
     def draw(self):
         """Screen drawing"""
+        if not self.assets.ready:
+            draw_loading(screen, font, self.assets.progress())
+            return
+        
         screen.fill(WHITE)
         
         if self.state == TITLE:
@@ -181,7 +429,7 @@ class Game:
         elif self.state == WORLD_MAP:
             self.draw_world_map()
         elif self.state == BATTLE:
-            self.battle.draw(screen, font, small_font)
+            self.battle.draw(screen, font, small_font, self.sprite_batch)
         elif self.state == MONSTER_MENU:
             self.draw_monster_menu()
         elif self.state == POKEDEX:
@@ -190,6 +438,14 @@ class Game:
             self.draw_item_menu()
         elif self.state == EVOLUTION:
             self.draw_evolution()
+        elif self.state == LOAD_MENU:
+            self.draw_slot_menu("Load Game")
+        elif self.state == SAVE_MENU:
+            self.draw_slot_menu("Save Game", self.new_slot)
+        
+        if self.show_gc_stats:
+            text = small_font.render(self.gc_policy.format_stats(), True, BLACK)
+            screen.blit(text, (10, HEIGHT - 25))
     
     def draw_title(self):
         """Draw title screen"""
@@ -201,11 +457,21 @@ class Game:
     
     def draw_world_map(self):
         """Draw world map"""
-        # Draw map
-        self.map.draw(screen)
+        # Draw map (tile sprites in one batch)
+        self.map.draw(screen, self.sprite_batch)
+        self.sprite_batch.flush(screen)
+        
+        # Draw roaming monsters and trainers on screen
+        self.map.entities.draw(screen, (0, 0, WIDTH, HEIGHT), self.player.defeated_trainers)
+        
+        # Draw other players (multiplayer)
+        if self.overworld:
+            for player_id, x, y, direction, moving in self.overworld.remote_players():
+                pygame.draw.rect(screen, GREEN, (x, y, self.player.size, self.player.size))
         
         # Draw player
-        self.player.draw(screen)
+        self.player.draw(screen, self.sprite_batch)
+        self.sprite_batch.flush(screen)
         
         # Instructions
         instructions = small_font.render("Arrow Keys: Move  M: Monsters  P: Pokedex  I: Items  S: Save  L: Load", True, BLACK)
@@ -217,36 +483,74 @@ class Game:
         title = font.render("Monster List", True, BLACK)
         screen.blit(title, (WIDTH // 2 - 100, 20))
         
-        for i, monster in enumerate(self.player.monsters):
-            y_pos = 80 + i * 100
-            
-            # Monster frame
-            pygame.draw.rect(screen, WHITE, (50, y_pos, WIDTH - 100, 80))
-            pygame.draw.rect(screen, BLACK, (50, y_pos, WIDTH - 100, 80), 2)
-            
-            # Monster display (simple rectangle)
-            pygame.draw.rect(screen, BLUE, (70, y_pos + 10, 60, 60))
-            
-            # Monster info
-            name = font.render(monster.name, True, BLACK)
-            screen.blit(name, (150, y_pos + 10))
-            
-            type_text = small_font.render(f"Type: {'/'.join(monster.type)}", True, BLACK)
-            screen.blit(type_text, (150, y_pos + 40))
-            
-            hp_text = small_font.render(f"HP: {monster.current_hp}/{monster.max_hp}", True, BLACK)
-            screen.blit(hp_text, (300, y_pos + 10))
-            
-            level_text = small_font.render(f"Level: {monster.level}", True, BLACK)
-            screen.blit(level_text, (300, y_pos + 40))
-            
-            # Move info
-            moves_text = small_font.render(f"Moves: {', '.join([m['name'] for m in monster.moves])}", True, BLACK)
-            screen.blit(moves_text, (450, y_pos + 10))
+        self.monster_list.draw(screen)
         
         # Back button
-        back_text = font.render("Back (B)", True, BLACK)
-        screen.blit(back_text, (WIDTH - 150, HEIGHT - 50))
+        back_text = font.render("Back (Esc)", True, BLACK)
+        screen.blit(back_text, (WIDTH - 170, HEIGHT - 50))
+    
+    def monster_row_key(self, entry):
+        place, value = entry
+        if place == "storage":
+            return (place, value, "icons" in self.assets.atlases) + tuple(self.player.storage.summary(value))
+        monster = value
+        return (place, id(monster), "icons" in self.assets.atlases, monster.name, monster.level,
+                monster.current_hp, monster.max_hp, tuple(m['name'] for m in monster.moves))
+    
+    def monster_search_text(self, entry):
+        place, value = entry
+        if place == "storage":
+            return MONSTER_SPECIES[self.player.storage.summary(value)[0]][0]
+        return value.name
+    
+    def render_monster_row(self, entry, selected, width, height):
+        """One row of the monster menu (storage rows only use the in-memory summary)"""
+        row = pygame.Surface((width, height))
+        row.fill((230, 230, 255))
+        
+        # Monster frame
+        pygame.draw.rect(row, WHITE, (0, 0, width, 80))
+        pygame.draw.rect(row, RED if selected else BLACK, (0, 0, width, 80), 3 if selected else 2)
+        
+        place, value = entry
+        if place == "storage":
+            species_id, level = self.player.storage.summary(value)
+            species_data = MONSTER_SPECIES[species_id]
+            if not self.assets.blit(row, f"icons/{species_id}", (20, 10)):
+                pygame.draw.rect(row, (150, 150, 200), (20, 10, 60, 60))
+            
+            name = font.render(species_data[0], True, BLACK)
+            row.blit(name, (100, 10))
+            type_text = small_font.render(f"Type: {species_data[1]}", True, BLACK)
+            row.blit(type_text, (100, 40))
+            level_text = small_font.render(f"Level: {level}", True, BLACK)
+            row.blit(level_text, (250, 40))
+            box_text = small_font.render(f"Box {value // BOX_SIZE + 1}", True, BLACK)
+            row.blit(box_text, (400, 10))
+            return row
+        
+        monster = value
+        # Monster icon (a plain square until the icons are loaded)
+        if not self.assets.blit(row, f"icons/{monster.species_id}", (20, 10)):
+            pygame.draw.rect(row, BLUE, (20, 10, 60, 60))
+        
+        # Monster info
+        name = font.render(monster.name, True, BLACK)
+        row.blit(name, (100, 10))
+        
+        type_text = small_font.render(f"Type: {'/'.join(monster.type)}", True, BLACK)
+        row.blit(type_text, (100, 40))
+        
+        hp_text = small_font.render(f"HP: {monster.current_hp}/{monster.max_hp}", True, BLACK)
+        row.blit(hp_text, (250, 10))
+        
+        level_text = small_font.render(f"Level: {monster.level}", True, BLACK)
+        row.blit(level_text, (250, 40))
+        
+        # Move info
+        moves_text = small_font.render(f"Moves: {', '.join([m['name'] for m in monster.moves])}", True, BLACK)
+        row.blit(moves_text, (400, 10))
+        return row
     
     def draw_pokedex(self):
         """Draw pokedex"""
@@ -255,22 +559,19 @@ class Game:
         screen.blit(title, (WIDTH // 2 - 100, 20))
         
         # Display discovered monsters
-        from monster_data import MONSTER_SPECIES
-        
-        y_pos = 80
-        for species_id in sorted(self.player.discovered_monsters):
-            if species_id in MONSTER_SPECIES:
-                species_data = MONSTER_SPECIES[species_id]
-                name = species_data[0]
-                type_str = species_data[1]
-                
-                entry = font.render(f"No.{species_id}: {name} ({type_str} type)", True, BLACK)
-                screen.blit(entry, (100, y_pos))
-                y_pos += 40
+        self.pokedex_list.draw(screen)
         
         # Back button
-        back_text = font.render("Back (B)", True, BLACK)
-        screen.blit(back_text, (WIDTH - 150, HEIGHT - 50))
+        back_text = font.render("Back (Esc)", True, BLACK)
+        screen.blit(back_text, (WIDTH - 170, HEIGHT - 50))
+    
+    def render_pokedex_row(self, species_id, selected, width, height):
+        row = pygame.Surface((width, height))
+        row.fill((255, 230, 230))
+        name, type_str = MONSTER_SPECIES[species_id][:2]
+        entry = font.render(f"No.{species_id}: {name} ({type_str} type)", True, RED if selected else BLACK)
+        row.blit(entry, (0, 0))
+        return row
     
     def draw_item_menu(self):
         """Draw item menu"""
@@ -279,19 +580,46 @@ class Game:
         screen.blit(title, (WIDTH // 2 - 50, 20))
         
         # Item list
-        item_names = {
-            "monster_ball": "Monster Ball",
-            "potion": "Potion",
-            "full_restore": "Full Restore"
-        }
-        
-        y_pos = 80
-        for item_id, count in self.player.items.items():
-            if count > 0:
-                name = item_names.get(item_id, item_id)
-                item_text = font.render(f"{name} x {count}", True, BLACK)
-                screen.blit(item_text, (100, y_pos))
-                y_pos += 40
+        self.item_list.draw(screen)
+        
+        # Back button
+        back_text = font.render("Back (Esc)", True, BLACK)
+        screen.blit(back_text, (WIDTH - 170, HEIGHT - 50))
+    
+    def render_item_row(self, item, selected, width, height):
+        row = pygame.Surface((width, height))
+        row.fill((230, 255, 230))
+        item_id, count = item
+        item_text = font.render(f"{ITEM_NAMES.get(item_id, item_id)} x {count}", True, RED if selected else BLACK)
+        row.blit(item_text, (0, 0))
+        return row
+    
+    def draw_slot_menu(self, title_text, new_slot=None):
+        """Draw save slot list (with a new slot row at the end when saving)"""
+        screen.fill((230, 240, 255))
+        title = font.render(title_text, True, BLACK)
+        screen.blit(title, (WIDTH // 2 - 70, 20))
+        
+        if not self.slot_headers and new_slot is None:
+            empty_text = font.render("No saved games", True, BLACK)
+            screen.blit(empty_text, (100, 80))
+        
+        for i, header in enumerate(self.slot_headers):
+            y_pos = 80 + i * 60
+            color = RED if i == self.menu_selection else BLACK
+            
+            slot_text = font.render(f"Slot {header['slot']}: {header['player_name']}  {format_play_time(header['play_time'])}", True, color)
+            screen.blit(slot_text, (100, y_pos))
+            
+            party = ", ".join(f"{name} Lv.{level}" for name, level in header["party"])
+            detail_text = small_font.render(f"Party: {party}  Dex: {header['pokedex_count']}", True, BLACK)
+            screen.blit(detail_text, (120, y_pos + 30))
+        
+        if new_slot is not None:
+            i = len(self.slot_headers)
+            color = RED if i == self.menu_selection else BLACK
+            new_text = font.render(f"New slot ({new_slot})", True, color)
+            screen.blit(new_text, (100, 80 + i * 60))
         
         # Back button
         back_text = font.render("Back (B)", True, BLACK)
@@ -311,16 +639,37 @@ class Game:
         pygame.draw.rect(screen, RED, (450, 250, 100, 100))
         
         # Text
-        evolving_text = font.render("Evolving...", True, WHITE)
-        screen.blit(evolving_text, (WIDTH // 2 - 50, 400))
+        evolving_text = font.render(f"{self.evolving.name} is evolving!", True, WHITE)
+        screen.blit(evolving_text, (WIDTH // 2 - evolving_text.get_width() // 2, 400))
+        continue_text = small_font.render("Press ENTER", True, WHITE)
+        screen.blit(continue_text, (WIDTH // 2 - continue_text.get_width() // 2, 450))
 
 # Main game loop
+def init_display():
+    """Initialize pygame and open the game window"""
+    global screen, font, small_font
+    pygame.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Monster Collection Game")
+    font = pygame.font.SysFont(None, 36)
+    small_font = pygame.font.SysFont(None, 24)
+
 def main():
+    init_display()
     clock = pygame.time.Clock()
-    game = Game()
+    
+    # Multiplayer: python game.py host:port (see overworld_sync.py for the server)
+    overworld = None
+    if len(sys.argv) > 1:
+        host, port = sys.argv[1].rsplit(":", 1)
+        overworld = OverworldClient((host, int(port)))
+    game = Game(overworld)
     
     running = True
     while running:
+        frame_start = time.perf_counter()
+        
         # Event handling
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -334,8 +683,16 @@ def main():
         # Draw
         game.draw()
         
+        # Use what is left of the frame before waiting for the next one
+        game.idle(frame_start + FRAME_TIME)
+        
         pygame.display.flip()
-        clock.tick(60)
+        game.player.play_time += clock.tick(60) / 1000
+    
+    game.entity_worker.stop()
+    game.assets.stop()
+    if overworld:
+        overworld.close()
 
 if __name__ == "__main__":
     main()
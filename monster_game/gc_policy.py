@@ -0,0 +1,106 @@
+import gc
+import time
+from collections import deque
+
+# Every this many safe points also run a full (generation 2) collection
+FULL_COLLECTION_INTERVAL = 8
+# Young objects allowed to pile up between safe points before generation 0
+# is collected anyway (a young collection takes well under a millisecond)
+EMERGENCY_THRESHOLD = 50000
+# Collections kept for the pause metrics
+HISTORY_SIZE = 256
+
+
+class GCPolicy:
+    """Keeps cyclic garbage collection out of gameplay frames
+
+    Automatic collection is turned off while the policy is enabled. The game
+    calls safe_point() at transitions where a short pause can't be seen
+    (entering or leaving a battle, loading), and freeze() after loading long
+    lived data so later collections don't walk it again. frame() is a
+    backstop that collects the young generation if allocations pile up.
+    Every collection, automatic or not, is timed through gc.callbacks.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.safe_points = 0
+        self.pauses = deque(maxlen=HISTORY_SIZE)  # (generation, seconds, collected)
+        self.collections = [0, 0, 0]
+        self.total_pause = 0.0
+        self.max_pause = 0.0
+        self.collected = 0
+        self._started = None
+        self._was_enabled = True
+
+    def _callback(self, phase, info):
+        if phase == "start":
+            self._started = time.perf_counter()
+        elif self._started is not None:
+            pause = time.perf_counter() - self._started
+            self._started = None
+            generation = info["generation"]
+            self.pauses.append((generation, pause, info["collected"]))
+            self.collections[generation] += 1
+            self.total_pause += pause
+            self.max_pause = max(self.max_pause, pause)
+            self.collected += info["collected"]
+
+    def enable(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        self._was_enabled = gc.isenabled()
+        gc.callbacks.append(self._callback)
+        gc.disable()
+
+    def disable(self):
+        """Hand collection back to the interpreter"""
+        if not self.enabled:
+            return
+        self.enabled = False
+        gc.callbacks.remove(self._callback)
+        if self._was_enabled:
+            gc.enable()
+
+    def freeze(self):
+        """Collect, then move everything alive to the permanent generation
+
+        Call after loading static data or a save: those objects live for
+        the rest of the session and never need to be scanned again.
+        """
+        gc.collect()
+        gc.freeze()
+
+    def safe_point(self, full=False):
+        """Collect now, while the screen is changing anyway"""
+        self.safe_points += 1
+        if full or self.safe_points % FULL_COLLECTION_INTERVAL == 0:
+            gc.collect(2)
+        else:
+            gc.collect(1)
+
+    def frame(self):
+        """Per-frame backstop; only collects if far too many young objects are waiting"""
+        if self.enabled and gc.get_count()[0] > EMERGENCY_THRESHOLD:
+            gc.collect(0)
+
+    def stats(self):
+        """Pause metrics (times in milliseconds)"""
+        recent = sorted(pause for _, pause, _ in self.pauses)
+        return {
+            "collections": tuple(self.collections),
+            "collected": self.collected,
+            "total_ms": self.total_pause * 1000,
+            "max_ms": self.max_pause * 1000,
+            "last_ms": self.pauses[-1][1] * 1000 if self.pauses else 0.0,
+            "p95_ms": recent[int(len(recent) * 0.95)] * 1000 if recent else 0.0,
+            "frozen": gc.get_freeze_count(),
+            "pending": gc.get_count(),
+        }
+
+    def format_stats(self):
+        stats = self.stats()
+        return "GC {} | last {:.2f} ms  p95 {:.2f} ms  max {:.2f} ms | frozen {}".format(
+            "/".join(str(count) for count in stats["collections"]),
+            stats["last_ms"], stats["p95_ms"], stats["max_ms"], stats["frozen"])
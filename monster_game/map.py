@@ -1,5 +1,10 @@
 import pygame
 import random
+from overworld_entities import EntityLayer
+from monster_data import TRAINERS
+
+# マップ上を歩き回る野生モンスターの数
+WILD_MONSTER_COUNT = 12
 
 class GameMap:
     def __init__(self, width=800, height=600, tile_size=40):
@@ -30,6 +35,10 @@ class GameMap:
         
         # エリア情報
         self.areas = self.define_areas()
+        
+        # 歩き回る野生モンスターとトレーナー（プレイヤーの初期位置の近くは避ける）
+        self.entities = EntityLayer(self)
+        self.entities.populate(WILD_MONSTER_COUNT, list(TRAINERS), avoid=(width // 2, height // 2))
     
     def generate_map(self):
         """シンプルなマップを生成"""
@@ -107,14 +116,16 @@ class GameMap:
         
         return areas
     
-    def draw(self, screen):
-        """マップを描画"""
+    def draw(self, screen, batch=None):
+        """マップを描画（batchがあればタイル画像をまとめて描く。描画はbatch.flushで）"""
         cols = self.width // self.tile_size
         rows = self.height // self.tile_size
         
         for i in range(rows):
             for j in range(cols):
                 tile_type = self.tiles[i][j]
+                if batch and batch.add(f"tiles/{tile_type}", (j * self.tile_size, i * self.tile_size)):
+                    continue
                 color = self.tile_colors.get(tile_type, (0, 0, 0))
                 
                 rect = pygame.Rect(j * self.tile_size, i * self.tile_size, 
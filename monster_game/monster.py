@@ -1,22 +1,58 @@
 import random
-from monster_data import MONSTER_SPECIES, MOVES, TYPE_CHART, LEARNABLE_MOVES
+import monster_data
+from battle_events import (BattleEvent, format_events, CONFUSED, NO_PP, WOKE_UP, ASLEEP,
+                           FULLY_PARALYZED, MISS, MOVE_USED, DAMAGE, EFFECTIVENESS,
+                           FAINTED)
+from move_effects import (effects_of, STAGE_MULTIPLIERS, MAX_STAGE, fixed_damage,
+                          apply_after_hit, apply_end_of_turn)
+
+# 状態異常の一覧（セーブデータなどで数値コードとして扱う際の順序）
+STATUS_CONDITIONS = (None, "sleep", "paralysis", "poison", "burn")
+
+# プロセス間で共有する数値テーブル（shared_tables.GameTables、Noneならmonster_dataの辞書を使う）
+# monster_dataの辞書は使う時まで作られないので、共有テーブルを読むプロセスでは作られない
+_shared_tables = None
+
+
+def use_shared_tables(tables):
+    """種族・技・習得技・タイプ相性をtablesから読むようにする（Noneで辞書に戻す）"""
+    global _shared_tables
+    _shared_tables = tables
+
+
+def shared_tables_in_use():
+    return _shared_tables
+
+
+def create_move(move_id, move=None):
+    """技IDから技データ（辞書）を作成（moveを渡すとその辞書を書き換えて再利用）"""
+    move_data = _shared_tables.move(move_id) if _shared_tables else monster_data.MOVES.get(move_id)
+    if not move_data:
+        return None
+    if move is None:
+        move = {}
+    move['id'] = move_id
+    move['name'] = move_data[0]
+    move['type'] = move_data[1]
+    move['power'] = move_data[2]
+    move['accuracy'] = move_data[3]
+    move['pp'] = move_data[4]
+    move['current_pp'] = move_data[4]
+    return move
 
 class Monster:
+    # 能力ランク（バトル中だけの変化、-6～+6）
+    attack_stage = 0
+    defense_stage = 0
+    
     def __init__(self, species_id, level=5, is_wild=False):
+        self.moves = []
+        self.reset(species_id, level, is_wild)
+    
+    def reset(self, species_id, level=5, is_wild=False):
+        """作り直したのと同じ状態に戻す（MonsterPoolで再利用するため）"""
         # 種族データの取得
-        species_data = MONSTER_SPECIES.get(species_id)
-        if not species_data:
-            raise ValueError(f"Invalid species ID: {species_id}")
-        
-        self.species_id = species_id
-        self.name = species_data[0]
-        self.type = species_data[1].split('/')  # タイプは複数の場合がある
-        self.base_hp = species_data[2]
-        self.base_attack = species_data[3]
-        self.base_defense = species_data[4]
-        self.base_speed = species_data[5]
-        self.evolution_level = species_data[6]
-        self.evolution_to = species_data[7]
+        self._apply_species(species_id)
         
         # レベルとステータス
         self.level = level
@@ -29,17 +65,38 @@ class Monster:
         # 現在のHP
         self.current_hp = self.max_hp
         
-        # 技リスト
+        # 技リスト（前の技の辞書は使い回す）
+        spare_moves = self.moves
         self.moves = []
-        self.learn_moves_for_level()
+        self.learn_moves_for_level(spare_moves)
         
         # 状態異常
         self.status_condition = None
         self.status_counter = 0
+        self.clear_stat_stages()
         
         # 野生かどうか
         self.is_wild = is_wild
     
+    def _apply_species(self, species_id):
+        """種族データを反映"""
+        if _shared_tables:
+            species_data = _shared_tables.species(species_id)
+        else:
+            species_data = monster_data.MONSTER_SPECIES.get(species_id)
+        if not species_data:
+            raise ValueError(f"Invalid species ID: {species_id}")
+        
+        self.species_id = species_id
+        self.name = species_data[0]
+        self.type = species_data[1].split('/')  # タイプは複数の場合がある
+        self.base_hp = species_data[2]
+        self.base_attack = species_data[3]
+        self.base_defense = species_data[4]
+        self.base_speed = species_data[5]
+        self.evolution_level = species_data[6]
+        self.evolution_to = species_data[7]
+    
     def calculate_stats(self):
         """レベルに基づいてステータスを計算"""
         self.max_hp = int((self.base_hp * 2 * self.level) / 100) + self.level + 10
@@ -47,9 +104,12 @@ class Monster:
         self.defense = int((self.base_defense * 2 * self.level) / 100) + 5
         self.speed = int((self.base_speed * 2 * self.level) / 100) + 5
     
-    def learn_moves_for_level(self):
-        """現在のレベルで覚えるべき技を習得"""
-        learnable = LEARNABLE_MOVES.get(self.species_id, {})
+    def learn_moves_for_level(self, spare_moves=None):
+        """現在のレベルで覚えるべき技を習得（spare_movesは再利用できる技の辞書）"""
+        if _shared_tables:
+            learnable = _shared_tables.learnset(self.species_id)
+        else:
+            learnable = monster_data.LEARNABLE_MOVES.get(self.species_id, {})
         
         # レベルごとに覚える技をチェック
         for level, move_ids in learnable.items():
@@ -57,91 +117,118 @@ class Monster:
                 for move_id in move_ids:
                     # 既に覚えている技は追加しない
                     if not any(m['id'] == move_id for m in self.moves):
-                        move_data = MOVES.get(move_id)
-                        if move_data:
-                            self.moves.append({
-                                'id': move_id,
-                                'name': move_data[0],
-                                'type': move_data[1],
-                                'power': move_data[2],
-                                'accuracy': move_data[3],
-                                'pp': move_data[4],
-                                'current_pp': move_data[4]
-                            })
+                        move = create_move(move_id, spare_moves.pop() if spare_moves else None)
+                        if move:
+                            self.moves.append(move)
         
         # 最大4つまで
         self.moves = self.moves[-4:] if len(self.moves) > 4 else self.moves
     
-    def use_move(self, move_index, target):
-        """Use a move"""
+    def clear_stat_stages(self):
+        """能力ランクを元に戻す（バトル開始時・交代時）"""
+        self.attack_stage = 0
+        self.defense_stage = 0
+    
+    def use_move(self, move_index, target, rng=random):
+        """Use a move and return the result as text"""
+        return format_events(self.execute_move(move_index, target, rng))
+    
+    def execute_move(self, move_index, target, rng=random):
+        """Use a move and return what happened as a list of BattleEvents
+        
+        rng is the random number source, e.g. a battle's own random.Random.
+        """
+        events = self._act(move_index, target, rng)
+        
+        # Poison and burn hurt at the end of the monster's own turn
+        if self.status_condition is not None:
+            apply_end_of_turn(self, events)
+        return events
+    
+    def _act(self, move_index, target, rng):
         if move_index >= len(self.moves):
-            return f"{self.name} is confused!"
+            return [BattleEvent(CONFUSED, self, None, None)]
         
         move = self.moves[move_index]
         
         # Check PP
         if move['current_pp'] <= 0:
-            return f"No PP left for {move['name']}!"
+            return [BattleEvent(NO_PP, self, None, move['name'])]
         
         # Check status conditions
         if self.status_condition:
             if self.status_condition == "sleep":
-                if random.random() < 0.3:  # 30% chance to wake up
+                if rng.random() < 0.3:  # 30% chance to wake up
                     self.status_condition = None
-                    return f"{self.name} woke up!"
+                    return [BattleEvent(WOKE_UP, self, None, None)]
                 else:
-                    return f"{self.name} is sleeping!"
+                    return [BattleEvent(ASLEEP, self, None, None)]
             elif self.status_condition == "paralysis":
-                if random.random() < 0.25:  # 25% chance to be fully paralyzed
-                    return f"{self.name} is paralyzed and can't move!"
+                if rng.random() < 0.25:  # 25% chance to be fully paralyzed
+                    return [BattleEvent(FULLY_PARALYZED, self, None, None)]
         
         # Check accuracy
-        if random.randint(1, 100) > move['accuracy']:
-            return f"{self.name}'s {move['name']} missed!"
+        if rng.randint(1, 100) > move['accuracy']:
+            return [BattleEvent(MISS, self, target, move['name'])]
         
         # Reduce PP
         move['current_pp'] -= 1
         
         # Calculate damage
-        damage = self.calculate_damage(move, target)
+        effects = effects_of(move['id'])
+        damage = self.calculate_damage(move, target, rng, effects)
         
         # Reduce target's HP
         target.current_hp -= damage
         target.current_hp = max(0, target.current_hp)
         
-        # Effectiveness text
-        effectiveness = self.calculate_type_effectiveness(move['type'], target.type)
-        effect_text = ""
-        if effectiveness > 1.5:
-            effect_text = "It's super effective!"
-        elif effectiveness < 0.5 and effectiveness > 0:
-            effect_text = "It's not very effective..."
-        elif effectiveness == 0:
-            effect_text = "It has no effect..."
-        
-        # Status effect (example)
-        status_effect = ""
-        if move['name'] == "Thunder Shock" and random.random() < 0.3:
-            target.status_condition = "paralysis"
-            status_effect = f"{target.name} is paralyzed!"
-        
-        result = f"{self.name} used {move['name']}! "
+        events = [BattleEvent(MOVE_USED, self, target, move['name'])]
         if damage > 0:
-            result += f"{target.name} took {damage} damage! "
-        if effect_text:
-            result += effect_text + " "
-        if status_effect:
-            result += status_effect
+            events.append(BattleEvent(DAMAGE, self, target, damage))
+        
+        # Type effectiveness
+        effectiveness = self.calculate_type_effectiveness(move['type'], target.type)
+        if effectiveness != 1.0:
+            events.append(BattleEvent(EFFECTIVENESS, self, target, effectiveness))
+        
+        if damage > 0 and target.current_hp == 0:
+            events.append(BattleEvent(FAINTED, self, target, None))
+        
+        # Added effects (status conditions, stat stages, recoil; see move_effects.py)
+        if effects.after_hit:
+            apply_after_hit(effects, self, target, damage, rng, events)
         
-        return result.strip()
+        return events
     
-    def calculate_damage(self, move, target):
-        """ダメージ計算"""
+    def calculate_damage(self, move, target, rng=random, effects=None):
+        """ダメージ計算（effectsは技の効果、省略すると技IDから引く）"""
+        if effects is None:
+            effects = effects_of(move['id'])
+        if effects.fixed_damage is not None:
+            return fixed_damage(effects, self, move, target)
         if move['power'] == 0:
             return 0
         
+        damage, effectiveness = self.calculate_base_damage(move, target)
+        
+        # 乱数（0.85～1.0）
+        random_factor = rng.uniform(0.85, 1.0)
+        
+        # 最終ダメージ
+        final_damage = int(damage * random_factor)
+        return max(1, final_damage) if effectiveness > 0 else 0
+    
+    def calculate_base_damage(self, move, target):
+        """乱数を掛ける前のダメージとタイプ相性を返す"""
+        # 能力ランク
+        attack = self.attack
+        defense = target.defense
+        if self.attack_stage or target.defense_stage:
+            attack *= STAGE_MULTIPLIERS[self.attack_stage + MAX_STAGE]
+            defense *= STAGE_MULTIPLIERS[target.defense_stage + MAX_STAGE]
+        
         # 基本ダメージ
-        damage = ((2 * self.level / 5 + 2) * move['power'] * self.attack / target.defense) / 50 + 2
+        damage = ((2 * self.level / 5 + 2) * move['power'] * attack / defense) / 50 + 2
         
         # タイプ一致ボーナス
         stab = 1.5 if move['type'] in self.type else 1.0
@@ -149,19 +236,19 @@ class Monster:
         # タイプ相性
         effectiveness = self.calculate_type_effectiveness(move['type'], target.type)
         
-        # 乱数（0.85～1.0）
-        random_factor = random.uniform(0.85, 1.0)
-        
-        # 最終ダメージ
-        final_damage = int(damage * stab * effectiveness * random_factor)
-        return max(1, final_damage) if effectiveness > 0 else 0
+        return damage * stab * effectiveness, effectiveness
     
     def calculate_type_effectiveness(self, attack_type, defense_types):
         """タイプ相性の計算"""
         effectiveness = 1.0
+        if _shared_tables:
+            for defense_type in defense_types:
+                effectiveness *= _shared_tables.type_multiplier(attack_type, defense_type)
+            return effectiveness
+        type_chart = monster_data.TYPE_CHART
         for defense_type in defense_types:
-            if attack_type in TYPE_CHART and defense_type in TYPE_CHART[attack_type]:
-                effectiveness *= TYPE_CHART[attack_type][defense_type]
+            if attack_type in type_chart and defense_type in type_chart[attack_type]:
+                effectiveness *= type_chart[attack_type][defense_type]
         return effectiveness
     
     def gain_exp(self, amount):
@@ -268,6 +355,7 @@ class Monster:
             'species_id': self.species_id,
             'level': self.level,
             'exp': self.exp,
+            'exp_to_next_level': self.exp_to_next_level,
             'current_hp': self.current_hp,
             'moves': self.moves,
             'status_condition': self.status_condition,
@@ -276,17 +364,36 @@ class Monster:
     
     @classmethod
     def from_dict(cls, data):
-        """辞書からモンスターを復元（ロード用）"""
-        monster = cls(data['species_id'], data['level'], data['is_wild'])
+        """辞書からモンスターを復元（ロード用）
+        
+        コンストラクタを経由せず、セーブされた状態をそのまま反映する。
+        技の再習得や現在HPの再計算は行わない。
+        """
+        monster = cls.__new__(cls)
+        monster._apply_species(data['species_id'])
+        
+        monster.level = data['level']
         monster.exp = data['exp']
+        # 古いセーブデータには次レベルまでの経験値が無いのでレベルから推定
+        monster.exp_to_next_level = data.get('exp_to_next_level', 20 * monster.level)
+        monster.calculate_stats()
+        
         monster.current_hp = data['current_hp']
         monster.moves = data['moves']
         monster.status_condition = data['status_condition']
+        monster.status_counter = 0
+        monster.clear_stat_stages()
+        monster.is_wild = data['is_wild']
         return monster
+    
+    @classmethod
+    def from_dicts(cls, data_list):
+        """複数のモンスターをまとめて復元（ボックスなど大量ロード用）"""
+        from_dict = cls.from_dict
+        return [from_dict(data) for data in data_list]
 
-
-def generate_wild_monster(area="grass", min_level=3, max_level=10):
-    """野生モンスターの生成"""
+def choose_wild_species(area="grass", min_level=3, max_level=10, rng=random):
+    """野生モンスターの種類とレベルを決める（モンスターはまだ作らない）"""
     # エリアごとの出現モンスター
     area_monsters = {
         "grass": [1, 7, 13],  # 草原エリアに出現するモンスターID
@@ -299,10 +406,57 @@ def generate_wild_monster(area="grass", min_level=3, max_level=10):
     monster_pool = area_monsters.get(area, [1, 4, 7, 10, 13, 15])
     
     # ランダムに選択
-    species_id = random.choice(monster_pool)
-    level = random.randint(min_level, max_level)
+    species_id = rng.choice(monster_pool)
+    level = rng.randint(min_level, max_level)
+    return species_id, level
+
+
+class MonsterPool:
+    """使い終わった野生モンスターを再利用するプール
+    
+    逃げた・倒した野生モンスターをrelease()で戻すと、次のacquire()で
+    reset()して使い回す。遭遇のたびにモンスターと技の辞書を作り直さない
+    ので、長時間のプレイでもGCの対象になるゴミが増えない。
+    """
+    
+    def __init__(self, max_size=16):
+        self.max_size = max_size
+        self.free = []
+        self.created = 0   # 新しく作った数
+        self.reused = 0    # プールから再利用した数
+        self.released = 0  # プールに戻された数
+    
+    def acquire(self, species_id, level, is_wild=True):
+        if self.free:
+            monster = self.free.pop()
+            monster.reset(species_id, level, is_wild)
+            self.reused += 1
+            return monster
+        self.created += 1
+        return Monster(species_id, level, is_wild)
+    
+    def release(self, monster):
+        """プレイヤーが持っていないモンスターだけを戻すこと"""
+        if len(self.free) < self.max_size:
+            self.free.append(monster)
+            self.released += 1
+    
+    def stats(self):
+        return {"free": len(self.free), "created": self.created,
+                "reused": self.reused, "released": self.released}
+
+
+# 野生モンスター用の共有プール
+wild_monster_pool = MonsterPool()
+
+
+def generate_wild_monster(area="grass", min_level=3, max_level=10, rng=random, pool=None):
+    """野生モンスターの生成（poolを渡すとそこから再利用）"""
+    species_id, level = choose_wild_species(area, min_level, max_level, rng)
     
     # モンスター生成
+    if pool is not None:
+        return pool.acquire(species_id, level, is_wild=True)
     monster = Monster(species_id, level, is_wild=True)
     
     return monster
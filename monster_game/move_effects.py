@@ -0,0 +1,147 @@
+from collections import namedtuple
+import monster_data
+from battle_events import (BattleEvent, STATUS_APPLIED, STAT_CHANGED, RECOIL_DAMAGE, STATUS_DAMAGE,
+                           FAINTED)
+
+# Effect kinds of MOVE_EFFECTS entries ([kind, chance %, arguments...])
+STATUS = "status"              # [STATUS, chance, condition]: the target gets a status condition
+FIXED_DAMAGE = "fixed_damage"  # [FIXED_DAMAGE, 100, amount or LEVEL]: replaces the damage formula
+STAT_STAGE = "stat_stage"      # [STAT_STAGE, chance, "self" or "target", stat, stages]
+RECOIL = "recoil"              # [RECOIL, chance, percent]: the user takes part of the damage dealt
+
+# Fixed damage equal to the user's level
+LEVEL = "level"
+
+# Status conditions that hurt their holder at the end of its turn (max HP divided by this)
+END_OF_TURN_DAMAGE = {"poison": 8, "burn": 16}
+
+# Stats with stages (speed doesn't affect battles yet), from -MAX_STAGE to MAX_STAGE
+STAGE_STATS = ("attack", "defense")
+MAX_STAGE = 6
+# Multiplier of a stat at each stage: STAGE_MULTIPLIERS[stage + MAX_STAGE]
+STAGE_MULTIPLIERS = tuple(max(2, 2 + stage) / max(2, 2 - stage)
+                          for stage in range(-MAX_STAGE, MAX_STAGE + 1))
+
+# A move's effects compiled for dispatch:
+#   fixed_damage  None (damage formula), an amount or LEVEL
+#   after_hit     ((handler, probability, arguments), ...) run in order after a hit
+#   status        (condition, probability) of the first status effect, or None
+#   stages        ((who, stat, stages, probability), ...)
+#   recoil        percent of the damage dealt (0 for none)
+# The last three describe the same effects for models that don't run the
+# handlers (enemy_ai, vector_env).
+CompiledEffects = namedtuple("CompiledEffects", "fixed_damage after_hit status stages recoil")
+NO_EFFECTS = CompiledEffects(None, (), None, (), 0)
+
+
+def _inflict_status(attacker, target, damage, arguments, events):
+    condition = arguments[0]
+    if target.current_hp > 0 and target.status_condition is None:
+        target.status_condition = condition
+        target.status_counter = 0
+        events.append(BattleEvent(STATUS_APPLIED, attacker, target, condition))
+
+
+def _change_stage(attacker, target, damage, arguments, events):
+    who, stat, stages = arguments
+    monster = attacker if who == "self" else target
+    if monster.current_hp <= 0:
+        return
+    attribute = stat + "_stage"
+    old = getattr(monster, attribute)
+    new = max(-MAX_STAGE, min(MAX_STAGE, old + stages))
+    if new != old:
+        setattr(monster, attribute, new)
+        events.append(BattleEvent(STAT_CHANGED, attacker, monster, (stat, new - old)))
+
+
+def _recoil(attacker, target, damage, arguments, events):
+    if damage <= 0:
+        return
+    amount = max(1, damage * arguments[0] // 100)
+    attacker.current_hp = max(0, attacker.current_hp - amount)
+    events.append(BattleEvent(RECOIL_DAMAGE, attacker, None, amount))
+    if attacker.current_hp == 0:
+        events.append(BattleEvent(FAINTED, None, attacker, None))
+
+
+EFFECT_HANDLERS = {
+    STATUS: _inflict_status,
+    STAT_STAGE: _change_stage,
+    RECOIL: _recoil,
+}
+
+
+def compile_effects(move_effects):
+    """{move ID: CompiledEffects} from MOVE_EFFECTS-style descriptors"""
+    compiled = {}
+    for move_id, descriptors in move_effects.items():
+        fixed_damage = None
+        after_hit = []
+        status = None
+        stages = []
+        recoil = 0
+        for kind, chance, *arguments in descriptors:
+            probability = chance / 100
+            if kind == FIXED_DAMAGE:
+                fixed_damage = arguments[0]
+                continue
+            handler = EFFECT_HANDLERS.get(kind)
+            if handler is None:
+                raise ValueError(f"Move {move_id}: unknown effect kind {kind!r}")
+            after_hit.append((handler, probability, tuple(arguments)))
+            if kind == STATUS and status is None:
+                status = (arguments[0], probability)
+            elif kind == STAT_STAGE:
+                stages.append((*arguments, probability))
+            elif kind == RECOIL:
+                recoil = arguments[0]
+        compiled[move_id] = CompiledEffects(fixed_damage, tuple(after_hit), status, tuple(stages), recoil)
+    return compiled
+
+
+# Effects of every move, compiled on first use (from monster_data.MOVE_EFFECTS unless
+# use_move_effects() gave other descriptors, e.g. those in the shared game tables)
+_effects = None
+
+
+def use_move_effects(move_effects):
+    """Compile the effects from MOVE_EFFECTS-style descriptors (None: monster_data's on next use)"""
+    global _effects
+    _effects = None if move_effects is None else compile_effects(move_effects)
+
+
+def effects_of(move_id):
+    global _effects
+    if _effects is None:
+        _effects = compile_effects(monster_data.MOVE_EFFECTS)
+    return _effects.get(move_id, NO_EFFECTS)
+
+
+def fixed_damage(effects, attacker, move, target):
+    """Damage of a fixed-damage move: the amount (or the user's level) unless the target is immune"""
+    amount = attacker.level if effects.fixed_damage == LEVEL else effects.fixed_damage
+    return amount if attacker.calculate_type_effectiveness(move['type'], target.type) > 0 else 0
+
+
+def apply_after_hit(effects, attacker, target, damage, rng, events):
+    """Roll for and apply a move's added effects after it hit"""
+    for handler, probability, arguments in effects.after_hit:
+        if probability >= 1.0 or rng.random() < probability:
+            handler(attacker, target, damage, arguments, events)
+
+
+def end_of_turn_damage(monster):
+    """HP a monster loses at the end of its turn (0 without a damaging status)"""
+    divisor = END_OF_TURN_DAMAGE.get(monster.status_condition)
+    return max(1, monster.max_hp // divisor) if divisor else 0
+
+
+def apply_end_of_turn(monster, events):
+    """Poison and burn damage after the monster's turn"""
+    amount = end_of_turn_damage(monster)
+    if amount and monster.current_hp > 0:
+        monster.current_hp = max(0, monster.current_hp - amount)
+        events.append(BattleEvent(STATUS_DAMAGE, monster, None, monster.status_condition))
+        if monster.current_hp == 0:
+            events.append(BattleEvent(FAINTED, None, monster, None))
@@ -0,0 +1,298 @@
+import random
+import pygame
+from monster import Monster, choose_wild_species
+from monster_data import MONSTER_SPECIES
+from spatial_hash import SpatialHash
+
+CELL_SIZE = 128
+MONSTER_SIZE = 30
+TRAINER_SIZE = 40
+
+ROAM_SPEED = 2  # Pixels per frame
+TRAINER_SIGHT_TILES = 4
+TRAINER_COOLDOWN = 180  # Frames before a trainer can spot the player again after a battle
+
+# Wild monsters on the map are topped up one at a time
+RESPAWN_FRAMES = 120
+SPAWN_MIN_DISTANCE = 160  # Pixels from the player
+
+DIRECTION_VECTORS = {"up": (0, -1), "down": (0, 1), "left": (-1, 0), "right": (1, 0)}
+
+TYPE_COLORS = {
+    "Fire": (230, 90, 40),
+    "Water": (60, 120, 230),
+    "Grass": (40, 160, 60),
+    "Rock": (140, 120, 90),
+    "Electric": (240, 210, 40),
+    "Ghost": (120, 80, 160),
+}
+
+
+class OverworldEntity:
+    """Something standing on the map (indexed by its top-left corner)"""
+
+    solid = False  # Solid entities block the player
+
+    def __init__(self, x, y, size):
+        self.x = x
+        self.y = y
+        self.size = size
+        self.cell = None  # Set by the spatial hash
+
+    def center(self):
+        return self.x + self.size / 2, self.y + self.size / 2
+
+
+class RoamingMonster(OverworldEntity):
+    """Visible wild monster; the Monster is only created on encounter"""
+
+    def __init__(self, species_id, level, x, y, home_tile, entity_id=0):
+        super().__init__(x, y, MONSTER_SIZE)
+        self.entity_id = entity_id  # Identifies the monster to the entity worker
+        self.species_id = species_id
+        self.level = level
+        self.home_tile = home_tile  # Tile type the monster stays on
+        self.dx = 0
+        self.dy = 0
+        self.steps_left = 0
+        self.color = TYPE_COLORS.get(MONSTER_SPECIES[species_id][1].split('/')[0], (200, 200, 200))
+
+    def pick_direction(self, rng):
+        if rng.random() < 0.5:
+            self.dx = self.dy = 0
+        else:
+            dx, dy = rng.choice(list(DIRECTION_VECTORS.values()))
+            self.dx, self.dy = dx * ROAM_SPEED, dy * ROAM_SPEED
+        self.steps_left = rng.randint(30, 90)
+
+    def advance(self, tiles, tile_size, rng):
+        """Wander for one frame, staying on the home tile type; returns True if it moved"""
+        if self.steps_left <= 0:
+            self.pick_direction(rng)
+            return False
+        self.steps_left -= 1
+        if not self.dx and not self.dy:
+            return False
+
+        x = self.x + self.dx
+        y = self.y + self.dy
+        half = self.size // 2
+        col = (x + half) // tile_size
+        row = (y + half) // tile_size
+        if 0 <= row < len(tiles) and 0 <= col < len(tiles[0]) and tiles[row][col] == self.home_tile:
+            self.x = x
+            self.y = y
+            return True
+        self.steps_left = 0
+        return False
+
+    def create_monster(self, pool=None):
+        if pool is not None:
+            return pool.acquire(self.species_id, self.level, is_wild=True)
+        return Monster(self.species_id, self.level, is_wild=True)
+
+    def draw(self, screen):
+        half = self.size // 2
+        pygame.draw.circle(screen, self.color, (int(self.x) + half, int(self.y) + half), half)
+
+
+class NPCTrainer(OverworldEntity):
+    """Trainer standing on the map, challenging the player on sight"""
+
+    solid = True
+
+    def __init__(self, trainer_id, x, y, direction, sight):
+        super().__init__(x, y, TRAINER_SIZE)
+        self.trainer_id = trainer_id
+        self.direction = direction
+        self.sight = sight  # Pixels
+        self.cooldown = 0
+
+    def sight_rect(self):
+        """(x, y, width, height) of the strip the trainer can see"""
+        if self.direction == "down":
+            return self.x, self.y + self.size, self.size, self.sight
+        elif self.direction == "up":
+            return self.x, self.y - self.sight, self.size, self.sight
+        elif self.direction == "left":
+            return self.x - self.sight, self.y, self.sight, self.size
+        return self.x + self.size, self.y, self.sight, self.size
+
+    def draw(self, screen, defeated=False):
+        color = (150, 150, 150) if defeated else (160, 60, 200)
+        pygame.draw.rect(screen, color, (self.x, self.y, self.size, self.size))
+
+        # Facing direction
+        dx, dy = DIRECTION_VECTORS[self.direction]
+        half = self.size // 2
+        center = (self.x + half + dx * half // 2, self.y + half + dy * half // 2)
+        pygame.draw.circle(screen, (255, 255, 255), center, 5)
+
+
+def _overlaps(ax, ay, aw, ah, bx, by, bw, bh):
+    return ax < bx + bw and bx < ax + aw and ay < by + bh and by < ay + ah
+
+
+class EntityLayer:
+    """Roaming monsters and NPC trainers on a GameMap
+
+    All entities live in a spatial hash, so encounter checks, trainer line
+    of sight, collision and draw culling only look at cells near the player
+    or the viewport, however many entities the map holds.
+    """
+
+    def __init__(self, game_map, cell_size=CELL_SIZE, rng=random):
+        self.game_map = game_map
+        self.rng = rng
+        self.hash = SpatialHash(cell_size, max(MONSTER_SIZE, TRAINER_SIZE))
+        self.roamers = []
+        self.trainers = []
+        self.cooling = set()  # Trainers with a cooldown running
+        self.target_roamers = 0
+        self.frame = 0
+        self.next_entity_id = 1
+        self.worker = None  # EntityWorker moving the roamers in another process
+
+    def add(self, entity):
+        self.hash.insert(entity)
+        if isinstance(entity, RoamingMonster):
+            self.roamers.append(entity)
+            if self.worker:
+                self.worker.add(entity)
+        elif isinstance(entity, NPCTrainer):
+            self.trainers.append(entity)
+
+    def remove(self, entity):
+        self.hash.remove(entity)
+        if isinstance(entity, RoamingMonster):
+            self.roamers.remove(entity)
+            if self.worker:
+                self.worker.remove(entity.entity_id)
+        elif isinstance(entity, NPCTrainer):
+            self.trainers.remove(entity)
+            self.cooling.discard(entity)
+
+    def _random_tile(self, tile_types, avoid=None, min_distance=0):
+        """Top-left corner of a random tile of the given types (None if none was found)"""
+        game_map = self.game_map
+        rows = len(game_map.tiles)
+        cols = len(game_map.tiles[0])
+        for _ in range(50):
+            row = self.rng.randrange(rows)
+            col = self.rng.randrange(cols)
+            if game_map.tiles[row][col] not in tile_types:
+                continue
+            x, y = col * game_map.tile_size, row * game_map.tile_size
+            if avoid and (x - avoid[0]) ** 2 + (y - avoid[1]) ** 2 < min_distance ** 2:
+                continue
+            return x, y
+        return None
+
+    def spawn_wild_monster(self, avoid=None):
+        """Add one roaming monster on a grass tile away from avoid (x, y)"""
+        game_map = self.game_map
+        position = self._random_tile((game_map.GRASS,), avoid, SPAWN_MIN_DISTANCE)
+        if position is None:
+            return None
+        species_id, level = choose_wild_species(game_map.get_area_at_position(*position), rng=self.rng)
+        offset = (game_map.tile_size - MONSTER_SIZE) // 2
+        roamer = RoamingMonster(species_id, level, position[0] + offset, position[1] + offset,
+                                game_map.GRASS, self.next_entity_id)
+        self.next_entity_id += 1
+        self.add(roamer)
+        return roamer
+
+    def populate(self, wild_monsters, trainer_ids=(), avoid=None):
+        """Spawn roaming monsters and place trainers on random walkable tiles"""
+        self.target_roamers = wild_monsters
+        for _ in range(wild_monsters):
+            self.spawn_wild_monster(avoid)
+
+        game_map = self.game_map
+        sight = TRAINER_SIGHT_TILES * game_map.tile_size
+        for trainer_id in trainer_ids:
+            # Far enough from avoid that the player isn't challenged at once
+            position = self._random_tile((game_map.GRASS, game_map.PATH), avoid,
+                                         sight + 2 * game_map.tile_size)
+            if position is None or self.hash.query_rect(position[0], position[1],
+                                                        TRAINER_SIZE, TRAINER_SIZE):
+                continue
+            direction = self.rng.choice(list(DIRECTION_VECTORS))
+            self.add(NPCTrainer(trainer_id, position[0], position[1], direction, sight))
+
+    def update(self, player=None):
+        """Move roaming monsters one frame and top up the population
+
+        With a worker attached the monsters are moved by the worker process,
+        and this only swaps in its latest published positions.
+        """
+        self.frame += 1
+        spatial_hash = self.hash
+
+        if self.worker:
+            self.worker.swap(spatial_hash)
+        else:
+            tiles = self.game_map.tiles
+            tile_size = self.game_map.tile_size
+            cell_size = spatial_hash.cell_size
+            rng = self.rng
+            for roamer in self.roamers:
+                if roamer.advance(tiles, tile_size, rng) and \
+                        (roamer.x // cell_size, roamer.y // cell_size) != roamer.cell:
+                    spatial_hash.update(roamer)
+
+        for trainer in list(self.cooling):
+            trainer.cooldown -= 1
+            if trainer.cooldown <= 0:
+                self.cooling.discard(trainer)
+
+        if len(self.roamers) < self.target_roamers and self.frame % RESPAWN_FRAMES == 0:
+            self.spawn_wild_monster((player.x, player.y) if player else None)
+
+    def find_encounter(self, player):
+        """Roaming monster touching the player (or None)"""
+        for entity in self.hash.query_rect(player.x, player.y, player.size, player.size):
+            if isinstance(entity, RoamingMonster):
+                return entity
+        return None
+
+    def find_spotting_trainer(self, player, defeated=()):
+        """Undefeated trainer that can see the player (or None)"""
+        center_x = player.x + player.size / 2
+        center_y = player.y + player.size / 2
+        reach = TRAINER_SIGHT_TILES * self.game_map.tile_size + TRAINER_SIZE + player.size
+        for entity in self.hash.query_radius(center_x, center_y, reach):
+            if (not isinstance(entity, NPCTrainer) or entity.trainer_id in defeated
+                    or entity.cooldown > 0):
+                continue
+            if (_overlaps(*entity.sight_rect(), player.x, player.y, player.size, player.size)
+                    and self._line_of_sight(entity, center_x, center_y)):
+                return entity
+        return None
+
+    def _line_of_sight(self, trainer, x, y):
+        """True if no wall (unwalkable tile) is between the trainer and (x, y)"""
+        start_x, start_y = trainer.center()
+        steps = int(max(abs(x - start_x), abs(y - start_y)) // (self.game_map.tile_size / 2))
+        for i in range(1, steps):
+            t = i / steps
+            if not self.game_map.is_walkable(int(start_x + (x - start_x) * t),
+                                             int(start_y + (y - start_y) * t)):
+                return False
+        return True
+
+    def start_cooldown(self, trainer):
+        trainer.cooldown = TRAINER_COOLDOWN
+        self.cooling.add(trainer)
+
+    def blocks(self, x, y, size):
+        """Whether a solid entity overlaps the square at (x, y)"""
+        return any(entity.solid for entity in self.hash.query_rect(x, y, size, size))
+
+    def draw(self, screen, viewport, defeated=()):
+        """Draw the entities inside viewport (x, y, width, height)"""
+        for entity in self.hash.query_rect(*viewport):
+            if isinstance(entity, NPCTrainer):
+                entity.draw(screen, entity.trainer_id in defeated)
+            else:
+                entity.draw(screen)
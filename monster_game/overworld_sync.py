@@ -0,0 +1,460 @@
+import argparse
+import asyncio
+import math
+import random
+import socket
+import struct
+import time
+from collections import OrderedDict
+
+# Multiplayer overworld sync over UDP
+#
+# Clients send their own position every tick; the server sends each client
+# the players around it as deltas against the last update the client
+# acknowledged, so lost datagrams never need to be resent.
+#
+# Client -> server
+#   JOIN:    type (B)
+#   INPUT:   type (B), last received tick (H), x (H), y (H), state (B)
+#   LEAVE:   type (B)
+# Server -> client
+#   WELCOME: type (B), player ID (H), tick rate (B)
+#   UPDATE:  type (B), tick (H), baseline tick (H, NO_BASELINE if none), entry count (B),
+#            then per changed player: player ID (H), flags (B) and the fields
+#            in flags order: x, y (b delta if the *_SMALL flag is set, else H), state (B)
+#
+# Coordinates are quantized to POSITION_QUANTUM pixels. state packs the
+# direction index and the moving flag: direction << 1 | moving.
+MSG_JOIN = 1
+MSG_INPUT = 2
+MSG_LEAVE = 3
+MSG_WELCOME = 10
+MSG_UPDATE = 11
+
+INPUT = struct.Struct("<BHHHB")
+WELCOME = struct.Struct("<BHB")
+UPDATE_HEADER = struct.Struct("<BHHB")
+ENTRY_HEADER = struct.Struct("<HB")
+SMALL = struct.Struct("<b")
+FULL = struct.Struct("<H")
+STATE = struct.Struct("<B")
+
+# Entry flags
+X_CHANGED = 1
+Y_CHANGED = 2
+STATE_CHANGED = 4
+X_SMALL = 8
+Y_SMALL = 16
+REMOVED = 32
+
+NO_BASELINE = 0xFFFF
+DIRECTIONS = ("down", "up", "left", "right")
+
+TICK_RATE = 10  # Server updates per second
+POSITION_QUANTUM = 2  # Pixels per coordinate unit on the wire
+AOI_RADIUS = 320  # Players further away than this (in pixels) aren't sent
+
+# Downstream budget per client, including UDP/IP headers. Updates that
+# would go over it are cut, nearest players first; the rest follow on
+# later ticks.
+BYTES_PER_PLAYER_PER_SECOND = 2048
+UDP_OVERHEAD = 28
+MAX_ENTRIES = 255
+
+CLIENT_TIMEOUT = 10.0  # Seconds without any datagram before a client is dropped
+HISTORY = 32  # Sent views kept per client as possible baselines
+
+
+def quantize(value):
+    return max(0, min(0xFFFF, round(value / POSITION_QUANTUM)))
+
+
+def pack_state(direction, moving):
+    return DIRECTIONS.index(direction) << 1 | bool(moving)
+
+
+def unpack_state(state):
+    """(direction, moving) from a packed state byte"""
+    return DIRECTIONS[state >> 1 & 3], bool(state & 1)
+
+
+def encode_entry(player_id, old, new):
+    """Delta for one player (old is None if the client doesn't know it yet)
+
+    old/new are quantized (x, y, state) tuples; new is None for a player
+    that left the client's area. Returns None if nothing changed.
+    """
+    if new is None:
+        return ENTRY_HEADER.pack(player_id, REMOVED)
+    if old == new:
+        return None
+
+    flags = 0
+    fields = []
+    for value, previous, changed, small in ((new[0], old and old[0], X_CHANGED, X_SMALL),
+                                            (new[1], old and old[1], Y_CHANGED, Y_SMALL)):
+        if old is None or value != previous:
+            flags |= changed
+            if old is not None and -128 <= value - previous <= 127:
+                flags |= small
+                fields.append(SMALL.pack(value - previous))
+            else:
+                fields.append(FULL.pack(value))
+    if old is None or new[2] != old[2]:
+        flags |= STATE_CHANGED
+        fields.append(STATE.pack(new[2]))
+    return ENTRY_HEADER.pack(player_id, flags) + b"".join(fields)
+
+
+def apply_update(views, payload):
+    """Decode an UPDATE against the client's stored views
+
+    views maps tick -> {player ID: (x, y, state)}. Returns (tick, view), or
+    None if the baseline is no longer known (the server will send a delta
+    against an older acknowledged tick).
+    """
+    _, tick, baseline_tick, count = UPDATE_HEADER.unpack_from(payload)
+    if baseline_tick == NO_BASELINE:
+        view = {}
+    elif baseline_tick in views:
+        view = dict(views[baseline_tick])
+    else:
+        return None
+
+    offset = UPDATE_HEADER.size
+    for _ in range(count):
+        player_id, flags = ENTRY_HEADER.unpack_from(payload, offset)
+        offset += ENTRY_HEADER.size
+        if flags & REMOVED:
+            view.pop(player_id, None)
+            continue
+
+        x, y, state = view.get(player_id, (0, 0, 0))
+        if flags & X_CHANGED:
+            if flags & X_SMALL:
+                x += SMALL.unpack_from(payload, offset)[0]
+                offset += SMALL.size
+            else:
+                x = FULL.unpack_from(payload, offset)[0]
+                offset += FULL.size
+        if flags & Y_CHANGED:
+            if flags & Y_SMALL:
+                y += SMALL.unpack_from(payload, offset)[0]
+                offset += SMALL.size
+            else:
+                y = FULL.unpack_from(payload, offset)[0]
+                offset += FULL.size
+        if flags & STATE_CHANGED:
+            state = payload[offset]
+            offset += STATE.size
+        view[player_id] = (x, y, state)
+    return tick, view
+
+
+class _RemoteClient:
+    """Server-side state of one connected client"""
+
+    def __init__(self, address, player_id, now):
+        self.address = address
+        self.player_id = player_id
+        self.state = None  # Quantized (x, y, state), None until the first INPUT
+        self.last_seen = now
+        self.acked = None  # Last tick the client received
+        self.sent = OrderedDict()  # tick -> view the client has after that update
+        self.bytes_sent = 0
+
+
+class OverworldServer(asyncio.DatagramProtocol):
+    """Relays player positions between clients sharing the overworld map
+
+    Every tick each client gets the players within aoi_radius of it, found
+    through a grid of aoi_radius-sized cells, encoded against the view the
+    client last acknowledged and cut to the per-client byte budget.
+    """
+
+    def __init__(self, tick_rate=TICK_RATE, aoi_radius=AOI_RADIUS,
+                 budget=BYTES_PER_PLAYER_PER_SECOND, timeout=CLIENT_TIMEOUT):
+        self.tick_rate = tick_rate
+        self.aoi_radius = aoi_radius
+        self.budget = budget
+        self.timeout = timeout
+        self.clients = {}  # address -> _RemoteClient
+        self.tick_count = 0
+        self.next_player_id = 1
+        self.transport = None
+        self.bytes_sent = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, address):
+        if not data:
+            return
+        now = time.monotonic()
+        client = self.clients.get(address)
+
+        if data[0] == MSG_JOIN:
+            if client is None:
+                client = self.clients[address] = _RemoteClient(address, self.next_player_id, now)
+                self.next_player_id = self.next_player_id % 0xFFFE + 1
+            client.last_seen = now
+            self.transport.sendto(WELCOME.pack(MSG_WELCOME, client.player_id, self.tick_rate), address)
+        elif client is None:
+            return
+        elif data[0] == MSG_INPUT and len(data) == INPUT.size:
+            _, ack, x, y, state = INPUT.unpack(data)
+            client.state = (x, y, state)
+            if ack in client.sent:
+                client.acked = ack
+            client.last_seen = now
+        elif data[0] == MSG_LEAVE:
+            del self.clients[address]
+
+    def tick(self, now=None):
+        """Send one round of updates"""
+        now = now or time.monotonic()
+        self.tick_count = (self.tick_count + 1) % NO_BASELINE
+        tick = self.tick_count
+
+        for address in [a for a, c in self.clients.items() if now - c.last_seen > self.timeout]:
+            del self.clients[address]
+
+        # Grid of clients with a known position
+        cell_size = self.aoi_radius / POSITION_QUANTUM
+        grid = {}
+        for client in self.clients.values():
+            if client.state:
+                cell = (int(client.state[0] // cell_size), int(client.state[1] // cell_size))
+                grid.setdefault(cell, []).append(client)
+
+        limit = self.budget // self.tick_rate - UDP_OVERHEAD
+        radius_squared = cell_size * cell_size
+        for client in self.clients.values():
+            if client.state:
+                self._send_update(client, tick, grid, cell_size, radius_squared, limit)
+
+    def _send_update(self, client, tick, grid, cell_size, radius_squared, limit):
+        x, y, _ = client.state
+        cx, cy = int(x // cell_size), int(y // cell_size)
+        nearby = []
+        for gx in (cx - 1, cx, cx + 1):
+            for gy in (cy - 1, cy, cy + 1):
+                for other in grid.get((gx, gy), ()):
+                    if other is client:
+                        continue
+                    distance = (other.state[0] - x) ** 2 + (other.state[1] - y) ** 2
+                    if distance <= radius_squared:
+                        nearby.append((distance, other.player_id, other.state))
+        nearby.sort()
+
+        baseline_tick = client.acked if client.acked in client.sent else None
+        baseline = client.sent[baseline_tick] if baseline_tick is not None else {}
+        view = dict(baseline)
+
+        # Players that left the area first (they are tiny), then the nearest changes
+        visible = {player_id for _, player_id, _ in nearby}
+        entries = []
+        size = UPDATE_HEADER.size
+        for player_id in baseline:
+            if player_id not in visible:
+                entry = encode_entry(player_id, baseline[player_id], None)
+                if size + len(entry) > limit or len(entries) == MAX_ENTRIES:
+                    break
+                entries.append(entry)
+                size += len(entry)
+                del view[player_id]
+        for _, player_id, state in nearby:
+            entry = encode_entry(player_id, baseline.get(player_id), state)
+            if entry is None:
+                continue
+            if size + len(entry) > limit or len(entries) == MAX_ENTRIES:
+                break
+            entries.append(entry)
+            size += len(entry)
+            view[player_id] = state
+
+        if not entries:
+            return
+        payload = UPDATE_HEADER.pack(MSG_UPDATE, tick,
+                                     NO_BASELINE if baseline_tick is None else baseline_tick,
+                                     len(entries)) + b"".join(entries)
+        self.transport.sendto(payload, client.address)
+
+        client.sent[tick] = view
+        while len(client.sent) > HISTORY:
+            client.sent.popitem(last=False)
+        client.bytes_sent += len(payload) + UDP_OVERHEAD
+        self.bytes_sent += len(payload) + UDP_OVERHEAD
+
+    async def run(self):
+        """Tick forever at tick_rate"""
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            self.tick()
+            next_tick += 1 / self.tick_rate
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+
+
+async def start_server(host="127.0.0.1", port=0, **options):
+    """Create the server endpoint; returns (transport, server)"""
+    loop = asyncio.get_running_loop()
+    return await loop.create_datagram_endpoint(lambda: OverworldServer(**options),
+                                               local_addr=(host, port))
+
+
+class OverworldClient:
+    """Game-side connection (non-blocking, polled from the pygame loop)"""
+
+    def __init__(self, address, tick_rate=TICK_RATE):
+        self.address = address
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+        self.tick_rate = tick_rate
+        self.player_id = None
+        self.views = OrderedDict()  # tick -> {player ID: (x, y, state)}
+        self.latest = None  # Tick of the newest applied update
+        self.next_send = 0.0
+        self.bytes_received = 0
+
+    def update(self, player, now=None):
+        """Receive pending updates and send the local player's state once per tick"""
+        now = now or time.monotonic()
+        self.receive()
+        if now < self.next_send:
+            return
+        self.next_send = now + 1 / self.tick_rate
+
+        if self.player_id is None:
+            self._send(bytes([MSG_JOIN]))
+        else:
+            ack = NO_BASELINE if self.latest is None else self.latest
+            self._send(INPUT.pack(MSG_INPUT, ack, quantize(player.x), quantize(player.y),
+                                  pack_state(player.direction, player.moving)))
+
+    def receive(self):
+        while True:
+            try:
+                data = self.socket.recv(2048)
+            except (BlockingIOError, ConnectionRefusedError):
+                return
+            self.bytes_received += len(data) + UDP_OVERHEAD
+            if data[0] == MSG_WELCOME:
+                _, self.player_id, self.tick_rate = WELCOME.unpack(data)
+            elif data[0] == MSG_UPDATE:
+                decoded = apply_update(self.views, data)
+                if decoded is None:
+                    continue
+                tick, view = decoded
+                self.views[tick] = view
+                while len(self.views) > HISTORY:
+                    self.views.popitem(last=False)
+                if self.latest is None or (tick - self.latest) % 0x10000 < 0x8000:
+                    self.latest = tick
+
+    def remote_players(self):
+        """Other players in view as (player ID, x, y, direction, moving) in pixels"""
+        if self.latest is None:
+            return []
+        players = []
+        for player_id, (x, y, state) in self.views[self.latest].items():
+            direction, moving = unpack_state(state)
+            players.append((player_id, x * POSITION_QUANTUM, y * POSITION_QUANTUM, direction, moving))
+        return players
+
+    def close(self):
+        if self.player_id is not None:
+            self._send(bytes([MSG_LEAVE]))
+        self.socket.close()
+
+    def _send(self, data):
+        try:
+            self.socket.sendto(data, self.address)
+        except OSError:
+            pass  # The server may not be up yet; the next tick retries
+
+
+class _Walker:
+    """Randomly walking stand-in for a Player (used by the simulation)"""
+
+    def __init__(self, rng, width, height):
+        self.rng = rng
+        self.x = rng.randrange(width)
+        self.y = rng.randrange(height)
+        self.width = width
+        self.height = height
+        self.direction = "down"
+        self.moving = False
+
+    def step(self):
+        if self.rng.random() < 0.1:
+            self.direction = self.rng.choice(DIRECTIONS)
+            self.moving = self.rng.random() < 0.7
+        if self.moving:
+            dx, dy = {"down": (0, 5), "up": (0, -5), "left": (-5, 0), "right": (5, 0)}[self.direction]
+            self.x = max(0, min(self.width - 1, self.x + dx))
+            self.y = max(0, min(self.height - 1, self.y + dy))
+
+
+async def run_simulation(players=200, seconds=5.0, width=3200, height=2400, seed=0, **options):
+    """Random walkers on loopback; returns (server, clients, seconds, position errors)
+
+    Clients step and poll at 30 frames per second like the game loop.
+    """
+    rng = random.Random(seed)
+    transport, server = await start_server(**options)
+    address = transport.get_extra_info("sockname")
+    ticker = asyncio.create_task(server.run())
+
+    walkers = [_Walker(rng, width, height) for _ in range(players)]
+    clients = [OverworldClient(address) for _ in range(players)]
+    start = time.monotonic()
+    try:
+        while time.monotonic() - start < seconds:
+            for walker, client in zip(walkers, clients):
+                walker.step()
+                client.update(walker)
+            await asyncio.sleep(1 / 30)
+    finally:
+        ticker.cancel()
+        for client in clients:
+            client.close()
+        transport.close()
+
+    # How far each client's view of the others is from where they really are
+    walker_by_id = {client.player_id: walker for walker, client in zip(walkers, clients)}
+    errors = [math.hypot(walker_by_id[player_id].x - x, walker_by_id[player_id].y - y)
+              for client in clients for player_id, x, y, _, _ in client.remote_players()]
+    return server, clients, time.monotonic() - start, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Multiplayer overworld sync server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--tick-rate", type=int, default=TICK_RATE)
+    parser.add_argument("--simulate", type=int, default=0, metavar="PLAYERS",
+                        help="run PLAYERS random walkers on loopback and report bandwidth")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    if args.simulate:
+        server, clients, elapsed, errors = asyncio.run(
+            run_simulation(args.simulate, args.seconds, tick_rate=args.tick_rate))
+        rates = sorted(client.bytes_received / elapsed for client in clients)
+        print(f"{args.simulate} players, {elapsed:.1f}s: per player {sum(rates) / len(rates):.0f} B/s "
+              f"average, {rates[-1]:.0f} B/s max (budget {BYTES_PER_PLAYER_PER_SECOND}), "
+              f"position error {sum(errors) / max(1, len(errors)):.1f}px average over "
+              f"{len(errors)} visible entries")
+        return
+
+    async def serve():
+        transport, server = await start_server(args.host, args.port, tick_rate=args.tick_rate)
+        print(f"Overworld server listening on {transport.get_extra_info('sockname')}")
+        await server.run()
+
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
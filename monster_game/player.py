@@ -2,6 +2,7 @@ import pygame
 import json
 import os
 from monster import Monster
+from storage import MonsterStorage
 
 class Player:
     def __init__(self, name="Trainer"):
@@ -16,6 +17,7 @@ class Player:
         
         self.monsters = []  # Owned monsters
         self.active_monster = 0  # Lead monster
+        self.storage = MonsterStorage()  # Monsters that don't fit in the party
         
         self.items = {
             "monster_ball": 5,  # Monster Ball
@@ -27,6 +29,8 @@ class Player:
         self.badges = []  # Badges
         
         self.discovered_monsters = set()  # Monsters registered in encyclopedia
+        self.defeated_trainers = set()  # Trainer IDs already beaten
+        self.play_time = 0.0  # Play time in seconds
     
     def update(self, keys, map_width, map_height):
         """プレイヤーの更新処理"""
@@ -58,9 +62,12 @@ class Player:
         if self.moving and (old_x != self.x or old_y != self.y):
             self.step_count += 1
     
-    def draw(self, screen):
-        """プレイヤーの描画"""
-        # 簡易的な描画（後で画像に置き換え）
+    def draw(self, screen, batch=None):
+        """プレイヤーの描画（batchがあれば画像を使う。描画はbatch.flushで）"""
+        if batch and batch.add(f"player/{self.direction}", (self.x, self.y)):
+            return
+        
+        # 画像がないときの簡易的な描画
         color = (0, 0, 255)  # 青色
         pygame.draw.rect(screen, color, (self.x, self.y, self.size, self.size))
         
@@ -85,16 +92,39 @@ class Player:
         pygame.draw.polygon(screen, (255, 255, 0), points)
     
     def add_monster(self, monster):
-        """モンスターを追加"""
+        """モンスターを追加（パーティが満員ならボックスへ預ける）"""
+        # 野生モンスターの場合はフラグを変更
+        monster.is_wild = False
+        
         if len(self.monsters) < 6:  # 最大6体まで
-            # 野生モンスターの場合はフラグを変更
-            monster.is_wild = False
             self.monsters.append(monster)
-            
-            # 図鑑に登録
-            self.discovered_monsters.add(monster.species_id)
-            return True
-        return False
+        else:
+            self.storage.deposit(monster)
+        
+        # 図鑑に登録
+        self.discovered_monsters.add(monster.species_id)
+        return True
+    
+    def deposit_monster(self, index):
+        """パーティのモンスターをボックスへ預ける"""
+        if len(self.monsters) <= 1 or not 0 <= index < len(self.monsters):
+            return None
+        
+        monster = self.monsters.pop(index)
+        # 先頭モンスターの位置を合わせる（先頭自身を預けたら最初のモンスターに戻す）
+        if index == self.active_monster:
+            self.active_monster = 0
+        elif index < self.active_monster:
+            self.active_monster -= 1
+        return self.storage.deposit(monster)
+    
+    def withdraw_monster(self, slot):
+        """ボックスのモンスターをパーティへ引き出す"""
+        if len(self.monsters) >= 6 or slot not in self.storage:
+            return False
+        
+        self.monsters.append(self.storage.withdraw(slot))
+        return True
     
     def get_active_monster(self):
         """現在の先頭モンスターを取得"""
@@ -152,13 +182,17 @@ class Player:
             "items": self.items,
             "badges": self.badges,
             "discovered_monsters": list(self.discovered_monsters),
+            "defeated_trainers": list(self.defeated_trainers),
             "monsters": [monster.to_dict() for monster in self.monsters],
-            "active_monster": self.active_monster
+            "active_monster": self.active_monster,
+            "play_time": self.play_time
         }
         
         try:
-            with open(os.path.join(os.path.dirname(__file__), filename), 'w') as f:
+            path = os.path.join(os.path.dirname(__file__), filename)
+            with open(path, 'w') as f:
                 json.dump(save_data, f)
+            self.storage.save(self.storage_directory(path))
             return True
         except Exception as e:
             print(f"セーブエラー: {e}")
@@ -168,7 +202,8 @@ class Player:
     def load_game(cls, filename="save_data.json"):
         """ゲームデータをロード"""
         try:
-            with open(os.path.join(os.path.dirname(__file__), filename), 'r') as f:
+            path = os.path.join(os.path.dirname(__file__), filename)
+            with open(path, 'r') as f:
                 save_data = json.load(f)
             
             player = cls(save_data["player_name"])
@@ -178,15 +213,23 @@ class Player:
             player.items = save_data["items"]
             player.badges = save_data["badges"]
             player.discovered_monsters = set(save_data["discovered_monsters"])
+            player.defeated_trainers = set(save_data.get("defeated_trainers", []))
             
             # モンスターの復元
-            for monster_data in save_data["monsters"]:
-                monster = Monster.from_dict(monster_data)
-                player.monsters.append(monster)
+            player.monsters = Monster.from_dicts(save_data["monsters"])
             
             player.active_monster = save_data["active_monster"]
+            player.play_time = save_data.get("play_time", 0.0)
+            
+            # ボックスは索引だけ読み込み、中身は必要になった時に読む
+            player.storage = MonsterStorage(cls.storage_directory(path))
             
             return player
         except Exception as e:
             print(f"ロードエラー: {e}")
             return None
+    
+    @staticmethod
+    def storage_directory(save_path):
+        """セーブファイルに対応するボックスの保存先"""
+        return os.path.splitext(save_path)[0] + "_storage"
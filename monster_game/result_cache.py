@@ -0,0 +1,284 @@
+import argparse
+import array
+import ast
+import hashlib
+import json
+import os
+import struct
+import sys
+from functools import lru_cache
+import monster_data
+
+# File layout: HEADER, then one column after another for all entries
+#   keys        32-byte digests (see result_key)
+#   kinds       uint8 index into TYPECODES
+#   lengths     uint32 value counts
+#   last_used   uint64 clock of the last get/put
+#   values      8-byte values of every entry, in entry order
+# All numbers are little-endian.
+MAGIC = b"MRES"
+VERSION = 1
+HEADER = "<4sHIQ"  # Magic, version, entry count, clock
+KEY_SIZE = 32
+TYPECODES = ("q", "d")  # int64, float64
+ENTRY_OVERHEAD = KEY_SIZE + 1 + 4 + 8
+
+_DIRECTORY = os.path.dirname(__file__)
+CACHE_PATH = os.path.join(_DIRECTORY, "cache", "results.mrc")
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+# Simulated results depend on the code of these modules and of every module they import
+# from this directory (see simulation_modules), except the game data, which keys cover
+# entry by entry (see species_digest)
+SIMULATION_ROOTS = ("simulation", "shared_tables")
+DATA_MODULES = ("monster_data",)
+
+
+def _digest(*parts):
+    data = json.dumps(parts, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8")).digest()
+
+
+def _local_imports(name):
+    """Names of the modules in this directory that module name imports"""
+    with open(os.path.join(_DIRECTORY, name + ".py"), "rb") as f:
+        tree = ast.parse(f.read())
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module)
+    return {name for name in names if os.path.exists(os.path.join(_DIRECTORY, name + ".py"))}
+
+
+@lru_cache(maxsize=None)
+def simulation_modules():
+    """Sorted names of SIMULATION_ROOTS and the local modules they import, directly or not"""
+    found = set()
+    pending = list(SIMULATION_ROOTS)
+    while pending:
+        name = pending.pop()
+        if name in found or name in DATA_MODULES:
+            continue
+        found.add(name)
+        pending.extend(_local_imports(name))
+    return tuple(sorted(found))
+
+
+@lru_cache(maxsize=None)
+def code_digest():
+    """Digest of the source of simulation_modules()"""
+    digest = hashlib.sha256()
+    for name in simulation_modules():
+        digest.update(name.encode("utf-8") + b"\0")
+        with open(os.path.join(_DIRECTORY, name + ".py"), "rb") as f:
+            digest.update(f.read())
+    return digest.digest()
+
+
+@lru_cache(maxsize=None)
+def type_chart_digest():
+    return _digest("types", dict(monster_data.TYPE_CHART))
+
+
+def species_digest(species_id, record=None):
+    """Digest of everything a species brings into a battle
+
+    Covers the species entry (or record, e.g. candidate stats), its learnset
+    and the moves in it (with their effects), so editing another species or an unused move
+    leaves the digest alone.
+    """
+    record = monster_data.MONSTER_SPECIES.get(species_id) if record is None else record
+    learnset = monster_data.LEARNABLE_MOVES.get(species_id, {})
+    move_ids = sorted({move_id for ids in learnset.values() for move_id in ids})
+    return _digest("species", species_id, record, learnset,
+                   [[move_id, monster_data.MOVES.get(move_id), monster_data.MOVE_EFFECTS.get(move_id)]
+                    for move_id in move_ids])
+
+
+def result_key(kind, *parts):
+    """Cache key for a result of `kind` computed from parts (digests and parameters)
+
+    The simulation code and the type chart are always part of the key.
+    """
+    parts = [part.hex() if isinstance(part, bytes) else part for part in parts]
+    return _digest(kind, code_digest().hex(), type_chart_digest().hex(), parts)
+
+
+def matchup_key(digest_a, digest_b, level, battles, seed):
+    """Key of a simulation.run_matchup result, given species_digest() of both sides"""
+    return result_key("matchup", digest_a, digest_b, level, battles, seed)
+
+
+def _to_little_endian(values):
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _unpack(data):
+    """(clock, entries) from the bytes of a cache file"""
+    magic, version, count, clock = struct.unpack_from(HEADER, data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a result cache file")
+    offset = struct.calcsize(HEADER)
+    keys = data[offset:offset + count * KEY_SIZE]
+    offset += count * KEY_SIZE
+    kinds = data[offset:offset + count]
+    offset += count
+    lengths = array.array("I", data[offset:offset + 4 * count])
+    offset += 4 * count
+    last_used = array.array("Q", data[offset:offset + 8 * count])
+    offset += 8 * count
+    _to_little_endian(lengths)
+    _to_little_endian(last_used)
+
+    entries = {}
+    for i in range(count):
+        size = lengths[i] * 8
+        values = data[offset:offset + size]
+        if len(values) != size:
+            raise ValueError("Truncated result cache file")
+        entries[keys[i * KEY_SIZE:(i + 1) * KEY_SIZE]] = [TYPECODES[kinds[i]], values, last_used[i]]
+        offset += size
+    return clock, entries
+
+
+class ResultCache:
+    """Content-addressed store for simulation results on disk
+
+    Keys are digests of everything a result depends on (see result_key), so
+    a result is found again whenever the same inputs come back, and editing
+    a table just stops the old keys from being asked for. Entries left
+    behind that way are evicted least recently used first once the file
+    grows past max_bytes. Values are short sequences of ints or floats.
+
+    The file is read when the cache is created and rewritten atomically by
+    flush(), merged with anything another process flushed in between.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.clock, self.entries = self._read()  # key -> [typecode, values, last used]
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+
+    def _read(self):
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return 0, {}
+        try:
+            return _unpack(data)
+        except (struct.error, ValueError, IndexError):
+            return 0, {}  # Unreadable files are replaced on the next flush
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def size(self):
+        """Bytes the entries take up in the file"""
+        return struct.calcsize(HEADER) + sum(ENTRY_OVERHEAD + len(entry[1]) for entry in self.entries.values())
+
+    def get(self, key):
+        """Stored values (a list) or None"""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.clock += 1
+        entry[2] = self.clock
+        self.dirty = True
+        values = _to_little_endian(array.array(entry[0], entry[1]))
+        return values.tolist()
+
+    def put(self, key, values):
+        typecode = "d" if any(isinstance(value, float) for value in values) else "q"
+        packed = _to_little_endian(array.array(typecode, values))
+        self.clock += 1
+        self.entries[key] = [typecode, packed.tobytes(), self.clock]
+        self.dirty = True
+
+    def clear(self):
+        """Forget every entry and delete the file"""
+        self.entries.clear()
+        self.dirty = False
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _evict(self):
+        """Drop least recently used entries until the file fits in max_bytes"""
+        size = self.size
+        if size <= self.max_bytes:
+            return
+        for key, entry in sorted(self.entries.items(), key=lambda item: item[1][2]):
+            del self.entries[key]
+            size -= ENTRY_OVERHEAD + len(entry[1])
+            if size <= self.max_bytes:
+                break
+
+    def flush(self):
+        """Write the cache file if anything changed"""
+        if not self.dirty:
+            return
+        # Keep what other processes stored since this cache was read
+        clock, stored = self._read()
+        for key, entry in stored.items():
+            self.entries.setdefault(key, entry)
+        self.clock = max(self.clock, clock)
+        self._evict()
+
+        entries = list(self.entries.items())
+        lengths = array.array("I", [len(entry[1]) // 8 for _, entry in entries])
+        last_used = array.array("Q", [entry[2] for _, entry in entries])
+        columns = [
+            struct.pack(HEADER, MAGIC, VERSION, len(entries), self.clock),
+            b"".join(key for key, _ in entries),
+            bytes(TYPECODES.index(entry[0]) for _, entry in entries),
+            _to_little_endian(lengths).tobytes(),
+            _to_little_endian(last_used).tobytes(),
+        ] + [entry[1] for _, entry in entries]
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(b"".join(columns))
+        os.replace(temp_path, self.path)
+        self.dirty = False
+
+    def stats(self):
+        return {"entries": len(self.entries), "bytes": self.size, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or clear the simulation result cache")
+    parser.add_argument("--path", default=CACHE_PATH)
+    parser.add_argument("--clear", action="store_true")
+    args = parser.parse_args(argv)
+
+    cache = ResultCache(args.path)
+    if args.clear:
+        cache.clear()
+        print(f"Cleared {args.path}")
+        return
+    stats = cache.stats()
+    print(f"{args.path}: {stats['entries']} entries, {stats['bytes']} / {stats['max_bytes']} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import os
+import json
+import time
+from player import Player
+
+# セーブデータの保存先
+SAVE_DIRECTORY = os.path.join(os.path.dirname(__file__), "saves")
+
+HEADER_SUFFIX = ".meta.json"
+
+# スロット導入前のセーブファイル（最初にスロット一覧を開いた時に空きスロットへ取り込む）
+LEGACY_SAVE_PATH = os.path.join(os.path.dirname(__file__), "save_data.json")
+
+
+class SaveSlotManager:
+    """複数のセーブスロットを管理する
+
+    各スロットは本体のセーブファイルと小さなヘッダファイルで構成される。
+    ロード画面の一覧はヘッダだけを読み、本体は選ばれたスロットだけ読み込む。
+    """
+
+    def __init__(self, directory=SAVE_DIRECTORY):
+        self.directory = directory
+
+    def slot_path(self, slot):
+        """スロットのセーブファイルのパス"""
+        return os.path.join(self.directory, f"slot_{slot:02d}.json")
+
+    def header_path(self, slot):
+        """スロットのヘッダファイルのパス"""
+        return os.path.join(self.directory, f"slot_{slot:02d}{HEADER_SUFFIX}")
+
+    def save(self, player, slot, imported_from=None):
+        """プレイヤーを指定スロットにセーブ"""
+        os.makedirs(self.directory, exist_ok=True)
+        if not player.save_game(self.slot_path(slot)):
+            return False
+
+        # ヘッダは本体の書き込みが終わってから差し替える
+        header_path = self.header_path(slot)
+        temp_path = header_path + ".tmp"
+        try:
+            with open(temp_path, 'w') as f:
+                header = self.build_header(player, slot)
+                if imported_from:
+                    header["imported_from"] = imported_from
+                json.dump(header, f)
+            os.replace(temp_path, header_path)
+            return True
+        except Exception as e:
+            print(f"セーブエラー: {e}")
+            return False
+
+    def build_header(self, player, slot):
+        """ロード画面に表示する情報をまとめる"""
+        return {
+            "slot": slot,
+            "player_name": player.name,
+            "play_time": int(player.play_time),
+            "party": [[monster.name, monster.level] for monster in player.monsters],
+            "storage_count": len(player.storage),
+            "pokedex_count": len(player.discovered_monsters),
+            "timestamp": time.time()
+        }
+
+    def list_slots(self):
+        """全スロットのヘッダをスロット番号順に返す（本体は読まない）"""
+        if not os.path.isdir(self.directory):
+            return []
+
+        headers = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(HEADER_SUFFIX):
+                continue
+            try:
+                with open(entry.path, 'r') as f:
+                    headers.append(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"ヘッダ読み込みエラー: {entry.name}: {e}")
+
+        headers.sort(key=lambda header: header["slot"])
+        return headers
+
+    def load(self, slot):
+        """指定スロットのプレイヤーを読み込む"""
+        return Player.load_game(self.slot_path(slot))
+
+    def next_free_slot(self):
+        """空いている最小のスロット番号"""
+        used = {header["slot"] for header in self.list_slots()}
+        slot = 1
+        while slot in used:
+            slot += 1
+        return slot
+
+    def import_legacy_save(self, path=LEGACY_SAVE_PATH):
+        """スロット導入前のセーブを空きスロットに取り込む
+
+        元のファイルはそのまま残し、取り込んだスロットのヘッダに印を付けて
+        二度取り込まないようにする。取り込んだスロット番号を返す。
+        """
+        name = os.path.basename(path)
+        if not os.path.exists(path):
+            return None
+        if any(header.get("imported_from") == name for header in self.list_slots()):
+            return None
+
+        player = Player.load_game(path)
+        if player is None:
+            return None
+        slot = self.next_free_slot()
+        return slot if self.save(player, slot, imported_from=name) else None
+
+
+def format_play_time(seconds):
+    """プレイ時間を H:MM 形式にする"""
+    hours, rest = divmod(int(seconds), 3600)
+    return f"{hours}:{rest // 60:02d}"
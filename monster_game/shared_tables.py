@@ -0,0 +1,297 @@
+import atexit
+import json
+import struct
+from multiprocessing import shared_memory
+import numpy as np
+import monster
+import monster_data
+import move_effects
+
+# Block layout: HEADER, then one DIRECTORY_ENTRY per array, then the arrays
+# (each aligned to ALIGNMENT bytes)
+MAGIC = b"MTBL"
+HEADER = "<4sI"  # Magic, array count
+DIRECTORY_ENTRY = "<32s4sIQ3I"  # Name, dtype, dimensions, offset, shape (up to 3)
+ALIGNMENT = 64
+
+NO_TYPE = -1
+# Decoded records memoized per process (cleared when full)
+RECORD_CACHE_SIZE = 4096
+
+
+def _text_blob(texts):
+    """utf-8 bytes of all texts plus offsets (text i is blob[offsets[i]:offsets[i + 1]])"""
+    encoded = [text.encode("utf-8") for text in texts]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int32)
+    offsets[1:] = np.cumsum([len(data) for data in encoded])
+    return np.frombuffer(b"".join(encoded) or b"\0", dtype=np.uint8), offsets
+
+
+def build_arrays(species=None, moves=None, type_chart=None, learnsets=None, move_effect_table=None):
+    """Numeric form of the game tables (defaults to those in monster_data)"""
+    species = monster_data.MONSTER_SPECIES if species is None else species
+    moves = monster_data.MOVES if moves is None else moves
+    type_chart = monster_data.TYPE_CHART if type_chart is None else type_chart
+    learnsets = monster_data.LEARNABLE_MOVES if learnsets is None else learnsets
+    move_effect_table = monster_data.MOVE_EFFECTS if move_effect_table is None else move_effect_table
+
+    type_names = set(type_chart)
+    for effects in type_chart.values():
+        type_names.update(effects)
+    for data in species.values():
+        type_names.update(data[1].split('/'))
+    for data in moves.values():
+        type_names.add(data[1])
+    type_names = sorted(type_names)
+    type_index = {name: i for i, name in enumerate(type_names)}
+
+    arrays = {}
+    arrays["type_blob"], arrays["type_offsets"] = _text_blob(type_names)
+    effectiveness = np.ones((len(type_names), len(type_names)))
+    for attack_type, effects in type_chart.items():
+        for defense_type, multiplier in effects.items():
+            effectiveness[type_index[attack_type], type_index[defense_type]] = multiplier
+    arrays["effectiveness"] = effectiveness
+
+    # Species: base stats, evolution (0 = none) and up to two types
+    species_count = max(species, default=0) + 1
+    valid = np.zeros(species_count, dtype=np.uint8)
+    stats = np.zeros((species_count, 4), dtype=np.int32)
+    evolution = np.zeros((species_count, 2), dtype=np.int32)
+    types = np.full((species_count, 2), NO_TYPE, dtype=np.int16)
+    names = [""] * species_count
+    for species_id, data in species.items():
+        valid[species_id] = 1
+        names[species_id] = data[0]
+        for slot, type_name in enumerate(data[1].split('/')[:2]):
+            types[species_id, slot] = type_index[type_name]
+        stats[species_id] = data[2:6]
+        evolution[species_id] = (data[6] or 0, data[7] or 0)
+    arrays.update(species_valid=valid, species_stats=stats, species_evolution=evolution,
+                  species_types=types)
+    arrays["species_name_blob"], arrays["species_name_offsets"] = _text_blob(names)
+
+    # Moves: power, accuracy, PP and type
+    move_count = max(moves, default=0) + 1
+    valid = np.zeros(move_count, dtype=np.uint8)
+    stats = np.zeros((move_count, 3), dtype=np.int32)
+    move_types = np.zeros(move_count, dtype=np.int16)
+    names = [""] * move_count
+    for move_id, data in moves.items():
+        valid[move_id] = 1
+        names[move_id] = data[0]
+        move_types[move_id] = type_index[data[1]]
+        stats[move_id] = data[2:5]
+    arrays.update(move_valid=valid, move_stats=stats, move_types=move_types)
+    arrays["move_name_blob"], arrays["move_name_offsets"] = _text_blob(names)
+
+    # Move effect descriptors as JSON text by move ID ("" for moves without effects)
+    descriptors = [""] * max(move_count, max(move_effect_table, default=0) + 1)
+    for move_id, move_effect in move_effect_table.items():
+        descriptors[move_id] = json.dumps(move_effect)
+    arrays["effect_blob"], arrays["effect_offsets"] = _text_blob(descriptors)
+
+    # Learnsets as CSR rows of (level, move ID), in the order they are written
+    start = np.zeros(species_count + 1, dtype=np.int32)
+    levels = []
+    move_ids = []
+    for species_id in range(species_count):
+        for level, ids in learnsets.get(species_id, {}).items():
+            levels.extend([level] * len(ids))
+            move_ids.extend(ids)
+        start[species_id + 1] = len(levels)
+    arrays["learn_start"] = start
+    arrays["learn_levels"] = np.array(levels or [0], dtype=np.int32)
+    arrays["learn_moves"] = np.array(move_ids or [0], dtype=np.int32)
+    return arrays
+
+
+class GameTables:
+    """Species, move, type chart, learnset and move effect tables as flat arrays
+
+    The record methods return the same shapes as the monster_data tables,
+    so Monster can read either. Strings (names, types) live in utf-8 blobs
+    indexed by offset arrays; only the short type name list is decoded
+    up front. Records are decoded on first use and memoized per process,
+    since battles look the same few species and moves up over and over.
+    """
+
+    def __init__(self, arrays):
+        for name, value in arrays.items():
+            setattr(self, name, value)
+        self.type_names = [self._text(self.type_blob, self.type_offsets, i)
+                           for i in range(len(self.type_offsets) - 1)]
+        self.type_index = {name: i for i, name in enumerate(self.type_names)}
+        # Per-process patches (balance_optimizer tries stats on top of the shared block)
+        self.species_overrides = {}
+        self._records = {}  # (kind, ID) -> decoded record
+
+    def _memo(self, key, value):
+        if len(self._records) >= RECORD_CACHE_SIZE:
+            self._records.clear()
+        self._records[key] = value
+        return value
+
+    @staticmethod
+    def _text(blob, offsets, i):
+        return bytes(blob[offsets[i]:offsets[i + 1]]).decode("utf-8")
+
+    def species(self, species_id):
+        """[name, type, hp, attack, defense, speed, evolution level, evolution target] or None"""
+        if species_id in self.species_overrides:
+            return self.species_overrides[species_id]
+        record = self._records.get(("species", species_id))
+        if record is not None:
+            return record
+        if not 0 <= species_id < len(self.species_valid) or not self.species_valid[species_id]:
+            return None
+        types = "/".join(self.type_names[t] for t in self.species_types[species_id].tolist() if t != NO_TYPE)
+        evolution_level, evolution_to = self.species_evolution[species_id].tolist()
+        return self._memo(("species", species_id),
+                          [self._text(self.species_name_blob, self.species_name_offsets, species_id), types]
+                          + self.species_stats[species_id].tolist()
+                          + [evolution_level or None, evolution_to or None])
+
+    def move(self, move_id):
+        """[name, type, power, accuracy, PP] or None"""
+        record = self._records.get(("move", move_id))
+        if record is not None:
+            return record
+        if not 0 <= move_id < len(self.move_valid) or not self.move_valid[move_id]:
+            return None
+        return self._memo(("move", move_id),
+                          [self._text(self.move_name_blob, self.move_name_offsets, move_id),
+                           self.type_names[self.move_types[move_id]]] + self.move_stats[move_id].tolist())
+
+    def learnset(self, species_id):
+        """{level: [move IDs]} like LEARNABLE_MOVES"""
+        record = self._records.get(("learnset", species_id))
+        if record is not None:
+            return record
+        if not 0 <= species_id < len(self.learn_start) - 1:
+            return {}
+        start, end = self.learn_start[species_id:species_id + 2].tolist()
+        result = {}
+        for level, move_id in zip(self.learn_levels[start:end].tolist(), self.learn_moves[start:end].tolist()):
+            result.setdefault(level, []).append(move_id)
+        return self._memo(("learnset", species_id), result)
+
+    def move_effects(self):
+        """{move ID: effect descriptors} like MOVE_EFFECTS"""
+        return {move_id: json.loads(self._text(self.effect_blob, self.effect_offsets, move_id))
+                for move_id in range(len(self.effect_offsets) - 1)
+                if self.effect_offsets[move_id + 1] > self.effect_offsets[move_id]}
+
+    def type_multiplier(self, attack_type, defense_type):
+        record = self._records.get((attack_type, defense_type))
+        if record is not None:
+            return record
+        attack = self.type_index.get(attack_type)
+        defense = self.type_index.get(defense_type)
+        if attack is None or defense is None:
+            return 1.0
+        return self._memo((attack_type, defense_type), float(self.effectiveness[attack, defense]))
+
+
+class SharedTables:
+    """GameTables in a shared memory block
+
+    The creating process owns the block and unlinks it on close(). Other
+    processes attach() by name and get read-only array views into the same
+    memory. Once attach_worker() ran, Monster, create_move and move_effects
+    read only from there. monster_data builds its tables on first use, so a
+    spawned worker never builds them and a forked one never touches the
+    parent's copy (which stays shared with it, copy-on-write).
+    """
+
+    def __init__(self, memory, owner):
+        self.memory = memory
+        self.owner = owner
+        self.name = memory.name
+        self.tables = GameTables(self._read_arrays())
+
+    @classmethod
+    def create(cls, arrays=None):
+        arrays = build_arrays() if arrays is None else arrays
+        directory_size = struct.calcsize(HEADER) + struct.calcsize(DIRECTORY_ENTRY) * len(arrays)
+        offset = directory_size
+        layout = []
+        for name, value in arrays.items():
+            offset = -(-offset // ALIGNMENT) * ALIGNMENT
+            layout.append((name, np.ascontiguousarray(value), offset))
+            offset += value.nbytes
+
+        memory = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        try:
+            cls._write(memory, layout)
+            return cls(memory, owner=True)
+        except Exception:
+            memory.close()
+            memory.unlink()
+            raise
+
+    @staticmethod
+    def _write(memory, layout):
+        struct.pack_into(HEADER, memory.buf, 0, MAGIC, len(layout))
+        entry_offset = struct.calcsize(HEADER)
+        for name, value, array_offset in layout:
+            if len(name) > 32:
+                raise ValueError(f"Array name too long for the directory: {name}")
+            shape = tuple(value.shape) + (0,) * (3 - value.ndim)
+            struct.pack_into(DIRECTORY_ENTRY, memory.buf, entry_offset, name.encode("ascii"),
+                             value.dtype.str.encode("ascii"), value.ndim, array_offset, *shape)
+            entry_offset += struct.calcsize(DIRECTORY_ENTRY)
+            target = np.ndarray(value.shape, dtype=value.dtype, buffer=memory.buf, offset=array_offset)
+            target[...] = value
+            del target
+
+    @classmethod
+    def attach(cls, name):
+        memory = shared_memory.SharedMemory(name=name)
+        return cls(memory, owner=False)
+
+    def _read_arrays(self):
+        buf = self.memory.buf
+        magic, count = struct.unpack_from(HEADER, buf, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Shared memory block {self.name} doesn't hold game tables")
+        arrays = {}
+        entry_offset = struct.calcsize(HEADER)
+        for _ in range(count):
+            name, dtype, ndim, offset, *shape = struct.unpack_from(DIRECTORY_ENTRY, buf, entry_offset)
+            entry_offset += struct.calcsize(DIRECTORY_ENTRY)
+            view = np.ndarray(tuple(shape[:ndim]), dtype=np.dtype(dtype.rstrip(b"\0").decode("ascii")),
+                              buffer=buf, offset=offset)
+            view.flags.writeable = False
+            arrays[name.rstrip(b"\0").decode("ascii")] = view
+        return arrays
+
+    def close(self):
+        if self.memory is None:
+            return
+        self.tables = None  # Drop the views before closing the block
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+        self.memory = None
+
+
+_attached = None  # SharedTables of a pool worker
+
+
+def attach_worker(name):
+    """Pool initializer: read the game tables from the shared block in this process"""
+    global _attached
+    _attached = SharedTables.attach(name)
+    monster.use_shared_tables(_attached.tables)
+    move_effects.use_move_effects(_attached.tables.move_effects())
+    atexit.register(_detach_worker)
+
+
+def _detach_worker():
+    global _attached
+    if _attached is not None:
+        monster.use_shared_tables(None)
+        move_effects.use_move_effects(None)
+        _attached.close()
+        _attached = None
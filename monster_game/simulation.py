@@ -0,0 +1,105 @@
+import os
+import random
+
+# Headless simulations never open a window; keep pygame quiet in worker processes
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+from monster import Monster
+from player import Player
+from battle import Battle
+from trainer import create_trainer
+
+# Battles that go on longer than this (e.g. both sides out of PP) are draws
+MAX_TURNS = 200
+
+
+def _fight(battle, choice_rng, max_turns):
+    """Drive a battle to the end with random moves; returns the result"""
+    party = battle.player_party
+    battle.update()  # start -> player_turn
+    turns = 0
+    while battle.result is None and turns < max_turns:
+        if battle.state == "player_turn":
+            moves = battle.player_monster.moves
+            battle.menu_selection = 0  # Fight
+            battle.update("menu_confirm")
+            battle.update("menu_select", choice_rng.randint(0, max(0, len(moves) - 1)))
+            battle.update("menu_confirm")
+            turns += 1
+        elif battle.state == "enemy_turn":
+            battle.update()
+        elif battle.state == "monster_select":
+            # Forced replacement: send out the next healthy monster
+            battle.update("menu_select", party.next_healthy())
+            battle.update("menu_confirm")
+        else:
+            break
+    return battle.result
+
+
+def run_battle(player_monster, enemy_monster, seed, enemy_ai=None, max_turns=MAX_TURNS):
+    """Fight one battle headlessly using the Battle rules
+
+    The player side picks a random move each turn, like the default enemy AI.
+    Returns "win" or "lose" from the player side's point of view, or None
+    for a draw.
+    """
+    player = Player("Sim")
+    player.monsters = [player_monster]
+    battle = Battle(player, enemy_monster, seed=seed, enemy_ai=enemy_ai)
+    return _fight(battle, random.Random(seed + 2), max_turns)
+
+
+def run_trainer_battle(player_monsters, trainer, seed, enemy_ai=None, max_turns=MAX_TURNS):
+    """Fight a trainer headlessly with a party (same rules and result as run_battle)
+
+    Fainted player monsters are replaced by the next healthy one in party order.
+    """
+    player = Player("Sim")
+    player.monsters = player_monsters
+    battle = Battle(player, trainer=trainer, seed=seed, enemy_ai=enemy_ai)
+    return _fight(battle, random.Random(seed + 2), max_turns)
+
+
+def run_gauntlet(player_monsters, trainer_ids, seed, enemy_ai=None, max_turns=MAX_TURNS):
+    """Fight trainers one after another without healing
+
+    Returns the number of trainers beaten before the party lost (or a battle
+    ran out of turns).
+    """
+    rng = random.Random(seed)
+    for beaten, trainer_id in enumerate(trainer_ids):
+        result = run_trainer_battle(player_monsters, create_trainer(trainer_id),
+                                    rng.getrandbits(62), enemy_ai, max_turns)
+        if result != "win":
+            return beaten
+    return len(trainer_ids)
+
+
+def run_matchup(species_a, species_b, level, battles, seed):
+    """Fight `battles` battles between two species at the same level
+
+    Sides alternate every battle so neither species always moves first.
+    Returns (wins for a, wins for b, draws).
+    """
+    rng = random.Random(seed)
+    wins_a = wins_b = draws = 0
+    for i in range(battles):
+        battle_seed = rng.getrandbits(62)
+        a = Monster(species_a, level)
+        b = Monster(species_b, level, is_wild=True)
+        if i % 2 == 0:
+            result = run_battle(a, b, battle_seed)
+            a_won = result == "win"
+        else:
+            a.is_wild, b.is_wild = True, False
+            result = run_battle(b, a, battle_seed)
+            a_won = result == "lose"
+
+        if result not in ("win", "lose"):
+            draws += 1
+        elif a_won:
+            wins_a += 1
+        else:
+            wins_b += 1
+    return wins_a, wins_b, draws
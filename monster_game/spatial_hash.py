@@ -0,0 +1,81 @@
+class SpatialHash:
+    """Uniform grid of square entities keyed by cell
+
+    Entities need x, y (top-left corner) and size attributes, and get a
+    cell attribute that holds their current cell key. They are indexed by
+    their top-left corner, so queries widen their area by max_entity_size
+    to catch entities that overlap from a neighbouring cell. Each cell keeps
+    its entities in insertion order, so queries are deterministic.
+    """
+
+    def __init__(self, cell_size=128, max_entity_size=40):
+        self.cell_size = cell_size
+        self.max_entity_size = max_entity_size
+        self.cells = {}  # (cell x, cell y) -> {entity: None}
+        self.count = 0
+
+    def key(self, x, y):
+        return (int(x // self.cell_size), int(y // self.cell_size))
+
+    def insert(self, entity):
+        entity.cell = self.key(entity.x, entity.y)
+        self.cells.setdefault(entity.cell, {})[entity] = None
+        self.count += 1
+
+    def remove(self, entity):
+        cell = self.cells[entity.cell]
+        del cell[entity]
+        if not cell:
+            del self.cells[entity.cell]
+        entity.cell = None
+        self.count -= 1
+
+    def update(self, entity):
+        """Re-index an entity after it moved (cheap when it stays in its cell)"""
+        key = self.key(entity.x, entity.y)
+        if key != entity.cell:
+            cell = self.cells[entity.cell]
+            del cell[entity]
+            if not cell:
+                del self.cells[entity.cell]
+            entity.cell = key
+            self.cells.setdefault(key, {})[entity] = None
+
+    def query_rect(self, x, y, width, height):
+        """Entities overlapping the rectangle"""
+        cells = self.cells
+        left, top = self.key(x - self.max_entity_size, y - self.max_entity_size)
+        right, bottom = self.key(x + width, y + height)
+        right_edge = x + width
+        bottom_edge = y + height
+
+        found = []
+        for cx in range(left, right + 1):
+            for cy in range(top, bottom + 1):
+                cell = cells.get((cx, cy))
+                if not cell:
+                    continue
+                for entity in cell:
+                    if (entity.x < right_edge and entity.x + entity.size > x
+                            and entity.y < bottom_edge and entity.y + entity.size > y):
+                        found.append(entity)
+        return found
+
+    def query_radius(self, x, y, radius):
+        """Entities whose center is within radius of (x, y)"""
+        limit = radius * radius
+        found = []
+        for entity in self.query_rect(x - radius, y - radius, 2 * radius, 2 * radius):
+            half = entity.size / 2
+            dx = entity.x + half - x
+            dy = entity.y + half - y
+            if dx * dx + dy * dy <= limit:
+                found.append(entity)
+        return found
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        for cell in list(self.cells.values()):
+            yield from list(cell)
@@ -0,0 +1,372 @@
+import os
+import heapq
+import struct
+from array import array
+from bisect import insort, bisect_left, bisect_right
+from collections import OrderedDict
+from monster import Monster, STATUS_CONDITIONS, create_move
+import monster_data
+
+# 1ボックスあたりのモンスター数
+BOX_SIZE = 30
+# 1体あたりの技の最大数
+MAX_MOVES = 4
+# 同時にメモリ上に置いておくボックス数
+MAX_LOADED_BOXES = 16
+
+BOX_MAGIC = b"MBOX"
+INDEX_MAGIC = b"MIDX"
+FORMAT_VERSION = 1
+
+INDEX_FILE = "index.bin"
+
+
+class StorageBox:
+    """1ボックス分のモンスターを列指向で保持する"""
+
+    def __init__(self):
+        # 種族IDが0のスロットは空き
+        self.species = array('H', bytes(2 * BOX_SIZE))
+        self.level = array('H', bytes(2 * BOX_SIZE))
+        self.exp = array('I', bytes(4 * BOX_SIZE))
+        self.exp_to_next_level = array('I', bytes(4 * BOX_SIZE))
+        self.current_hp = array('H', bytes(2 * BOX_SIZE))
+        self.status = array('B', bytes(BOX_SIZE))
+        # 技IDと残りPP（1体につきMAX_MOVES個、技IDが0なら空き）
+        self.move_ids = array('H', bytes(2 * BOX_SIZE * MAX_MOVES))
+        self.move_pp = array('H', bytes(2 * BOX_SIZE * MAX_MOVES))
+
+    def columns(self):
+        """ファイル入出力の順序で列を返す"""
+        return (self.species, self.level, self.exp, self.exp_to_next_level,
+                self.current_hp, self.status, self.move_ids, self.move_pp)
+
+    def store(self, pos, monster):
+        """モンスターを指定位置に格納"""
+        self.species[pos] = monster.species_id
+        self.level[pos] = monster.level
+        self.exp[pos] = monster.exp
+        self.exp_to_next_level[pos] = monster.exp_to_next_level
+        self.current_hp[pos] = monster.current_hp
+        self.status[pos] = STATUS_CONDITIONS.index(monster.status_condition)
+
+        base = pos * MAX_MOVES
+        for i in range(MAX_MOVES):
+            if i < len(monster.moves):
+                self.move_ids[base + i] = monster.moves[i]['id']
+                self.move_pp[base + i] = monster.moves[i]['current_pp']
+            else:
+                self.move_ids[base + i] = 0
+                self.move_pp[base + i] = 0
+
+    def clear(self, pos):
+        """指定位置を空きにする"""
+        self.species[pos] = 0
+
+    def to_dict(self, pos):
+        """指定位置のモンスターをセーブデータ形式で返す"""
+        moves = []
+        base = pos * MAX_MOVES
+        for i in range(MAX_MOVES):
+            move_id = self.move_ids[base + i]
+            if move_id:
+                move = create_move(move_id)
+                if move:  # データから消えた技は飛ばす
+                    move['current_pp'] = self.move_pp[base + i]
+                    moves.append(move)
+
+        return {
+            'species_id': self.species[pos],
+            'level': self.level[pos],
+            'exp': self.exp[pos],
+            'exp_to_next_level': self.exp_to_next_level[pos],
+            'current_hp': self.current_hp[pos],
+            'moves': moves,
+            'status_condition': STATUS_CONDITIONS[self.status[pos]],
+            'is_wild': False
+        }
+
+    def write(self, path):
+        """ボックスをファイルに書き出す"""
+        with open(path, 'wb') as f:
+            f.write(struct.pack("<4sB", BOX_MAGIC, FORMAT_VERSION))
+            for column in self.columns():
+                column.tofile(f)
+
+    @classmethod
+    def read(cls, path):
+        """ファイルからボックスを読み込む"""
+        box = cls()
+        with open(path, 'rb') as f:
+            magic, version = struct.unpack("<4sB", f.read(5))
+            if magic != BOX_MAGIC or version != FORMAT_VERSION:
+                raise ValueError(f"Invalid storage box file: {path}")
+            for column in box.columns():
+                count = len(column)
+                del column[:]
+                column.fromfile(f, count)
+        return box
+
+
+class MonsterStorage:
+    """パーティに入りきらないモンスターを預けておくボックス
+
+    全スロットの種族とレベルだけを常にメモリ上に持ち、検索用の索引はそこから作る。
+    HPや技などの詳細はボックス単位でディスクから必要な時だけ読み込む。
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory
+
+        # 全スロットの種族IDとレベル（種族IDが0なら空き）
+        self.species = array('H')
+        self.levels = array('H')
+        self._free_slots = []
+
+        # 読み込み済みのボックス（ボックス番号 -> StorageBox）
+        self._boxes = OrderedDict()
+        self._dirty_boxes = set()
+
+        # 検索用の索引（最初の検索時に作成）
+        self._by_species = None
+        self._by_type = None
+        self._by_level = None
+        self._evolution_ready = None
+
+        if directory and os.path.exists(os.path.join(directory, INDEX_FILE)):
+            self._read_index()
+
+    def __len__(self):
+        return len(self.species) - len(self._free_slots)
+
+    def __contains__(self, slot):
+        return 0 <= slot < len(self.species) and self.species[slot] != 0
+
+    # ---- 預け入れ・引き出し ----
+
+    def deposit(self, monster):
+        """モンスターを預けてスロット番号を返す"""
+        if not self._free_slots:
+            self._add_box()
+        slot = heapq.heappop(self._free_slots)
+
+        box_number, pos = divmod(slot, BOX_SIZE)
+        self._get_box(box_number).store(pos, monster)
+        self._dirty_boxes.add(box_number)
+
+        self.species[slot] = monster.species_id
+        self.levels[slot] = monster.level
+        if self._by_species is not None:
+            self._index_slot(slot)
+        return slot
+
+    def withdraw(self, slot):
+        """モンスターを引き出す"""
+        monster = self.get(slot)
+
+        if self._by_species is not None:
+            self._unindex_slot(slot)
+
+        box_number, pos = divmod(slot, BOX_SIZE)
+        self._get_box(box_number).clear(pos)
+        self._dirty_boxes.add(box_number)
+
+        self.species[slot] = 0
+        self.levels[slot] = 0
+        heapq.heappush(self._free_slots, slot)
+        return monster
+
+    def get(self, slot):
+        """スロットのモンスターを復元して返す（ボックスには残る）"""
+        if slot not in self:
+            raise KeyError(f"Empty storage slot: {slot}")
+        box_number, pos = divmod(slot, BOX_SIZE)
+        return Monster.from_dict(self._get_box(box_number).to_dict(pos))
+
+    def get_many(self, slots):
+        """複数スロットのモンスターをまとめて復元"""
+        data_list = []
+        for slot in slots:
+            if slot not in self:
+                raise KeyError(f"Empty storage slot: {slot}")
+            box_number, pos = divmod(slot, BOX_SIZE)
+            data_list.append(self._get_box(box_number).to_dict(pos))
+        return Monster.from_dicts(data_list)
+
+    def summary(self, slot):
+        """ボックスを読み込まずに（種族ID, レベル）を返す"""
+        return self.species[slot], self.levels[slot]
+
+    def slots(self):
+        """使用中のスロット番号を順に返す"""
+        species = self.species
+        return [slot for slot in range(len(species)) if species[slot]]
+
+    # ---- 検索 ----
+
+    def find_by_species(self, species_id):
+        """指定した種族のスロット番号一覧"""
+        self._build_indexes()
+        return sorted(self._by_species.get(species_id, ()))
+
+    def find_by_type(self, type_name):
+        """指定したタイプを持つモンスターのスロット番号一覧"""
+        self._build_indexes()
+        return sorted(self._by_type.get(type_name, ()))
+
+    def find_by_level(self, min_level=1, max_level=100):
+        """レベル範囲に入るモンスターのスロット番号一覧（レベル順）"""
+        self._build_indexes()
+        start = bisect_left(self._by_level, (min_level, -1))
+        end = bisect_right(self._by_level, (max_level, len(self.species)))
+        return [slot for _, slot in self._by_level[start:end]]
+
+    def find_evolution_ready(self):
+        """進化可能なレベルに達しているモンスターのスロット番号一覧"""
+        self._build_indexes()
+        return sorted(self._evolution_ready)
+
+    def sorted_slots(self, key="level", reverse=False):
+        """並び替えたスロット番号一覧（key: level, species, slot）"""
+        self._build_indexes()
+        if key == "level":
+            slots = [slot for _, slot in self._by_level]
+        elif key == "species":
+            slots = []
+            for species_id in sorted(self._by_species):
+                slots.extend(sorted(self._by_species[species_id]))
+        elif key == "slot":
+            slots = self.slots()
+        else:
+            raise ValueError(f"Unknown sort key: {key}")
+
+        if reverse:
+            slots.reverse()
+        return slots
+
+    def _build_indexes(self):
+        """種族・レベル列から索引を作成"""
+        if self._by_species is not None:
+            return
+
+        self._by_species = {}
+        self._by_type = {}
+        self._by_level = []
+        self._evolution_ready = set()
+
+        for slot in self.slots():
+            self._index_slot(slot, sort=False)
+        self._by_level.sort()
+
+    def _index_slot(self, slot, sort=True):
+        species_id = self.species[slot]
+        level = self.levels[slot]
+        species_data = monster_data.MONSTER_SPECIES[species_id]
+
+        self._by_species.setdefault(species_id, set()).add(slot)
+        for type_name in species_data[1].split('/'):
+            self._by_type.setdefault(type_name, set()).add(slot)
+
+        if sort:
+            insort(self._by_level, (level, slot))
+        else:
+            self._by_level.append((level, slot))
+
+        evolution_level = species_data[6]
+        if evolution_level is not None and species_data[7] is not None and level >= evolution_level:
+            self._evolution_ready.add(slot)
+
+    def _unindex_slot(self, slot):
+        species_id = self.species[slot]
+        species_data = monster_data.MONSTER_SPECIES[species_id]
+
+        self._by_species[species_id].discard(slot)
+        for type_name in species_data[1].split('/'):
+            self._by_type[type_name].discard(slot)
+
+        i = bisect_left(self._by_level, (self.levels[slot], slot))
+        del self._by_level[i]
+        self._evolution_ready.discard(slot)
+
+    # ---- ボックスの読み書き ----
+
+    def _add_box(self):
+        """空のボックスを1つ追加"""
+        first_slot = len(self.species)
+        self.species.extend(bytes(BOX_SIZE))
+        self.levels.extend(bytes(BOX_SIZE))
+        for slot in range(first_slot, first_slot + BOX_SIZE):
+            heapq.heappush(self._free_slots, slot)
+
+        box_number = first_slot // BOX_SIZE
+        self._boxes[box_number] = StorageBox()
+        self._dirty_boxes.add(box_number)
+        self._evict_boxes()
+
+    def _get_box(self, box_number):
+        """ボックスを取得（未読み込みならディスクから読む）"""
+        box = self._boxes.get(box_number)
+        if box is not None:
+            self._boxes.move_to_end(box_number)
+            return box
+
+        path = self._box_path(box_number)
+        box = StorageBox.read(path) if path and os.path.exists(path) else StorageBox()
+        self._boxes[box_number] = box
+        self._evict_boxes()
+        return box
+
+    def _evict_boxes(self):
+        """読み込み済みボックスが多すぎる場合は古いものから解放"""
+        if not self.directory:
+            # 保存先が無い場合は解放できない
+            return
+        while len(self._boxes) > MAX_LOADED_BOXES:
+            box_number, box = self._boxes.popitem(last=False)
+            if box_number in self._dirty_boxes:
+                os.makedirs(self.directory, exist_ok=True)
+                box.write(self._box_path(box_number))
+                self._dirty_boxes.discard(box_number)
+
+    def _box_path(self, box_number, directory=None):
+        directory = directory or self.directory
+        if not directory:
+            return None
+        return os.path.join(directory, f"box_{box_number:04d}.bin")
+
+    def _read_index(self):
+        path = os.path.join(self.directory, INDEX_FILE)
+        with open(path, 'rb') as f:
+            magic, version, capacity = struct.unpack("<4sBI", f.read(9))
+            if magic != INDEX_MAGIC or version != FORMAT_VERSION:
+                raise ValueError(f"Invalid storage index file: {path}")
+            self.species.fromfile(f, capacity)
+            self.levels.fromfile(f, capacity)
+
+        species = self.species
+        self._free_slots = [slot for slot in range(capacity) if not species[slot]]
+        heapq.heapify(self._free_slots)
+
+    def save(self, directory=None):
+        """変更のあったボックスと索引を書き出す"""
+        if directory and directory != self.directory:
+            # 保存先が変わる場合は全ボックスを新しい保存先へ書き出す
+            os.makedirs(directory, exist_ok=True)
+            for box_number in range(len(self.species) // BOX_SIZE):
+                self._get_box(box_number).write(self._box_path(box_number, directory))
+            self._dirty_boxes.clear()
+            self.directory = directory
+
+        if not self.directory:
+            raise ValueError("No storage directory specified")
+        os.makedirs(self.directory, exist_ok=True)
+
+        for box_number in sorted(self._dirty_boxes):
+            self._boxes[box_number].write(self._box_path(box_number))
+        self._dirty_boxes.clear()
+        self._evict_boxes()
+
+        with open(os.path.join(self.directory, INDEX_FILE), 'wb') as f:
+            f.write(struct.pack("<4sBI", INDEX_MAGIC, FORMAT_VERSION, len(self.species)))
+            self.species.tofile(f)
+            self.levels.tofile(f)
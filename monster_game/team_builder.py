@@ -0,0 +1,184 @@
+import math
+from functools import lru_cache
+from damage_calc import _combatant, _move, ROLL_MIN, ROLL_MAX
+from move_effects import effects_of, fixed_damage
+
+TEAM_SIZE = 6
+# Candidates kept per opponent (and overall) before the beam search
+CANDIDATES_PER_OPPONENT = 6
+BEAM_WIDTH = 48
+# Weight of average strength relative to per-opponent coverage
+AVERAGE_WEIGHT = 0.1
+
+
+@lru_cache(maxsize=65536)
+def _best_damage(attacker_species, attacker_level, move_ids, defender_species, defender_level):
+    """Highest expected damage among a set of moves (mean roll times accuracy)
+
+    An estimate is enough for ranking, and it is much cheaper than the exact
+    distributions in damage_calc for pools with many species/level pairs.
+    """
+    attacker = _combatant(attacker_species, attacker_level)
+    defender = _combatant(defender_species, defender_level)
+    mean_roll = (ROLL_MIN + ROLL_MAX) / 2
+
+    best = 0.0
+    for move_id in move_ids:
+        move = _move(move_id)
+        effects = effects_of(move_id)
+        if effects.fixed_damage is not None:
+            best = max(best, fixed_damage(effects, attacker, move, defender) * move['accuracy'] / 100)
+            continue
+        if move['power'] == 0:
+            continue
+        damage, effectiveness = attacker.calculate_base_damage(move, defender)
+        if effectiveness > 0:
+            best = max(best, max(1.0, damage * mean_roll) * move['accuracy'] / 100)
+    return best
+
+
+def _usable_move_ids(monster):
+    return tuple(sorted(m['id'] for m in monster.moves if m['current_pp'] > 0))
+
+
+def _score(species_id, level, move_ids, hp, opponent_species, opponent_level, opponent_moves, opponent_hp):
+    if hp <= 0:
+        return -1.0
+
+    dealt = _best_damage(species_id, level, move_ids, opponent_species, opponent_level)
+    taken = _best_damage(opponent_species, opponent_level, opponent_moves, species_id, level)
+
+    turns_to_win = math.ceil(opponent_hp / dealt) if dealt > 0 else math.inf
+    turns_to_lose = math.ceil(hp / taken) if taken > 0 else math.inf
+    if turns_to_win == turns_to_lose == math.inf:
+        return 0.0
+    if turns_to_win == math.inf:
+        return -1.0
+    if turns_to_lose == math.inf:
+        return 1.0
+    if turns_to_win <= turns_to_lose:
+        return (turns_to_lose - turns_to_win + 1) / (turns_to_lose + 1)
+    return -(turns_to_win - turns_to_lose) / turns_to_win
+
+
+def _profile(monster):
+    """Everything a matchup score depends on"""
+    return (monster.species_id, monster.level, _usable_move_ids(monster), monster.current_hp)
+
+
+def matchup_score(monster, opponent):
+    """How well monster does against opponent, from -1 (loses) to 1 (wins)
+
+    Compares expected turns to knock out each other. The player moves first,
+    so a tie in turns counts in the monster's favour.
+    """
+    return _score(*_profile(monster), *_profile(opponent))
+
+
+def score_matrix(pool, opponents):
+    """Matchup scores for every (pool monster, opponent); identical monsters share a row"""
+    opponent_profiles = [_profile(opponent) for opponent in opponents]
+    rows = {}
+    matrix = []
+    for monster in pool:
+        profile = _profile(monster)
+        row = rows.get(profile)
+        if row is None:
+            row = rows[profile] = tuple(_score(*profile, *opponent) for opponent in opponent_profiles)
+        matrix.append(row)
+    return matrix
+
+
+def _team_value(rows):
+    coverage = sum(max(column) for column in zip(*rows))
+    average = sum(sum(row) for row in rows) / len(rows[0])
+    return coverage + AVERAGE_WEIGHT * average
+
+
+class TeamSelection:
+    """Chosen team with the lead first"""
+
+    def __init__(self, members, score, lineup_scores):
+        self.members = members  # Indexes into the candidate pool, lead first
+        self.score = score
+        self.lineup_scores = lineup_scores  # Matchup rows in lineup order
+
+
+def build_team(pool, opponents, team_size=TEAM_SIZE):
+    """Pick the best team_size monsters from pool against an opponent party
+
+    The pool is first cut down to the strongest answers for each opponent,
+    then a beam search over the remaining candidates maximizes per-opponent
+    coverage (best answer to each opponent) plus a little average strength.
+    The lead is the member that does best against the opponent's lead.
+    """
+    if not pool or not opponents:
+        return TeamSelection([], 0.0, [])
+
+    matrix = score_matrix(pool, opponents)
+
+    # Candidate pruning: best answers to each opponent plus the best all-rounders
+    candidates = set()
+    order = range(len(pool))
+    for column in range(len(opponents)):
+        candidates.update(sorted(order, key=lambda i: -matrix[i][column])[:CANDIDATES_PER_OPPONENT])
+    candidates.update(sorted(order, key=lambda i: -sum(matrix[i]))[:team_size])
+    candidates = sorted(candidates)
+
+    # Beam search over teams (as sorted index tuples to avoid permutations)
+    team_size = min(team_size, len(candidates))
+    beam = [((), 0.0)]
+    for _ in range(team_size):
+        expanded = {}
+        for team, _ in beam:
+            last = team[-1] if team else -1
+            for index in candidates:
+                if index <= last:
+                    continue
+                new_team = team + (index,)
+                if new_team not in expanded:
+                    expanded[new_team] = _team_value([matrix[i] for i in new_team])
+        beam = sorted(expanded.items(), key=lambda item: -item[1])[:BEAM_WIDTH]
+
+    team, score = beam[0]
+
+    # Lead: best against the opponent's lead; the rest by how much they cover
+    lead = max(team, key=lambda i: (matrix[i][0], sum(matrix[i])))
+    rest = sorted((i for i in team if i != lead), key=lambda i: -max(matrix[i]))
+    members = [lead] + rest
+    return TeamSelection(members, score, [matrix[i] for i in members])
+
+
+def player_pool(player):
+    """Party and storage monsters as (monster, source) pairs for build_team
+
+    source is ("party", index) or ("storage", slot).
+    """
+    entries = [(monster, ("party", i)) for i, monster in enumerate(player.monsters)]
+    slots = player.storage.slots()
+    entries.extend(zip(player.storage.get_many(slots), (("storage", slot) for slot in slots)))
+    return entries
+
+
+def apply_team(player, entries, selection):
+    """Make the selected monsters the player's party, lead first
+
+    entries is the list returned by player_pool; party monsters that weren't
+    selected are moved to storage.
+    """
+    chosen = [entries[i] for i in selection.members]
+    chosen_party = {source[1] for _, source in chosen if source[0] == "party"}
+
+    new_party = []
+    for monster, (place, key) in chosen:
+        if place == "party":
+            new_party.append(monster)
+        else:
+            new_party.append(player.storage.withdraw(key))
+
+    for i, monster in enumerate(player.monsters):
+        if i not in chosen_party:
+            player.storage.deposit(monster)
+
+    player.monsters = new_party
+    player.active_monster = 0
@@ -0,0 +1,220 @@
+import argparse
+import json
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from simulation import run_matchup
+import monster_data
+import shared_tables
+import result_cache
+
+
+def shard_seed(base_seed, species_a, species_b, shard_index):
+    """Deterministic seed for one shard (independent of scheduling order)"""
+    return random.Random(f"{base_seed}:{species_a}:{species_b}:{shard_index}").getrandbits(62)
+
+
+def make_shards(species_ids, battles_per_pairing, shard_size, base_seed):
+    """Split every species pairing into shards of at most shard_size battles"""
+    shards = []
+    for i, species_a in enumerate(species_ids):
+        for species_b in species_ids[i + 1:]:
+            for shard_index, start in enumerate(range(0, battles_per_pairing, shard_size)):
+                battles = min(shard_size, battles_per_pairing - start)
+                seed = shard_seed(base_seed, species_a, species_b, shard_index)
+                shards.append((species_a, species_b, shard_index, battles, seed))
+    return shards
+
+
+def run_shard(shard, level):
+    """Worker entry point: fight one shard and return its totals"""
+    species_a, species_b, shard_index, battles, seed = shard
+    wins_a, wins_b, draws = run_matchup(species_a, species_b, level, battles, seed)
+    return species_a, species_b, shard_index, wins_a, wins_b, draws
+
+
+class TournamentResult:
+    """Win counts for every ordered species pair"""
+
+    def __init__(self, species_ids):
+        self.species_ids = list(species_ids)
+        self.wins = {}    # (a, b) -> battles a won against b
+        self.battles = {}  # (a, b) -> battles fought between a and b
+
+    def add(self, species_a, species_b, wins_a, wins_b, draws):
+        total = wins_a + wins_b + draws
+        for a, b, wins in ((species_a, species_b, wins_a), (species_b, species_a, wins_b)):
+            self.wins[(a, b)] = self.wins.get((a, b), 0) + wins
+            self.battles[(a, b)] = self.battles.get((a, b), 0) + total
+
+    def win_rate(self, species_a, species_b):
+        battles = self.battles.get((species_a, species_b), 0)
+        return self.wins.get((species_a, species_b), 0) / battles if battles else None
+
+    def overall_win_rate(self, species_id):
+        wins = sum(self.wins.get((species_id, b), 0) for b in self.species_ids)
+        battles = sum(self.battles.get((species_id, b), 0) for b in self.species_ids)
+        return wins / battles if battles else None
+
+    def matrix(self):
+        """Win-rate matrix as rows in species order (None on the diagonal)"""
+        return [[self.win_rate(a, b) for b in self.species_ids] for a in self.species_ids]
+
+    def format_table(self):
+        lines = ["        " + "".join(f"{b:>6}" for b in self.species_ids) + "   total"]
+        for a, row in zip(self.species_ids, self.matrix()):
+            cells = "".join("     -" if rate is None else f"{rate:6.2f}" for rate in row)
+            total = self.overall_win_rate(a)
+            lines.append(f"{a:>3} {monster_data.MONSTER_SPECIES[a][0][:4]:<4}" + cells + f"  {total or 0:6.2f}")
+        return "\n".join(lines)
+
+
+def _read_checkpoint(path, result, parameters):
+    """Load finished shards from a checkpoint file into result
+
+    The first line holds the tournament parameters; a checkpoint written with
+    other parameters raises ValueError instead of mixing results. Returns the
+    finished shards and the length of the file up to its last complete line
+    (anything after it is a partly written record from an interrupted run).
+    """
+    done = set()
+    if not path or not os.path.exists(path):
+        return done, 0
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    end = 0
+    for line in data.splitlines(keepends=True):
+        if not line.endswith(b"\n"):
+            break
+        try:
+            record = json.loads(line)
+        except ValueError:
+            break
+        if end == 0:
+            if record != parameters:
+                raise ValueError(f"Checkpoint {path} was written with parameters {record}, "
+                                 f"not {parameters}")
+        else:
+            species_a, species_b, shard_index, wins_a, wins_b, draws = record
+            done.add((species_a, species_b, shard_index))
+            result.add(species_a, species_b, wins_a, wins_b, draws)
+        end += len(line)
+    return done, end
+
+
+def run_tournament(level=20, battles_per_pairing=1000, shard_size=250, base_seed=0,
+                   workers=None, checkpoint=None, species_ids=None, progress=None, cache=None):
+    """Fight every species against every other species at the same level
+
+    Shards run in a process pool and are aggregated as they finish. Each
+    finished shard is appended to the checkpoint file, so running again with
+    the same checkpoint and parameters only fights the missing shards
+    (resuming with other parameters raises ValueError).
+    With a ResultCache, shards whose species haven't changed since they
+    were last fought are taken from the cache instead.
+    """
+    species_ids = sorted(species_ids or monster_data.MONSTER_SPECIES)
+    result = TournamentResult(species_ids)
+    parameters = {"level": level, "battles_per_pairing": battles_per_pairing,
+                  "shard_size": shard_size, "base_seed": base_seed}
+    done, checkpoint_end = _read_checkpoint(checkpoint, result, parameters)
+
+    shards = [shard for shard in make_shards(species_ids, battles_per_pairing, shard_size, base_seed)
+              if shard[:3] not in done]
+    keys = {}
+    if cache is not None:
+        digests = {species_id: result_cache.species_digest(species_id) for species_id in species_ids}
+        remaining = []
+        for shard in shards:
+            species_a, species_b, shard_index, battles, seed = shard
+            key = result_cache.matchup_key(digests[species_a], digests[species_b], level, battles, seed)
+            cached = cache.get(key)
+            if cached is None:
+                keys[shard[:3]] = key
+                remaining.append(shard)
+            else:
+                result.add(species_a, species_b, *cached)
+        shards = remaining
+    if not shards:
+        if cache is not None:
+            cache.flush()
+        return result
+
+    workers = workers or os.cpu_count()
+    checkpoint_file = None
+    if checkpoint:
+        # Drop a partly written last record, so new records start on a line of their own
+        checkpoint_file = open(checkpoint, 'a+b')
+        checkpoint_file.truncate(checkpoint_end)
+        if checkpoint_end == 0:
+            checkpoint_file.write(json.dumps(parameters).encode("utf-8") + b"\n")
+    # Workers read the game tables from one shared memory block instead of building
+    # their own copies (see shared_tables.SharedTables)
+    tables = shared_tables.SharedTables.create()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=shared_tables.attach_worker,
+                                 initargs=(tables.name,)) as pool:
+            pending = set()
+            queue = iter(shards)
+            finished = 0
+            while True:
+                # Keep a bounded number of shards in flight
+                for shard in queue:
+                    pending.add(pool.submit(run_shard, shard, level))
+                    if len(pending) >= workers * 4:
+                        break
+                if not pending:
+                    break
+
+                completed, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    species_a, species_b, shard_index, wins_a, wins_b, draws = future.result()
+                    result.add(species_a, species_b, wins_a, wins_b, draws)
+                    if cache is not None:
+                        cache.put(keys[(species_a, species_b, shard_index)], (wins_a, wins_b, draws))
+                    if checkpoint_file:
+                        record = [species_a, species_b, shard_index, wins_a, wins_b, draws]
+                        checkpoint_file.write(json.dumps(record).encode("utf-8") + b"\n")
+                        checkpoint_file.flush()
+                    finished += 1
+                    if progress:
+                        progress(finished, len(shards))
+    finally:
+        tables.close()
+        if cache is not None:
+            cache.flush()
+        if checkpoint_file:
+            checkpoint_file.close()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Round-robin tournament of all species")
+    parser.add_argument("--level", type=int, default=20)
+    parser.add_argument("--battles", type=int, default=1000, help="battles per pairing")
+    parser.add_argument("--shard-size", type=int, default=250)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--checkpoint", default=None, help="JSON lines file for resuming")
+    parser.add_argument("--cache", default=result_cache.CACHE_PATH, help="result cache file")
+    parser.add_argument("--no-cache", action="store_true", help="fight every shard again")
+    args = parser.parse_args(argv)
+
+    def progress(finished, total):
+        print(f"\r{finished}/{total} shards", end="", file=sys.stderr, flush=True)
+
+    cache = None if args.no_cache else result_cache.ResultCache(args.cache)
+    try:
+        result = run_tournament(args.level, args.battles, args.shard_size, args.seed,
+                                args.workers, args.checkpoint, progress=progress, cache=cache)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    print(file=sys.stderr)
+    print(result.format_table())
+
+
+if __name__ == "__main__":
+    main()
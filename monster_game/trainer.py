@@ -0,0 +1,82 @@
+from monster import Monster
+import monster_data
+
+
+class Party:
+    """Battle-side view of a monster list
+
+    Keeps the active index and a bitmask of monsters that can still battle,
+    so switching and "next healthy monster" lookups don't rescan the list.
+    The bitmask must be refreshed when a monster's HP changes (the battle
+    does this after every move).
+    """
+
+    def __init__(self, monsters, active=0):
+        self.monsters = monsters
+        self.active = active if 0 <= active < len(monsters) else 0
+        self.healthy = 0
+        self.refresh_all()
+
+    @property
+    def active_monster(self):
+        return self.monsters[self.active]
+
+    def refresh(self, index):
+        """Update the healthy bit of one monster from its HP"""
+        if self.monsters[index].current_hp > 0:
+            self.healthy |= 1 << index
+        else:
+            self.healthy &= ~(1 << index)
+
+    def refresh_all(self):
+        self.healthy = 0
+        for i, monster in enumerate(self.monsters):
+            if monster.current_hp > 0:
+                self.healthy |= 1 << i
+
+    def is_healthy(self, index):
+        return 0 <= index < len(self.monsters) and bool(self.healthy >> index & 1)
+
+    def has_healthy(self):
+        return self.healthy != 0
+
+    def healthy_count(self):
+        return bin(self.healthy).count("1")
+
+    def next_healthy(self):
+        """Lowest index of a healthy monster other than the active one (None if there is none)"""
+        mask = self.healthy & ~(1 << self.active)
+        if not mask:
+            return None
+        return (mask & -mask).bit_length() - 1
+
+    def switch(self, index):
+        """Make a healthy, inactive monster the active one"""
+        if index == self.active or not self.is_healthy(index):
+            return False
+        self.active = index
+        return True
+
+
+class Trainer:
+    """NPC trainer with a party of monsters"""
+
+    def __init__(self, name, monsters, prize_money=0, trainer_id=0, difficulty="easy"):
+        self.trainer_id = trainer_id  # 0 for trainers not in TRAINERS
+        self.name = name
+        self.monsters = monsters
+        self.active_monster = 0
+        self.prize_money = prize_money
+        self.difficulty = difficulty  # Enemy AI tier (enemy_ai.create_enemy_ai)
+
+    def get_active_monster(self):
+        if self.monsters and len(self.monsters) > self.active_monster:
+            return self.monsters[self.active_monster]
+        return None
+
+
+def create_trainer(trainer_id):
+    """Trainer from the TRAINERS table with a fresh party"""
+    name, prize_money, party, difficulty = monster_data.TRAINERS[trainer_id]
+    monsters = [Monster(species_id, level) for species_id, level in party]
+    return Trainer(name, monsters, prize_money, trainer_id, difficulty)
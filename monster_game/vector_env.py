@@ -0,0 +1,282 @@
+import numpy as np
+from monster import Monster, STATUS_CONDITIONS
+from monster_data import MONSTER_SPECIES, MOVES, TYPE_CHART
+from move_effects import (effects_of, LEVEL, END_OF_TURN_DAMAGE, STAGE_STATS, STAGE_MULTIPLIERS,
+                          MAX_STAGE)
+
+SLEEP = STATUS_CONDITIONS.index("sleep")
+PARALYSIS = STATUS_CONDITIONS.index("paralysis")
+
+MAX_MOVES = 4
+PLAYER = 0
+ENEMY = 1
+ATTACK = STAGE_STATS.index("attack")
+DEFENSE = STAGE_STATS.index("defense")
+
+# Battles that last longer than this many steps end as draws
+MAX_STEPS = 200
+
+
+def _type_names():
+    names = set(TYPE_CHART)
+    for effects in TYPE_CHART.values():
+        names.update(effects)
+    for species_data in MONSTER_SPECIES.values():
+        names.update(species_data[1].split('/'))
+    for move_data in MOVES.values():
+        names.add(move_data[1])
+    return sorted(names)
+
+
+class _Tables:
+    """Species, move and type data as arrays indexed by ID"""
+
+    def __init__(self, level):
+        type_names = _type_names()
+        type_index = {name: i for i, name in enumerate(type_names)}
+
+        move_count = max(MOVES) + 1
+        self.power = np.zeros(move_count)
+        self.accuracy = np.zeros(move_count, dtype=np.int64)
+        self.move_type = np.zeros(move_count, dtype=np.int64)
+
+        # Move effects from the compiled table (one stat stage effect per move)
+        self.fixed_damage = np.full(move_count, -1, dtype=np.int64)  # -1: damage formula
+        self.status_code = np.zeros(move_count, dtype=np.int64)
+        self.status_chance = np.zeros(move_count)
+        self.stage_self = np.zeros(move_count, dtype=bool)
+        self.stage_stat = np.zeros(move_count, dtype=np.int64)
+        self.stage_change = np.zeros(move_count, dtype=np.int64)
+        self.stage_chance = np.zeros(move_count)  # 0: no stat stage effect
+        self.recoil = np.zeros(move_count, dtype=np.int64)  # Percent of the damage dealt
+        for move_id, (name, type_name, power, accuracy, pp) in MOVES.items():
+            self.power[move_id] = power
+            self.accuracy[move_id] = accuracy
+            self.move_type[move_id] = type_index[type_name]
+
+            effects = effects_of(move_id)
+            if effects.fixed_damage is not None:
+                self.fixed_damage[move_id] = level if effects.fixed_damage == LEVEL else effects.fixed_damage
+            if effects.status:
+                condition, probability = effects.status
+                self.status_code[move_id] = STATUS_CONDITIONS.index(condition)
+                self.status_chance[move_id] = probability
+            if effects.stages:
+                who, stat, stages, probability = effects.stages[0]
+                self.stage_self[move_id] = who == "self"
+                self.stage_stat[move_id] = STAGE_STATS.index(stat)
+                self.stage_change[move_id] = stages
+                self.stage_chance[move_id] = probability
+            self.recoil[move_id] = effects.recoil
+
+        # End-of-turn damage divisor by status code (0: none), stat multiplier by stage + MAX_STAGE
+        self.end_of_turn = np.array([END_OF_TURN_DAMAGE.get(condition, 0) for condition in STATUS_CONDITIONS],
+                                    dtype=np.int64)
+        self.stage_multipliers = np.array(STAGE_MULTIPLIERS)
+        self.has_fixed_damage = bool((self.fixed_damage >= 0).any())
+        self.has_recoil = bool(self.recoil.any())
+
+        # effectiveness[move type, species], same product as calculate_type_effectiveness
+        species_count = max(MONSTER_SPECIES) + 1
+        self.effectiveness = np.ones((len(type_names), species_count))
+        for species_id, species_data in MONSTER_SPECIES.items():
+            for defense_type in species_data[1].split('/'):
+                for attack_type, effects in TYPE_CHART.items():
+                    if defense_type in effects:
+                        self.effectiveness[type_index[attack_type], species_id] *= effects[defense_type]
+
+        # Starting state of every species at this level, built with the Monster rules
+        self.level = level
+        self.max_hp = np.zeros(species_count, dtype=np.int64)
+        self.attack = np.zeros(species_count, dtype=np.int64)
+        self.defense = np.zeros(species_count, dtype=np.int64)
+        self.moves = np.zeros((species_count, MAX_MOVES), dtype=np.int64)
+        self.pp = np.zeros((species_count, MAX_MOVES), dtype=np.int64)
+        self.move_count = np.zeros(species_count, dtype=np.int64)
+        self.stab = np.ones((species_count, MAX_MOVES))
+        for species_id in MONSTER_SPECIES:
+            monster = Monster(species_id, level)
+            self.max_hp[species_id] = monster.max_hp
+            self.attack[species_id] = monster.attack
+            self.defense[species_id] = monster.defense
+            self.move_count[species_id] = len(monster.moves)
+            for slot, move in enumerate(monster.moves):
+                self.moves[species_id, slot] = move['id']
+                self.pp[species_id, slot] = move['pp']
+                if move['type'] in monster.type:
+                    self.stab[species_id, slot] = 1.5
+
+
+class VectorBattleEnv:
+    """Many single-monster battles stepped in lockstep with NumPy
+
+    All per-battle state lives in arrays shaped (num_envs, 2) for the player
+    and enemy side (plus a move-slot axis for moves and PP). step() applies
+    the Monster.use_move / Battle.update rules to every battle at once: the
+    player acts first, then the enemy picks a random move like RandomAI.
+    EXP and level-ups are not modelled.
+
+    Observations are float32 arrays of shape (num_envs, OBS_SIZE):
+    HP fraction (2), status code (2), PP fraction per move slot (2 * 4),
+    and species ID (2), player side first.
+    """
+
+    OBS_SIZE = 2 + 2 + 2 * MAX_MOVES + 2
+
+    def __init__(self, num_envs, matchups=None, level=20, seed=None, max_steps=MAX_STEPS):
+        self.num_envs = num_envs
+        self.tables = _Tables(level)
+        self.rng = np.random.default_rng(seed)
+        self.max_steps = max_steps
+
+        # Species pairs to draw from on reset: array of (player species, enemy species)
+        if matchups is None:
+            species = [s for s in MONSTER_SPECIES if self.tables.move_count[s] > 0]
+            matchups = [(a, b) for a in species for b in species]
+        self.matchups = np.asarray(matchups, dtype=np.int64).reshape(-1, 2)
+
+        shape = (num_envs, 2)
+        self.species = np.zeros(shape, dtype=np.int64)
+        self.hp = np.zeros(shape, dtype=np.int64)
+        self.max_hp = np.zeros(shape, dtype=np.int64)
+        self.attack = np.zeros(shape, dtype=np.int64)
+        self.defense = np.zeros(shape, dtype=np.int64)
+        self.status = np.zeros(shape, dtype=np.int64)
+        self.stages = np.zeros(shape + (len(STAGE_STATS),), dtype=np.int64)
+        self.move_count = np.zeros(shape, dtype=np.int64)
+        self.moves = np.zeros(shape + (MAX_MOVES,), dtype=np.int64)
+        self.pp = np.zeros(shape + (MAX_MOVES,), dtype=np.int64)
+        self.max_pp = np.ones(shape + (MAX_MOVES,), dtype=np.int64)
+        self.stab = np.ones(shape + (MAX_MOVES,))
+        self.steps = np.zeros(num_envs, dtype=np.int64)
+
+    def reset(self, mask=None):
+        """Start new battles (all of them, or those where mask is True)"""
+        envs = np.arange(self.num_envs) if mask is None else np.flatnonzero(mask)
+        if len(envs):
+            picks = self.matchups[self.rng.integers(0, len(self.matchups), len(envs))]
+            t = self.tables
+            self.species[envs] = picks
+            self.max_hp[envs] = t.max_hp[picks]
+            self.hp[envs] = t.max_hp[picks]
+            self.attack[envs] = t.attack[picks]
+            self.defense[envs] = t.defense[picks]
+            self.status[envs] = 0
+            self.stages[envs] = 0
+            self.move_count[envs] = t.move_count[picks]
+            self.moves[envs] = t.moves[picks]
+            self.pp[envs] = t.pp[picks]
+            self.max_pp[envs] = np.maximum(t.pp[picks], 1)
+            self.stab[envs] = t.stab[picks]
+            self.steps[envs] = 0
+        return self.observe()
+
+    def observe(self):
+        obs = np.empty((self.num_envs, self.OBS_SIZE), dtype=np.float32)
+        obs[:, 0:2] = self.hp / self.max_hp
+        obs[:, 2:4] = self.status
+        obs[:, 4:4 + 2 * MAX_MOVES] = (self.pp / self.max_pp).reshape(self.num_envs, -1)
+        obs[:, 4 + 2 * MAX_MOVES:] = self.species
+        return obs
+
+    def step(self, actions):
+        """Advance every battle by one turn
+
+        actions: player move slot per battle. Finished battles are reset
+        automatically; info["result"] holds 1 (player won), -1 (player lost)
+        or 0 (draw / still running) for the battle that just ended.
+        Returns (observations, rewards, dones, info).
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        everyone = np.ones(self.num_envs, dtype=bool)
+
+        self._act(PLAYER, ENEMY, actions, everyone)
+        # The enemy only acts if both sides are still standing (the player can faint from its own move)
+        enemy_acts = (self.hp[:, ENEMY] > 0) & (self.hp[:, PLAYER] > 0)
+        enemy_actions = self.rng.integers(0, np.maximum(self.move_count[:, ENEMY], 1))
+        self._act(ENEMY, PLAYER, enemy_actions, enemy_acts)
+
+        self.steps += 1
+        won = self.hp[:, ENEMY] == 0
+        lost = (self.hp[:, PLAYER] == 0) & ~won
+        dones = won | lost | (self.steps >= self.max_steps)
+        rewards = won.astype(np.float32) - lost.astype(np.float32)
+
+        info = {"result": rewards.astype(np.int64), "steps": self.steps.copy()}
+        if dones.any():
+            self.reset(dones)
+        return self.observe(), rewards, dones, info
+
+    def _act(self, attacker, defender, slots, active):
+        """One side uses a move in every battle where active is True"""
+        n = self.num_envs
+        rows = np.arange(n)
+        t = self.tables
+        rng = self.rng
+
+        slots = np.clip(slots, 0, MAX_MOVES - 1)
+        has_move = active & (slots < self.move_count[:, attacker])
+        move_ids = self.moves[rows, attacker, slots]
+        has_pp = has_move & (self.pp[rows, attacker, slots] > 0)
+
+        # Status: sleeping monsters may wake up (and lose the turn), paralysis may skip it
+        status = self.status[:, attacker]
+        rolls = rng.random(n)
+        asleep = has_pp & (status == SLEEP)
+        self.status[asleep & (rolls < 0.3), attacker] = 0
+        paralyzed = has_pp & (status == PARALYSIS) & (rolls < 0.25)
+        acting = has_pp & ~asleep & ~paralyzed
+
+        # Accuracy (misses don't use PP)
+        hits = acting & (rng.integers(1, 101, n) <= t.accuracy[move_ids])
+        self.pp[rows[hits], attacker, slots[hits]] -= 1
+
+        # Damage (stat stages scale attack and defense; fixed-damage moves skip the formula)
+        effectiveness = t.effectiveness[t.move_type[move_ids], self.species[:, defender]]
+        attack = self.attack[:, attacker]
+        defense = self.defense[:, defender]
+        if self.stages.any():
+            attack = attack * t.stage_multipliers[self.stages[:, attacker, ATTACK] + MAX_STAGE]
+            defense = defense * t.stage_multipliers[self.stages[:, defender, DEFENSE] + MAX_STAGE]
+        base = ((2 * t.level / 5 + 2) * t.power[move_ids] * attack / defense) / 50 + 2
+        damage = np.floor(base * self.stab[rows, attacker, slots] * effectiveness
+                          * rng.uniform(0.85, 1.0, n)).astype(np.int64)
+        damage = np.where(t.power[move_ids] > 0, np.maximum(damage, 1), 0)
+        if t.has_fixed_damage:
+            fixed = t.fixed_damage[move_ids]
+            damage = np.where(fixed >= 0, fixed, damage)
+        damage = np.where(hits & (effectiveness > 0), damage, 0)
+        self.hp[:, defender] = np.maximum(self.hp[:, defender] - damage, 0)
+
+        # Added effects: only battles whose move has one roll for it.
+        # Status conditions only land on a standing target without one.
+        envs = np.flatnonzero(hits & (t.status_chance[move_ids] > 0) & (self.hp[:, defender] > 0)
+                              & (self.status[:, defender] == 0))
+        if len(envs):
+            envs = envs[rng.random(len(envs)) < t.status_chance[move_ids[envs]]]
+            self.status[envs, defender] = t.status_code[move_ids[envs]]
+
+        # Stat stages
+        envs = np.flatnonzero(hits & (t.stage_chance[move_ids] > 0))
+        if len(envs):
+            envs = envs[rng.random(len(envs)) < t.stage_chance[move_ids[envs]]]
+            moves = move_ids[envs]
+            sides = np.where(t.stage_self[moves], attacker, defender)
+            standing = self.hp[envs, sides] > 0
+            envs, moves, sides = envs[standing], moves[standing], sides[standing]
+            stats = t.stage_stat[moves]
+            self.stages[envs, sides, stats] = np.clip(self.stages[envs, sides, stats] + t.stage_change[moves],
+                                                      -MAX_STAGE, MAX_STAGE)
+
+        # Recoil
+        if t.has_recoil:
+            percent = t.recoil[move_ids]
+            recoil = np.where((damage > 0) & (percent > 0), np.maximum(1, damage * percent // 100), 0)
+            self.hp[:, attacker] = np.maximum(self.hp[:, attacker] - recoil, 0)
+
+        # Poison and burn damage at the end of the turn
+        divisor = t.end_of_turn[self.status[:, attacker]]
+        envs = np.flatnonzero(active & (divisor > 0) & (self.hp[:, attacker] > 0))
+        if len(envs):
+            amount = np.maximum(1, self.max_hp[envs, attacker] // divisor[envs])
+            self.hp[envs, attacker] = np.maximum(self.hp[envs, attacker] - amount, 0)
@@ -0,0 +1,156 @@
+import time
+from collections import OrderedDict
+import pygame
+
+# Seconds without typing before the next key starts a new search
+SEARCH_TIMEOUT = 1.0
+SCROLLBAR_WIDTH = 6
+# Row surfaces cached, in screens' worth of rows
+CACHE_PAGES = 4
+
+
+class VirtualList:
+    """Scrolling list that only renders the rows on screen
+
+    items can be any sequence with len() and indexing, so a list of
+    thousands of entries costs nothing until its rows scroll into view.
+    render_row(item, selected, width, height) draws one row onto a new
+    surface. The surface is cached under (row_key(item), selected), so a row
+    is only redrawn when its key changes; the cache is an LRU a few screens
+    deep, so scrolling back is free too.
+
+    Printable keys do an incremental search on search_text(item): the
+    selection jumps to the next row whose text starts with what was typed.
+    """
+
+    def __init__(self, rect, row_height, render_row, row_key=None, search_text=None,
+                 font=None, background=(255, 255, 255)):
+        self.rect = pygame.Rect(rect)
+        self.row_height = row_height
+        self.render_row = render_row
+        self.row_key = row_key or (lambda item: item)
+        self.search_text = search_text
+        self.font = font  # For the search box (not drawn without a font)
+        self.background = background
+        self.items = []
+        self.selection = 0
+        self.scroll = 0  # Index of the first visible row
+        self.search = ""
+        self._search_time = 0.0
+        self._cache = OrderedDict()
+
+    @property
+    def visible_rows(self):
+        return max(1, self.rect.height // self.row_height)
+
+    def set_items(self, items, selection=None):
+        """Replace the rows; the selection is kept (clamped) unless one is given"""
+        self.items = items
+        self.search = ""
+        self.select(self.selection if selection is None else selection)
+
+    def selected_item(self):
+        return self.items[self.selection] if len(self.items) else None
+
+    def select(self, index):
+        """Select a row and scroll just enough to keep it on screen"""
+        count = len(self.items)
+        if not count:
+            self.selection = self.scroll = 0
+            return
+        visible = self.visible_rows
+        self.selection = max(0, min(index, count - 1))
+        if self.selection < self.scroll:
+            self.scroll = self.selection
+        elif self.selection >= self.scroll + visible:
+            self.scroll = self.selection - visible + 1
+        self.scroll = max(0, min(self.scroll, count - visible))
+
+    def clear_search(self):
+        self.search = ""
+
+    def handle_key(self, event):
+        """Scrolling and search keys; returns True if the key was used"""
+        key = event.key
+        if key == pygame.K_UP:
+            self.select(self.selection - 1)
+        elif key == pygame.K_DOWN:
+            self.select(self.selection + 1)
+        elif key == pygame.K_PAGEUP:
+            self.select(self.selection - self.visible_rows)
+        elif key == pygame.K_PAGEDOWN:
+            self.select(self.selection + self.visible_rows)
+        elif key == pygame.K_HOME:
+            self.select(0)
+        elif key == pygame.K_END:
+            self.select(len(self.items) - 1)
+        elif key == pygame.K_BACKSPACE and self.search:
+            self.search = self.search[:-1]
+            self._search_time = time.monotonic()
+            if self.search:
+                self._find(self.search, self.selection)
+        elif self.search_text and event.unicode and event.unicode.isprintable() \
+                and (self.search or not event.unicode.isspace()):
+            now = time.monotonic()
+            if now - self._search_time > SEARCH_TIMEOUT:
+                self.search = ""
+            self._search_time = now
+            # A new search moves on to the next match; typing more of it stays put if it still matches
+            self.search += event.unicode
+            self._find(self.search, self.selection + (len(self.search) == 1))
+        else:
+            return False
+        return True
+
+    def _find(self, query, start):
+        """Select the first row from start on (wrapping) whose text starts with query"""
+        query = query.lower()
+        items = self.items
+        count = len(items)
+        search_text = self.search_text
+        for offset in range(count):
+            index = (start + offset) % count
+            if search_text(items[index]).lower().startswith(query):
+                self.select(index)
+                return True
+        return False
+
+    def _row_surface(self, item, selected, width):
+        key = (self.row_key(item), selected)
+        cache = self._cache
+        surface = cache.get(key)
+        if surface is None:
+            surface = cache[key] = self.render_row(item, selected, width, self.row_height)
+            while len(cache) > CACHE_PAGES * (self.visible_rows + 1):
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(key)
+        return surface
+
+    def draw(self, screen):
+        rect = self.rect
+        items = self.items
+        count = len(items)
+        visible = self.visible_rows
+        row_width = rect.width - SCROLLBAR_WIDTH
+
+        previous_clip = screen.get_clip()
+        screen.set_clip(rect)
+        end = min(count, self.scroll + visible + 1)  # Plus a partly visible row
+        for index in range(self.scroll, end):
+            surface = self._row_surface(items[index], index == self.selection, row_width)
+            screen.blit(surface, (rect.x, rect.y + (index - self.scroll) * self.row_height))
+
+        # Scrollbar
+        if count > visible:
+            thumb = max(12, rect.height * visible // count)
+            top = (rect.height - thumb) * self.scroll // max(1, count - visible)
+            pygame.draw.rect(screen, (200, 200, 200), (rect.right - SCROLLBAR_WIDTH, rect.y,
+                                                       SCROLLBAR_WIDTH, rect.height))
+            pygame.draw.rect(screen, (100, 100, 100), (rect.right - SCROLLBAR_WIDTH, rect.y + top,
+                                                       SCROLLBAR_WIDTH, thumb))
+        screen.set_clip(previous_clip)
+
+        if self.search and self.font:
+            text = self.font.render(f"Search: {self.search}", True, (0, 0, 0), self.background)
+            screen.blit(text, (rect.x, rect.bottom + 4))